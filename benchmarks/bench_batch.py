@@ -0,0 +1,49 @@
+"""Throughput of render_many() with 1 to N processes.
+
+Every map is built in the worker from a small spec (a region index) and
+holds ``markers`` markers and a path of as many vertices.
+
+Run with ``python -m benchmarks.bench_batch [maps [markers]]``.
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.common import TILE_URL, random_coords
+from llplot import LeafletPlotter
+from llplot.batch import render_many
+
+
+def setup(tile_url):
+    return {'tile_url': tile_url}
+
+
+def build(spec, shared):
+    region, markers = spec
+    lats, lngs = random_coords(markers, seed=region)
+    plotter = LeafletPlotter(shared['tile_url'], 37.77, -122.44, 12)
+    plotter.marker_many(lats, lngs, 'red')
+    plotter.plot(lats, lngs, 'blue')
+    return plotter
+
+
+def main(argv):
+    maps = int(argv[0]) if argv else 2000
+    markers = int(argv[1]) if len(argv) > 1 else 200
+    outdir = tempfile.mkdtemp()
+    try:
+        print('%10s %10s %12s' % ('processes', 'seconds', 'maps/s'))
+        for processes in sorted(set([1, 2, 4, os.cpu_count() or 1])):
+            jobs = ((os.path.join(outdir, '%d.html' % i), (i, markers)) for i in range(maps))
+            report = render_many(jobs, build, processes=processes, setup=setup,
+                                 setup_args=(TILE_URL,), compact=True)
+            print('%10d %10.2f %12.1f' % (processes, report.seconds, report.maps_per_second))
+    finally:
+        shutil.rmtree(outdir)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+"""Bytes and script time of circles drawn one by one vs. the canvas batch.
+
+``per-feature`` maps add every circle with :meth:`circle` (one ``L.circle``
+template each, or one compact payload entry each with ``compact=True``),
+``batch`` maps add them all with :meth:`circle_many`. Script times are
+measured by node against a stub Leaflet (see ``benchmarks.common``).
+
+Run with ``python -m benchmarks.bench_canvas_layers [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+
+from benchmarks.common import draw_to_temp, human_bytes, js_run_ms, new_plotter, random_coords
+
+
+DEFAULT_SIZES = (1000, 20000, 100000)
+
+
+def _measure(plotter, **kwargs):
+    start = time.time()
+    path = draw_to_temp(plotter, **kwargs)
+    draw = time.time() - start
+    try:
+        return draw, os.path.getsize(path), js_run_ms(path)
+    finally:
+        os.remove(path)
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    print('%10s %-12s %10s %12s %12s' % ('circles', 'mode', 'draw s', 'html', 'script ms'))
+    for n in sizes:
+        lats, lngs = random_coords(n)
+        per_feature = new_plotter()
+        for lat, lng in zip(lats.tolist(), lngs.tolist()):
+            per_feature.circle(lat, lng, 50, 'red')
+        batch = new_plotter()
+        batch.circle_many(lats, lngs, 50, 'red')
+        for mode, plotter, kwargs in (('per-feature', per_feature, {}),
+                                      ('compact', per_feature, {'compact': True}),
+                                      ('batch', batch, {})):
+            draw, size, script = _measure(plotter, **kwargs)
+            print('%10d %-12s %10.2f %12s %12s' % (
+                n, mode, draw, human_bytes(size), '-' if script is None else '%.0f' % script))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
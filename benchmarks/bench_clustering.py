@@ -0,0 +1,37 @@
+"""Build time and payload size of server-side marker clusters.
+
+Run with ``python -m benchmarks.bench_clustering [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import time
+
+from benchmarks.common import human_bytes, new_plotter, random_coords
+from llplot.clustering import build_cluster_levels
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000, 5000000)
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    print('%10s %10s %14s %10s %12s' % ('points', 'build s', 'clusters', 'draw s', 'html'))
+    for n in sizes:
+        lats, lngs = random_coords(n, spread=4.0)
+        start = time.time()
+        levels = build_cluster_levels(lats, lngs)
+        build = time.time() - start
+
+        plotter = new_plotter()
+        plotter.cluster_markers(lats, lngs, 'red')
+        start = time.time()
+        html = plotter.draw()
+        draw = time.time() - start
+        print('%10d %10.2f %14d %10.2f %12s' % (
+            n, build, sum(len(level.counts) for level in levels), draw,
+            human_bytes(len(html))))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,55 @@
+"""Output size and browser parse time of draw() vs draw(compact=True) vs
+draw(binary=True).
+
+With ``binary`` the size includes the ``.bin`` data file, whose columns the
+page views as typed arrays without parsing them.
+
+Run with ``python -m benchmarks.bench_compact_output [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+
+from benchmarks.common import (draw_to_temp, human_bytes, js_parse_ms,
+                               new_plotter, random_coords)
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+COLORS = ('red', 'blue', 'green', 'orange')
+
+
+def run(n):
+    lats, lngs = random_coords(n)
+    plotter = new_plotter()
+    for i, color in enumerate(COLORS):
+        plotter.marker_many(lats[i::len(COLORS)], lngs[i::len(COLORS)], color)
+    rows = []
+    for mode in ('verbose', 'compact', 'binary'):
+        start = time.time()
+        path = draw_to_temp(plotter, compact=mode == 'compact', binary=mode == 'binary')
+        elapsed = time.time() - start
+        size = os.path.getsize(path)
+        parse = js_parse_ms(path)
+        os.remove(path)
+        if mode == 'binary':
+            data_path = os.path.splitext(path)[0] + '.bin'
+            size += os.path.getsize(data_path)
+            os.remove(data_path)
+        rows.append((n, mode, size, elapsed, parse))
+    return rows
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or DEFAULT_SIZES
+    print('%10s %8s %12s %10s %12s' % ('markers', 'mode', 'bytes', 'draw s', 'parse ms'))
+    for n in sizes:
+        for n, mode, size, elapsed, parse in run(n):
+            print('%10d %8s %12s %10.2f %12s' % (
+                n, mode, human_bytes(size), elapsed,
+                'n/a' if parse is None else '%.1f' % parse))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,50 @@
+"""Coordinates formatted per second by :mod:`llplot.formatting`, compared
+with the Python formatting it replaced: ``'[%f, %f],'`` lines for the
+verbose writers and ``json.dumps`` of rounded lists for the compact ones.
+
+Run with ``python -m benchmarks.bench_formatting [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import random_coords
+from llplot.formatting import format_rows, format_values
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+
+def _rate(n, function):
+    start = time.time()
+    function()
+    return n / (time.time() - start)
+
+
+def run(n):
+    lats, lngs = random_coords(n)
+    path = np.column_stack([lats, lngs])
+    cases = [
+        ('lines %f', lambda: ''.join('[%f, %f],\n' % (lat, lng) for lat, lng in path.tolist())),
+        ('lines', lambda: format_rows([lats, lngs], ['[', ', ', '],\n'])),
+        ('lines 5 strip', lambda: format_rows([lats, lngs], ['[', ', ', '],\n'], 5, True)),
+        ('json dumps', lambda: json.dumps(path.ravel().round(6).tolist(), separators=(',', ':'))),
+        ('json', lambda: format_values(path.ravel(), 6, strip_zeros=True)),
+    ]
+    return [(n, name, _rate(n, function)) for name, function in cases]
+
+
+def main(argv):
+    sizes = [int(float(arg)) for arg in argv] or DEFAULT_SIZES
+    print('%10s %14s %14s' % ('coords', 'writer', 'coords/s'))
+    for n in sizes:
+        for n, name, rate in run(n):
+            print('%10d %14s %14.0f' % (n, name, rate))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
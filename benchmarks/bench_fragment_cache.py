@@ -0,0 +1,71 @@
+"""Draw time of many maps that share their base layers (region polygons, a
+grid, depot markers) and differ in one small overlay, without and with a
+:class:`~llplot.cache.FragmentCache`.
+
+Run with ``python -m benchmarks.bench_fragment_cache [maps] [regions]``.
+"""
+from __future__ import absolute_import, print_function
+
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import new_plotter, random_coords
+from llplot.cache import FragmentCache
+
+
+DEFAULT_MAPS = 50
+DEFAULT_REGIONS = 2000
+
+
+def build(regions, depots, overlay):
+    plotter = new_plotter()
+    for outline in regions:
+        plotter.polygon(outline[:, 0], outline[:, 1], 'blue', face_alpha=0.1)
+    plotter.grid(37.67, 37.87, 0.01, -122.54, -122.34, 0.01)
+    plotter.marker_many(depots[0], depots[1], 'red')
+    plotter.plot(overlay[0], overlay[1], 'green', edge_width=3)
+    return plotter
+
+
+def run(maps, regions, cache, compact):
+    rng = np.random.RandomState(0)
+    outlines = [np.column_stack(random_coords(50, seed=i)) for i in range(regions)]
+    depots = random_coords(500, seed=regions)
+    seconds = 0.0
+    for i in range(maps):
+        plotter = build(outlines, depots, random_coords(20 + rng.randint(20), seed=i))
+        plotter.fragment_cache = cache
+        start = time.time()
+        plotter.draw(compact=compact)
+        seconds += time.time() - start
+    return seconds / maps
+
+
+def main(argv):
+    maps = int(argv[0]) if argv else DEFAULT_MAPS
+    regions = int(argv[1]) if len(argv) > 1 else DEFAULT_REGIONS
+    directory = tempfile.mkdtemp()
+    try:
+        print('%8s %10s %12s %8s %8s' % ('mode', 'cache', 'draw ms', 'hits', 'misses'))
+        for compact in (False, True):
+            for name in ('none', 'memory', 'disk'):
+                cache = None
+                if name == 'memory':
+                    cache = FragmentCache()
+                elif name == 'disk':
+                    # A fresh process would only find the files: no memory.
+                    cache = FragmentCache(max_size=0, directory=directory)
+                seconds = run(maps, regions, cache, compact)
+                print('%8s %10s %12.1f %8s %8s' % (
+                    'compact' if compact else 'verbose', name, 1000 * seconds,
+                    '-' if cache is None else cache.hits, '-' if cache is None else cache.misses))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,86 @@
+"""Build and load time of the offline gazetteer index, and forward and
+reverse lookup latency, on synthetic GeoNames-style files.
+
+Reverse lookups through the KD-tree are compared with a haversine scan of
+all the places.
+
+Run with ``python -m benchmarks.bench_gazetteer [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from llplot.gazetteer import Gazetteer, build_index
+from llplot.spatial import haversine
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+QUERIES = 1000
+
+
+def write_places(path, n, seed=0):
+    """``n`` places spread evenly over the globe; every name is shared by
+    two places."""
+    rng = np.random.RandomState(seed)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    lngs = rng.uniform(-180, 180, n)
+    with open(path, 'w') as f:
+        for i, (lat, lng) in enumerate(zip(lats.tolist(), lngs.tolist())):
+            name = 'Place %d' % (i // 2)
+            f.write('\t'.join([str(i), name, name, '', repr(lat), repr(lng), 'P', 'PPL',
+                               'FR' if i % 2 else 'US', '', '', '', '', '', str(i % 1000),
+                               '', '', 'Europe/Paris', '2024-01-01']) + '\n')
+    return lats, lngs
+
+
+def main(argv):
+    sizes = [int(float(arg)) for arg in argv] or DEFAULT_SIZES
+    print('%10s %9s %9s %11s %11s %11s %11s' % (
+        'places', 'build s', 'load ms', 'name ms', 'batch ms', 'reverse ms', 'scan ms'))
+    rng = np.random.RandomState(1)
+    for n in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'places.txt')
+            lats, lngs = write_places(path, n)
+            start = time.time()
+            build_index(path, os.path.join(directory, 'index'))
+            build = time.time() - start
+
+            start = time.time()
+            gazetteer = Gazetteer(os.path.join(directory, 'index'))
+            len(gazetteer)
+            load = time.time() - start
+
+            names = ['place %d' % i for i in rng.randint(0, n // 2, QUERIES)]
+            start = time.time()
+            for name in names:
+                gazetteer.locate(name)
+            single = (time.time() - start) / QUERIES
+            start = time.time()
+            gazetteer.locate_many(names + ['Place %d, FR' % i for i in range(QUERIES)])
+            batch = time.time() - start
+
+            points = np.degrees(np.arcsin(rng.uniform(-1, 1, QUERIES))), rng.uniform(-180, 180, QUERIES)
+            start = time.time()
+            gazetteer.reverse_many(*points)
+            reverse = (time.time() - start) / QUERIES
+            start = time.time()
+            for lat, lng in zip(*[p[:20] for p in points]):
+                haversine(lat, lng, lats, lngs).argmin()
+            scan = (time.time() - start) / 20
+            gazetteer.close()
+        finally:
+            shutil.rmtree(directory)
+        print('%10d %9.2f %9.2f %11.3f %11.1f %11.3f %11.3f' % (
+            n, build, 1000 * load, 1000 * single, 1000 * batch, 1000 * reverse, 1000 * scan))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+"""Throughput and peak memory of reading points from files in chunks.
+
+For every format a file of ``n`` rows is written to a temporary directory,
+then read by :meth:`~llplot.LeafletPlotter.heatmap_from_file` (which keeps
+only cells, so the peak memory shows the cost of the reading itself) and
+:meth:`~llplot.LeafletPlotter.scatter_from_file`, each in a fresh process.
+
+Run with ``python -m benchmarks.bench_ingest [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import human_bytes, new_plotter, random_coords
+from benchmarks.suite import peak_rss
+
+
+DEFAULT_SIZES = (100000, 1000000, 10000000)
+RECORD = np.dtype([('lat', '<f8'), ('lng', '<f8')])
+
+
+def write_files(directory, n, chunk=1000000):
+    """The test files, written chunk by chunk too."""
+    paths = {'csv': os.path.join(directory, 'points.csv'),
+             'npy': os.path.join(directory, 'points.npy')}
+    records = np.lib.format.open_memmap(paths['npy'], mode='w+', dtype=RECORD, shape=(n,))
+    with open(paths['csv'], 'w') as f:
+        f.write('lat,lng\n')
+        for start in range(0, n, chunk):
+            lats, lngs = random_coords(min(chunk, n - start), seed=start)
+            records['lat'][start:start + len(lats)] = lats
+            records['lng'][start:start + len(lats)] = lngs
+            np.savetxt(f, np.column_stack((lats, lngs)), fmt='%.6f', delimiter=',')
+    records.flush()
+    del records
+    return paths
+
+
+def run(method, path):
+    start = time.time()
+    getattr(new_plotter(), method)(path)
+    return time.time() - start, peak_rss()
+
+
+def main(argv):
+    sizes = [int(float(arg)) for arg in argv] or DEFAULT_SIZES
+    print('%10s %8s %18s %9s %12s %12s' % ('rows', 'format', 'method', 'seconds', 'rows/s', 'peak rss'))
+    context = multiprocessing.get_context('spawn')
+    for n in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            paths = write_files(directory, n)
+            for format in sorted(paths):
+                for method in ('heatmap_from_file', 'scatter_from_file'):
+                    pool = context.Pool(1)
+                    try:
+                        seconds, rss = pool.apply(run, (method, paths[format]))
+                    finally:
+                        pool.terminate()
+                    print('%10d %8s %18s %9.2f %12.0f %12s' % (
+                        n, format, method, seconds, n / seconds, human_bytes(rss)))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
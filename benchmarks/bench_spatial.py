@@ -0,0 +1,66 @@
+"""Build time, memory and query time of the spatial index, and thinning.
+
+Box and radius queries through :class:`~llplot.spatial.GridIndex` are
+compared with a linear scan of the coordinates.
+
+Run with ``python -m benchmarks.bench_spatial [sizes...]``.
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import human_bytes, random_coords
+from llplot.spatial import GridIndex, haversine, thin_mask
+
+
+DEFAULT_SIZES = (10000, 100000, 1000000, 10000000)
+QUERIES = 100
+# About 1 km wide boxes and a 500 m radius around San Francisco.
+BOX = 0.01
+RADIUS_M = 500.0
+THIN_M = 20.0
+
+
+def _per_query(function, queries):
+    start = time.time()
+    for query in queries:
+        function(*query)
+    return (time.time() - start) / len(queries)
+
+
+def main(argv):
+    sizes = [int(float(arg)) for arg in argv] or DEFAULT_SIZES
+    print('%10s %9s %10s %11s %11s %11s %11s %9s %9s' % (
+        'points', 'build s', 'index', 'bbox ms', 'scan ms', 'radius ms', 'scan ms',
+        'thin s', 'kept'))
+    rng = np.random.RandomState(1)
+    for n in sizes:
+        lats, lngs = random_coords(n)
+        start = time.time()
+        index = GridIndex(lats, lngs)
+        build = time.time() - start
+
+        corners = [(37.67 + 0.19 * rng.random_sample(), -122.54 + 0.19 * rng.random_sample())
+                   for _ in range(QUERIES)]
+        boxes = [(south, west, south + BOX, west + BOX) for south, west in corners]
+        bbox = _per_query(index.bbox, boxes)
+        bbox_scan = _per_query(lambda s, w, n, e: np.flatnonzero(
+            (lats >= s) & (lats <= n) & (lngs >= w) & (lngs <= e)), boxes[:10])
+        centers = [(lat, lng, RADIUS_M) for lat, lng in corners]
+        radius = _per_query(index.radius, centers)
+        radius_scan = _per_query(lambda lat, lng, r: np.flatnonzero(
+            haversine(lat, lng, lats, lngs) <= r), centers[:10])
+
+        start = time.time()
+        kept = int(thin_mask(lats, lngs, THIN_M).sum())
+        thin = time.time() - start
+        print('%10d %9.3f %10s %11.3f %11.3f %11.3f %11.3f %9.2f %9d' % (
+            n, build, human_bytes(index.nbytes), 1000 * bbox, 1000 * bbox_scan,
+            1000 * radius, 1000 * radius_scan, thin, kept))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+from llplot import LeafletPlotter
+
+
+TILE_URL = 'https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png'
+
+# Extracts the inline map script from an html file and times how long V8
+# takes to parse it (``new Function`` parses without running).
+PARSE_JS = """
+const fs = require('fs');
+const html = fs.readFileSync(process.argv[1], 'utf8');
+const start = html.indexOf('<script type="text/javascript">') + 31;
+const src = html.slice(start, html.lastIndexOf('</script>'));
+const t = process.hrtime.bigint();
+new Function(src);
+console.log(Number(process.hrtime.bigint() - t) / 1e6);
+"""
+
+# Runs the map script against a stub ``L`` whose factories only allocate an
+# object, to time the per-feature JavaScript work without a browser (tile
+# loading and painting are not included).
+RUN_JS = """
+const fs = require('fs');
+const html = fs.readFileSync(process.argv[1], 'utf8');
+const start = html.indexOf('<script type="text/javascript">') + 31;
+const src = html.slice(start, html.lastIndexOf('</script>'));
+function layer(options) {
+    const o = {options: Object.assign({}, options), addTo() { return o; }, bindPopup() { return o; },
+               on() { return o; }, setView() { return o; }, fitBounds() { return o; }};
+    return o;
+}
+function factory(a, b, c) { return layer(typeof c === 'object' ? c : b); }
+global.L = {Icon: {extend() { return function (o) { return layer(o); }; }}, divIcon: layer,
+            tileLayer: factory, map: factory, marker: factory, circle: factory, polyline: factory,
+            polygon: factory, canvas: layer, layerGroup: layer, heatLayer: factory};
+global.document = {createElement() { return {}; }, head: {appendChild() {}}};
+const t = process.hrtime.bigint();
+new Function(src + '\\ninitialize();')();
+console.log(Number(process.hrtime.bigint() - t) / 1e6);
+"""
+
+
+def random_coords(n, seed=0, center=(37.77, -122.44), spread=0.2):
+    rng = np.random.RandomState(seed)
+    lats = center[0] + spread * (rng.random_sample(n) - 0.5)
+    lngs = center[1] + spread * (rng.random_sample(n) - 0.5)
+    return lats, lngs
+
+
+def new_plotter():
+    return LeafletPlotter(TILE_URL, 37.77, -122.44, 12)
+
+
+def draw_to_temp(plotter, **kwargs):
+    """Draw ``plotter`` to a temporary file and return its path."""
+    fd, path = tempfile.mkstemp(suffix='.html')
+    os.close(fd)
+    plotter.draw(path, **kwargs)
+    return path
+
+
+def js_parse_ms(html_path):
+    """Milliseconds node needs to parse the map script, or None without node."""
+    try:
+        out = subprocess.check_output(['node', '-e', PARSE_JS, html_path],
+                                      stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return float(out.decode().strip())
+
+
+def js_run_ms(html_path):
+    """Milliseconds node needs to parse and run the map script against a
+    stub Leaflet, or None without node."""
+    try:
+        out = subprocess.check_output(['node', '-e', RUN_JS, html_path],
+                                      stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return float(out.decode().strip())
+
+
+def human_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return '%.1f %s' % (size, unit)
+        size /= 1024.0
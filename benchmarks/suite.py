@@ -0,0 +1,219 @@
+"""Add time, draw time, peak memory and html size of every plotting method.
+
+Every case builds a map of ``n`` features with one method and draws it; it
+runs in a fresh process so that its peak RSS is its own. ``demo`` is the
+map of ``llplot.llplot``'s ``__main__`` block (see
+:func:`~llplot.llplot.add_demo_features`) and does not depend on ``n``: it
+is the baseline that catches regressions of the fixed costs.
+
+Save the results of a reference run, then compare later runs to it; the
+exit status is 1 when a metric got worse than ``--threshold``::
+
+    python -m benchmarks.suite --sizes 1e3 1e5 --save baseline.json
+    python -m benchmarks.suite --sizes 1e3 1e5 --compare baseline.json
+
+Cases adding features one call at a time are skipped above
+``MAX_CALLS`` features.
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import human_bytes, new_plotter, random_coords
+from llplot.llplot import add_demo_features
+
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_THRESHOLD = 0.25
+MAX_CALLS = 10 ** 6
+PATH_LENGTH = 1000
+METRICS = ('add_s', 'draw_s', 'peak_rss', 'html_bytes')
+# Time differences below this are noise, not regressions.
+MIN_TIME_DELTA = 0.05
+
+
+def _marker(plotter, n):
+    lats, lngs = random_coords(n)
+    for lat, lng in zip(lats.tolist(), lngs.tolist()):
+        plotter.marker(lat, lng, 'red')
+
+
+def _marker_many(plotter, n):
+    plotter.marker_many(*random_coords(n), color='red')
+
+
+def _scatter(plotter, n):
+    plotter.scatter(*random_coords(n), color='blue', size=20, marker=False, symbol='x')
+
+
+def _paths(n):
+    lats, lngs = random_coords(n)
+    for start in range(0, n, PATH_LENGTH):
+        yield lats[start:start + PATH_LENGTH], lngs[start:start + PATH_LENGTH]
+
+
+def _plot(plotter, n):
+    for lats, lngs in _paths(n):
+        plotter.plot(lats, lngs, 'red', edge_width=2)
+
+
+def _polygon(plotter, n):
+    for lats, lngs in _paths(n):
+        plotter.polygon(lats, lngs, edge_color='cyan', face_color='blue', face_alpha=0.1)
+
+
+def _circle(plotter, n):
+    lats, lngs = random_coords(n)
+    for lat, lng in zip(lats.tolist(), lngs.tolist()):
+        plotter.circle(lat, lng, 50, 'red')
+
+
+def _circle_many(plotter, n):
+    plotter.circle_many(*random_coords(n), radius=50, color='red')
+
+
+def _heatmap(plotter, n):
+    plotter.heatmap(*random_coords(n), radius=20)
+
+
+def _grid(plotter, n):
+    # About n lines: n / 2 in each direction.
+    step = 0.2 / max(n // 2, 1)
+    plotter.grid(37.67, 37.87, step, -122.54, -122.34, step)
+
+
+def _demo(plotter, n):
+    add_demo_features(plotter)
+
+
+# name: (function adding n features, adds them one call at a time)
+CASES = {
+    'demo': (_demo, False),
+    'marker': (_marker, True),
+    'marker_many': (_marker_many, False),
+    'scatter': (_scatter, False),
+    'plot': (_plot, False),
+    'polygon': (_polygon, False),
+    'circle': (_circle, True),
+    'circle_many': (_circle_many, False),
+    'heatmap': (_heatmap, False),
+    'grid': (_grid, False),
+}
+
+
+def peak_rss():
+    """Peak resident memory of this process, in bytes."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def run_case(name, n, compact=False):
+    """Measure one case in this process.
+
+    :return: dict with ``add_s``, ``draw_s``, ``peak_rss`` (bytes) and
+        ``html_bytes``
+    """
+    add, _ = CASES[name]
+    plotter = new_plotter()
+    start = time.time()
+    add(plotter, n)
+    add_s = time.time() - start
+    fd, path = tempfile.mkstemp(suffix='.html')
+    os.close(fd)
+    try:
+        start = time.time()
+        plotter.draw(path, compact=compact)
+        draw_s = time.time() - start
+        html_bytes = os.path.getsize(path)
+    finally:
+        os.remove(path)
+    return {'add_s': add_s, 'draw_s': draw_s, 'peak_rss': peak_rss(), 'html_bytes': html_bytes}
+
+
+def run_isolated(name, n, compact=False):
+    """:func:`run_case` in a new process."""
+    pool = multiprocessing.get_context('spawn').Pool(1)
+    try:
+        return pool.apply(run_case, (name, n, compact))
+    finally:
+        pool.terminate()
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressions of ``results`` against ``baseline`` (both ``{key: metrics}``).
+
+    :return: list of ``(key, metric, baseline value, new value)`` for the
+        metrics more than ``threshold`` (a fraction) above the baseline
+    """
+    regressions = []
+    for key, metrics in sorted(results.items()):
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric in METRICS:
+            old, new = reference[metric], metrics[metric]
+            if metric.endswith('_s') and new - old < MIN_TIME_DELTA:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def _size(text):
+    return int(float(text))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', nargs='+', type=_size, default=DEFAULT_SIZES,
+                        help='numbers of features, e.g. 1e3 1e7')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument('--compact', action='store_true', help='draw with compact=True')
+    parser.add_argument('--save', help='write the results to this json file')
+    parser.add_argument('--compare', help='json file of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='tolerated slowdown/growth, as a fraction (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print('%-12s %10s %10s %10s %12s %12s' % ('case', 'n', 'add s', 'draw s', 'peak rss', 'html'))
+    for name in args.cases:
+        add, one_call_each = CASES[name]
+        for n in ([0] if name == 'demo' else args.sizes):
+            if one_call_each and n > MAX_CALLS:
+                print('%-12s %10d %s' % (name, n, 'skipped (one call per feature)'))
+                continue
+            metrics = results['%s/%d' % (name, n)] = run_isolated(name, n, args.compact)
+            print('%-12s %10d %10.2f %10.2f %12s %12s' % (
+                name, n, metrics['add_s'], metrics['draw_s'],
+                human_bytes(metrics['peak_rss']), human_bytes(metrics['html_bytes'])))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__,
+                       'compact': args.compact, 'results': results}, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, old, new in regressions:
+            growth = '%+.0f%%' % (100.0 * (new - old) / old) if old else 'new'
+            print('REGRESSION %s %s: %.4g -> %.4g (%s)' % (key, metric, old, new, growth))
+        if regressions:
+            return 1
+        print('No regression above %.0f%%.' % (100 * args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+
+import os
+import time
+import traceback
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+class BatchReport(object):
+    """Outcome of :func:`render_many`.
+
+    ``errors`` maps the html file of every map that failed to the formatted
+    traceback of its error.
+    """
+
+    def __init__(self):
+        self.rendered = 0
+        self.bytes_written = 0
+        self.errors = {}
+        self.seconds = 0.0
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    @property
+    def maps_per_second(self):
+        return (self.rendered + self.failed) / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return 'BatchReport(%d rendered, %d failed, %.1f maps/s)' % (
+            self.rendered, self.failed, self.maps_per_second)
+
+
+_worker = {}
+
+
+def _init_worker(build, setup, setup_args, draw_kwargs):
+    _worker.update(build=build, draw_kwargs=draw_kwargs,
+                   shared=setup(*setup_args) if setup is not None else None)
+
+
+def _render(htmlfile, spec):
+    """Draw one map; ``(html size, None)`` or ``(None, traceback)``."""
+    try:
+        build = _worker['build']
+        plotter = build(spec, _worker['shared']) if build is not None else spec
+        plotter.draw(htmlfile, **_worker['draw_kwargs'])
+        return os.path.getsize(htmlfile), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def render_many(jobs, build=None, processes=None, max_pending=None, setup=None, setup_args=(),
+                progress=None, **draw_kwargs):
+    """Draw many maps over a pool of worker processes.
+
+    ``jobs`` is an iterable of ``(htmlfile, spec)``; it is consumed lazily,
+    with at most ``max_pending`` maps (twice the number of processes by
+    default) queued or being drawn at any time, so a generator of specs
+    is rendered with bounded memory.
+
+    ``spec`` is either a :class:`~llplot.LeafletPlotter`, or whatever
+    ``build(spec, shared)`` turns into one in the worker. ``shared`` is
+    ``setup(*setup_args)``, computed once per worker: constant data (tile
+    url, big lookup tables, ...) is then not pickled with every map, and
+    specs stay small. ``build`` and ``setup`` must be picklable (module level
+    functions).
+
+    A map that fails is recorded in the report and the run goes on.
+
+    :param processes: number of worker processes, all cores by default;
+        1 draws everything in this process
+    :param progress: optional ``progress(htmlfile, error)`` called in this
+        process after every map, ``error`` being None or a traceback
+    :param draw_kwargs: passed to :meth:`~llplot.LeafletPlotter.draw`
+    :return: :class:`BatchReport`
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+    report = BatchReport()
+    start = time.time()
+
+    def collect(htmlfile, size, error):
+        if error is None:
+            report.rendered += 1
+            report.bytes_written += size
+        else:
+            report.errors[htmlfile] = error
+        if progress is not None:
+            progress(htmlfile, error)
+
+    if processes == 1:
+        _init_worker(build, setup, setup_args, draw_kwargs)
+        try:
+            for htmlfile, spec in jobs:
+                collect(htmlfile, *_render(htmlfile, spec))
+        finally:
+            _worker.clear()
+        report.seconds = time.time() - start
+        return report
+
+    pending = {}
+
+    def drain():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            htmlfile = pending.pop(future)
+            try:
+                size, error = future.result()
+            except Exception:
+                # The spec could not be sent, or the worker died.
+                size, error = None, traceback.format_exc()
+            collect(htmlfile, size, error)
+
+    with ProcessPoolExecutor(processes, initializer=_init_worker,
+                             initargs=(build, setup, setup_args, draw_kwargs)) as pool:
+        for htmlfile, spec in jobs:
+            if len(pending) >= max_pending:
+                drain()
+            try:
+                pending[pool.submit(_render, htmlfile, spec)] = htmlfile
+            except Exception:
+                collect(htmlfile, None, traceback.format_exc())
+        while pending:
+            drain()
+    report.seconds = time.time() - start
+    return report
@@ -0,0 +1,101 @@
+from __future__ import absolute_import
+
+import json
+import struct
+
+import numpy as np
+
+
+MAGIC = b'LLPB'
+VERSION = 1
+# Columns start on multiples of this many bytes, so that the page can view
+# them as typed arrays in place.
+ALIGNMENT = 8
+COLUMN_TYPES = {'<f4': 'Float32', '<f8': 'Float64', '<i4': 'Int32'}
+_NUMPY_TYPES = dict((name, np.dtype(dtype)) for dtype, name in COLUMN_TYPES.items())
+_PREFIX = struct.Struct('<4sII')
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class BinaryColumn(object):
+    """A column of a binary data file: ``dtype`` is one of
+    :data:`COLUMN_TYPES` and ``parts`` the arrays written one after the
+    other (a single array, or the coordinates of many paths)."""
+
+    def __init__(self, dtype, parts):
+        self.dtype = np.dtype(dtype)
+        if self.dtype.str not in COLUMN_TYPES:
+            raise ValueError("unsupported column type %r" % (dtype,))
+        self.parts = [parts] if isinstance(parts, np.ndarray) else list(parts)
+        self.length = sum(len(part) for part in self.parts)
+
+    @property
+    def nbytes(self):
+        return self.length * self.dtype.itemsize
+
+
+def write_columns(path, tables):
+    """Write a binary data file.
+
+    The file starts with ``LLPB``, the format version and the size of a JSON
+    header (little-endian uint32s), then the header, then the columns, each
+    aligned on 8 bytes, in little-endian order. ``tables`` maps names to dicts
+    of fields; in the header, a :class:`BinaryColumn` field is replaced by
+    ``{"type": ..., "offset": ..., "length": ...}`` (``offset`` in bytes from
+    the end of the header, once aligned), other fields are kept as they are.
+
+    The columns are copied from their arrays straight into a memory-mapped
+    view of the file, converting the type on the way, without an intermediate
+    buffer.
+
+    :return: size of the file in bytes
+    """
+    header, columns, offset = {}, [], 0
+    for name, fields in tables.items():
+        header[name] = {}
+        for key, value in fields.items():
+            if isinstance(value, BinaryColumn):
+                header[name][key] = {'type': COLUMN_TYPES[value.dtype.str], 'offset': offset,
+                                     'length': value.length}
+                columns.append((offset, value))
+                offset = _aligned(offset + value.nbytes)
+            else:
+                header[name][key] = value
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    start = _aligned(_PREFIX.size + len(header))
+    size = start + offset
+    data = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+    try:
+        data[:_PREFIX.size] = np.frombuffer(_PREFIX.pack(MAGIC, VERSION, len(header)), dtype=np.uint8)
+        data[_PREFIX.size:_PREFIX.size + len(header)] = np.frombuffer(header, dtype=np.uint8)
+        for offset, column in columns:
+            position = start + offset
+            for part in column.parts:
+                end = position + len(part) * column.dtype.itemsize
+                data[position:end].view(column.dtype)[:] = part
+                position = end
+        data.flush()
+    finally:
+        del data
+    return size
+
+
+def read_columns(path):
+    """Read a file of :func:`write_columns` back: its tables, with every
+    column as a read-only numpy array memory-mapped from the file."""
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, version, header_size = _PREFIX.unpack(data[:_PREFIX.size].tobytes())
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a version %d llplot data file" % (path, VERSION))
+    tables = json.loads(data[_PREFIX.size:_PREFIX.size + header_size].tobytes().decode('utf-8'))
+    start = _aligned(_PREFIX.size + header_size)
+    for fields in tables.values():
+        for key, value in fields.items():
+            if isinstance(value, dict) and set(value) == {'type', 'offset', 'length'}:
+                dtype = _NUMPY_TYPES[value['type']]
+                position = start + value['offset']
+                fields[key] = data[position:position + value['length'] * dtype.itemsize].view(dtype)
+    return tables
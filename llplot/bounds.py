@@ -0,0 +1,138 @@
+from __future__ import absolute_import
+
+import numpy as np
+
+
+class Bounds(object):
+    """Running south/west/north/east bounds of coordinates.
+
+    Empty until something is added; :meth:`update` takes whole arrays.
+    """
+
+    def __init__(self, south=np.inf, west=np.inf, north=-np.inf, east=-np.inf):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+
+    @property
+    def empty(self):
+        return self.south > self.north
+
+    def update(self, lats, lngs):
+        if len(lats):
+            self.south = min(self.south, float(np.min(lats)))
+            self.north = max(self.north, float(np.max(lats)))
+            self.west = min(self.west, float(np.min(lngs)))
+            self.east = max(self.east, float(np.max(lngs)))
+
+    def update_point(self, lat, lng):
+        self.south = min(self.south, lat)
+        self.north = max(self.north, lat)
+        self.west = min(self.west, lng)
+        self.east = max(self.east, lng)
+
+    def union(self, other):
+        return Bounds(min(self.south, other.south), min(self.west, other.west),
+                      max(self.north, other.north), max(self.east, other.east))
+
+    def contains(self, lats, lngs):
+        """Boolean mask of the coordinates inside the bounds (edges included)."""
+        return (lats >= self.south) & (lats <= self.north) & (lngs >= self.west) & (lngs <= self.east)
+
+    def contains_point(self, lat, lng):
+        return self.south <= lat <= self.north and self.west <= lng <= self.east
+
+    def intersects(self, other):
+        return (not self.empty and not other.empty and self.south <= other.north
+                and other.south <= self.north and self.west <= other.east
+                and other.west <= self.east)
+
+    def __eq__(self, other):
+        return isinstance(other, Bounds) and self.as_tuple() == other.as_tuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def as_tuple(self):
+        return self.south, self.west, self.north, self.east
+
+    def __repr__(self):
+        if self.empty:
+            return 'Bounds()'
+        return 'Bounds(south=%r, west=%r, north=%r, east=%r)' % self.as_tuple()
+
+
+def path_bounds(path):
+    bounds = Bounds()
+    bounds.update(path[:, 0], path[:, 1])
+    return bounds
+
+
+def _touching_segments(path, box):
+    """Boolean mask of the segments of an ``(n, 2)`` path that touch
+    ``box``, including those crossing it with both ends outside
+    (Liang-Barsky, vectorized over the segments)."""
+    start, delta = path[:-1], np.diff(path, axis=0)
+    low = np.zeros(len(delta))
+    high = np.ones(len(delta))
+    hit = np.ones(len(delta), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-delta[:, 0], start[:, 0] - box.south), (delta[:, 0], box.north - start[:, 0]),
+                     (-delta[:, 1], start[:, 1] - box.west), (delta[:, 1], box.east - start[:, 1])):
+            # Parallel to this side: only a hit when on the inner side of it.
+            hit &= (p != 0) | (q >= 0)
+            t = q / p
+            low = np.where(p < 0, np.maximum(low, t), low)
+            high = np.where(p > 0, np.minimum(high, t), high)
+    return hit & (low <= high)
+
+
+def clip_path(path, box):
+    """Pieces of an ``(n, 2)`` path that run inside ``box``.
+
+    Every run of consecutive segments touching the box is kept whole, so
+    the pieces still reach the edges of the box; a segment crossing the box
+    is kept even when both its vertices are outside. Segments that do not
+    touch the box are dropped.
+
+    :return: list of ``(m, 2)`` arrays with at least 2 vertices
+    """
+    if len(path) < 2:
+        return [path] if box.contains(path[:, 0], path[:, 1]).all() else []
+    keep = _touching_segments(path, box)
+    if keep.all():
+        return [path]
+    edges = np.diff(np.concatenate(([0], keep.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    # Segments start to end - 1 join vertices start to end.
+    return [path[start:end + 1] for start, end in zip(starts, ends)]
+
+
+def clip_polygon(ring, box):
+    """Clip a polygon ring to ``box`` (Sutherland-Hodgman, one numpy pass
+    per side of the box).
+
+    :return: ``(m, 2)`` array, empty when the polygon is outside the box
+    """
+    if box.contains(ring[:, 0], ring[:, 1]).all():
+        return ring
+    for axis, limit, keep_below in ((0, box.south, False), (0, box.north, True),
+                                    (1, box.west, False), (1, box.east, True)):
+        if not len(ring):
+            break
+        values = ring[:, axis]
+        inside = values <= limit if keep_below else values >= limit
+        previous = np.roll(ring, 1, axis=0)
+        previous_inside = np.roll(inside, 1)
+        crossing = inside != previous_inside
+        # Where edge (previous -> vertex) crosses the limit.
+        delta = values - previous[:, axis]
+        t = np.where(crossing, (limit - previous[:, axis]) / np.where(crossing, delta, 1), 0)
+        intersections = previous + t[:, None] * (ring - previous)
+        intersections[:, axis] = limit
+        # For every vertex: the crossing point if any, then the vertex if inside.
+        candidates = np.stack((intersections, ring), axis=1).reshape(-1, 2)
+        mask = np.stack((crossing, inside), axis=1).reshape(-1)
+        ring = candidates[mask]
+    return ring
@@ -0,0 +1,194 @@
+from __future__ import absolute_import
+
+import hashlib
+import io
+import os
+
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Part of every key: bump it when the html written for a layer changes, so
+# that fragments cached on disk by an older version are not reused.
+FRAGMENT_FORMAT = 1
+DEFAULT_MAX_SIZE = 64 << 20
+DEFAULT_MAX_DISK_SIZE = 1 << 30
+_SUFFIX = '.fragment'
+
+
+def fingerprint(*parts):
+    """A hex digest of nested lists, tuples and dicts of numpy arrays,
+    strings, numbers and None.
+
+    Arrays are hashed from their bytes (with their type and shape), so
+    that hashing millions of coordinates takes milliseconds; tuples (the
+    styles shared by many features) are only hashed once per call.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    _update(digest, parts, {})
+    return digest.hexdigest()
+
+
+def _update(digest, value, tuples):
+    if isinstance(value, np.ndarray) and value.dtype.kind != 'O':
+        value = np.ascontiguousarray(value)
+        digest.update(('a%s%r' % (value.dtype.str, value.shape)).encode('ascii'))
+        digest.update(memoryview(value).cast('B'))
+    elif isinstance(value, np.ndarray):
+        # The tuples of tolist() are freed on return, and their ids reused.
+        _update(digest, value.tolist(), {})
+    elif isinstance(value, dict):
+        digest.update(b'd%d' % len(value))
+        for key in sorted(value, key=repr):
+            _update(digest, key, tuples)
+            _update(digest, value[key], tuples)
+    elif isinstance(value, tuple):
+        # The parts are alive until the end of the call: ids are not reused.
+        known = tuples.get(id(value))
+        if known is None:
+            inner = hashlib.blake2b(digest_size=20)
+            for item in value:
+                _update(inner, item, tuples)
+            known = tuples[id(value)] = b't%d:%s' % (len(value), inner.digest())
+        digest.update(known)
+    elif isinstance(value, list):
+        digest.update(b'l%d' % len(value))
+        for item in value:
+            _update(digest, item, tuples)
+    else:
+        text = repr(value).encode('utf-8')
+        digest.update(b's%d:' % len(text))
+        digest.update(text)
+
+
+class FragmentCache(object):
+    """The html of layers, by the :func:`fingerprint` of their data and
+    style, so that maps sharing layers only write each of them once.
+
+    Fragments are kept in memory, the least recently used ones being dropped
+    beyond ``max_size`` characters, and, with a ``directory``, in files that
+    other processes (and later runs) read too. Files are replaced atomically;
+    beyond ``max_disk_size`` bytes the least recently used are removed.
+
+    ``hits``, ``misses`` and ``disk_hits`` (hits read from a file, counted
+    in ``hits`` too) measure how well it works.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, directory=None, max_disk_size=DEFAULT_MAX_DISK_SIZE):
+        self.max_size = max_size
+        self.directory = directory
+        self.max_disk_size = max_disk_size
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._disk_size = None
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return 'FragmentCache(%d fragments, %d hits, %d misses)' % (len(self), self.hits, self.misses)
+
+    @property
+    def size(self):
+        """Characters of the fragments held in memory."""
+        return self._size
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits,
+                'evictions': self.evictions, 'fragments': len(self), 'size': self._size}
+
+    def get(self, key):
+        """The fragment cached under ``key``, or None."""
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with io.open(path, encoding='utf-8') as f:
+                    text = f.read()
+                # The modification time orders the files for the eviction.
+                os.utime(path)
+            except (IOError, OSError):
+                text = None
+            if text is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, text)
+                return text
+        self.misses += 1
+        return None
+
+    def put(self, key, text):
+        self._remember(key, text)
+        if self.directory is None:
+            return
+        path = self._path(key)
+        partial = '%s.%d' % (path, os.getpid())
+        with io.open(partial, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(partial, path)
+        if self._disk_size is None:
+            self._disk_size = self._scan()[1]
+        else:
+            self._disk_size += os.path.getsize(path)
+        if self._disk_size > self.max_disk_size:
+            self._evict_files()
+
+    def clear(self):
+        """Forget the fragments held in memory (files are kept)."""
+        self._entries.clear()
+        self._size = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _remember(self, key, text):
+        if len(text) > self.max_size:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = text
+        self._size += len(text)
+        while self._size > self.max_size:
+            _, dropped = self._entries.popitem(last=False)
+            self._size -= len(dropped)
+            self.evictions += 1
+
+    def _scan(self):
+        """``([(mtime, size, path)], total size)`` of the cached files."""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files, sum(size for _, size, _ in files)
+
+    def _evict_files(self):
+        # Other processes write to the directory too: start from what is
+        # there now, not from this process' count.
+        files, total = self._scan()
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._disk_size = total
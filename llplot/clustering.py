@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+
+from collections import namedtuple
+
+import numpy as np
+
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.0511287798
+
+
+ClusterLevel = namedtuple('ClusterLevel', ['zoom', 'lats', 'lngs', 'counts', 'points'])
+ClusterLevel.__doc__ = """Clusters shown at one zoom level.
+
+``lats``/``lngs`` are the cluster centroids, ``counts`` the number of
+points in each cluster and ``points`` the index of one member point (the
+point itself for clusters of one).
+"""
+
+
+def project(lats, lngs):
+    """Web Mercator world coordinates of lat/lng arrays, both in [0, 1]."""
+    lats = np.radians(np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.asarray(lngs) / 360.0 + 0.5
+    y = 0.5 - np.log(np.tan(np.pi / 4 + lats / 2)) / (2 * np.pi)
+    return x, y
+
+
+def build_cluster_levels(lats, lngs, min_zoom=0, max_zoom=16, radius=60):
+    """Cluster points on a grid of ``radius`` pixel cells, for every zoom.
+
+    At ``max_zoom`` points are bucketed by their pixel cell; each coarser
+    level merges the clusters of the level below. Because the pixel grid of
+    zoom ``z - 1`` is the grid of zoom ``z`` with cells twice as large, a
+    cell's parent is simply its index shifted right by one, so the hierarchy
+    is exact. Only the first level sorts all the points (O(n log n)); the
+    others work on the, much smaller, set of clusters.
+
+    :return: a list of :class:`ClusterLevel`, from ``min_zoom`` to ``max_zoom``
+    """
+    if not 0 <= min_zoom <= max_zoom:
+        raise ValueError("need 0 <= min_zoom <= max_zoom, got %r, %r" % (min_zoom, max_zoom))
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    x, y = project(lats, lngs)
+    scale = TILE_SIZE * 2.0 ** max_zoom / radius
+    cx = np.floor(x * scale).astype(np.int64)
+    cy = np.floor(y * scale).astype(np.int64)
+
+    counts = np.ones(len(lats), dtype=np.float64)
+    sum_lats, sum_lngs = lats, lngs
+    points = np.arange(len(lats))
+    levels = []
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        keys = (cx << 32) | cy
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, weights=counts)
+        sum_lats = np.bincount(inverse, weights=sum_lats)
+        sum_lngs = np.bincount(inverse, weights=sum_lngs)
+        points = points[first]
+        levels.append(ClusterLevel(zoom, sum_lats / counts, sum_lngs / counts,
+                                   counts.astype(np.int64), points))
+        cx = cx[first] >> 1
+        cy = cy[first] >> 1
+    levels.reverse()
+    return levels
@@ -0,0 +1,157 @@
+from __future__ import absolute_import
+
+import collections
+
+import numpy as np
+
+
+DEFAULT_PRECISION = 6
+# Rows formatted at once; bounds the size of the character matrices.
+CHUNK_ROWS = 1 << 15
+# Above this, scaled values do not fit exactly in the int64 digits arithmetic.
+_MAX_SCALED = 1 << 53
+
+
+class CoordinateFormat(collections.namedtuple('CoordinateFormat', ['precision', 'strip_zeros'])):
+    """How numbers are written: ``precision`` decimals (6 is about 10 cm on
+    the ground), with trailing zeros (and a bare decimal point) removed when
+    ``strip_zeros`` is set."""
+
+    __slots__ = ()
+
+    def __new__(cls, precision=DEFAULT_PRECISION, strip_zeros=False):
+        if not 0 <= precision <= 15:
+            raise ValueError("precision must be between 0 and 15, got %r" % (precision,))
+        return super(CoordinateFormat, cls).__new__(cls, int(precision), bool(strip_zeros))
+
+    def rows(self, columns, pieces):
+        return format_rows(columns, pieces, self.precision, self.strip_zeros)
+
+    def values(self, values, separator=','):
+        return format_values(values, self.precision, self.strip_zeros, separator)
+
+    def number(self, value):
+        """A single number, formatted by Python (for the few values written
+        one at a time)."""
+        return _python_number(float(value), self.precision, self.strip_zeros)
+
+    def each(self, values):
+        """One string per value."""
+        text = self.values(values)
+        return text.split(',') if text else []
+
+
+def _split(values, precision):
+    """Signs, integer parts, decimals (as integers) and the number of digits
+    of the largest integer part."""
+    scaled = np.rint(values * 10.0 ** precision)
+    negative = scaled < 0
+    scaled = np.abs(scaled).astype(np.int64)
+    integer, fraction = np.divmod(scaled, 10 ** precision)
+    if len(integer) and integer.max() < 1 << 31:
+        integer, fraction = integer.astype(np.int32), fraction.astype(np.int32)
+    width = len(str(int(integer.max()))) if len(integer) else 1
+    return negative, integer, fraction, width
+
+
+def _fill_number(chars, shown, column, parts, precision, strip_zeros):
+    """Write the characters of numbers into ``chars[:, column:]``, marking
+    which are ``shown``; the shown characters of a row, in order, are the
+    formatted value. Returns the column after the number."""
+    negative, integer, fraction, width = parts
+    chars[:, column] = ord('-')
+    shown[:, column] = negative
+    column += 1
+    remaining = integer
+    for k in range(column + width - 1, column - 1, -1):
+        remaining, digit = np.divmod(remaining, 10)
+        chars[:, k] = digit
+        chars[:, k] += 48
+    # Leading zeros are hidden, but the units digit is always shown.
+    for k in range(width - 1):
+        shown[:, column + k] = integer >= 10 ** (width - 1 - k)
+    shown[:, column + width - 1] = True
+    column += width
+    if not precision:
+        return column
+    chars[:, column] = ord('.')
+    remaining, nonzero = fraction, None
+    for k in range(column + precision, column, -1):
+        remaining, digit = np.divmod(remaining, 10)
+        chars[:, k] = digit
+        chars[:, k] += 48
+        if strip_zeros:
+            # Digit k is shown when it, or a digit after it, is not zero.
+            nonzero = digit != 0 if nonzero is None else nonzero | (digit != 0)
+            shown[:, k] = nonzero
+        else:
+            shown[:, k] = True
+    shown[:, column] = nonzero if strip_zeros else True
+    return column + precision + 1
+
+
+# How JavaScript (and json.dumps) spell the values '%f' writes nan and inf.
+_NON_FINITE = {'nan': 'NaN', 'inf': 'Infinity', '-inf': '-Infinity'}
+
+
+def _python_number(value, precision, strip_zeros):
+    text = '%.*f' % (precision, value)
+    if text in _NON_FINITE:
+        return _NON_FINITE[text]
+    if strip_zeros and '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
+
+
+def _fallback_rows(columns, pieces, precision, strip_zeros):
+    return ''.join(pieces[0] + ''.join(_python_number(value, precision, strip_zeros) + piece
+                                       for value, piece in zip(row, pieces[1:]))
+                   for row in zip(*[column.tolist() for column in columns]))
+
+
+def format_rows(columns, pieces, precision=DEFAULT_PRECISION, strip_zeros=False):
+    """Format rows of numbers with numpy only, no Python loop per value.
+
+    Row ``i`` is ``pieces[0] + columns[0][i] + pieces[1] + ... + pieces[-1]``;
+    e.g. ``format_rows([lats, lngs], ['[', ', ', '],\\n'])``. Digits are
+    computed with integer arithmetic into a character matrix, which is then
+    compacted in one pass. Without ``strip_zeros`` the result is the same
+    as ``'%.6f'`` formatting (up to ties of the rounding and the sign of
+    values that round to zero, written as ``0``); values too big for the
+    integer arithmetic, or not finite, are formatted by Python, non finite
+    ones as ``NaN``, ``Infinity`` and ``-Infinity`` like ``json.dumps``.
+
+    :param pieces: ``len(columns) + 1`` literal strings (ASCII)
+    """
+    columns = [np.asarray(column, dtype=np.float64).ravel() for column in columns]
+    if len(pieces) != len(columns) + 1:
+        raise ValueError("expected %d pieces, got %d" % (len(columns) + 1, len(pieces)))
+    literals = [np.frombuffer(piece.encode('ascii'), dtype=np.uint8) for piece in pieces]
+    parts = []
+    rows = len(columns[0]) if columns else 0
+    for start in range(0, rows, CHUNK_ROWS):
+        chunk = [column[start:start + CHUNK_ROWS] for column in columns]
+        if any(not np.isfinite(column).all() or np.abs(column).max() * 10.0 ** precision >= _MAX_SCALED
+               for column in chunk if len(column)):
+            parts.append(_fallback_rows(chunk, pieces, precision, strip_zeros))
+            continue
+        numbers = [_split(column, precision) for column in chunk]
+        width = sum(len(literal) for literal in literals)
+        width += sum(2 + number[3] + precision for number in numbers)
+        chars = np.empty((len(chunk[0]), width), dtype=np.uint8)
+        shown = np.empty((len(chunk[0]), width), dtype=bool)
+        column = 0
+        for i, literal in enumerate(literals):
+            chars[:, column:column + len(literal)] = literal
+            shown[:, column:column + len(literal)] = True
+            column += len(literal)
+            if i < len(numbers):
+                column = _fill_number(chars, shown, column, numbers[i], precision, strip_zeros)
+        parts.append(chars[:, :column][shown[:, :column]].tobytes().decode('ascii'))
+    return ''.join(parts)
+
+
+def format_values(values, precision=DEFAULT_PRECISION, strip_zeros=False, separator=','):
+    """The numbers of ``values`` joined by ``separator``."""
+    text = format_rows([values], ['', separator], precision, strip_zeros)
+    return text[:-len(separator)] if text else text
@@ -0,0 +1,355 @@
+from __future__ import absolute_import, print_function
+
+import io
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import unicodedata
+
+from collections import namedtuple
+
+import numpy as np
+
+from llplot.geocoding import Geocoder
+from llplot.simplify import EARTH_RADIUS_M
+from llplot.spatial import _ranges
+
+
+INDEX_VERSION = 1
+# Places per leaf of the KD-tree, searched by brute force.
+LEAF_SIZE = 16
+# Columns of the GeoNames ``geoname`` dumps (allCountries.txt, cities500.txt,
+# ...) used here: name, ASCII name, alternate names, latitude, longitude,
+# country code and population.
+_NAME, _ASCII_NAME, _ALTERNATE_NAMES, _LAT, _LNG, _COUNTRY, _POPULATION = 1, 2, 3, 4, 5, 8, 14
+_SEPARATORS = re.compile(r'[\W_]+', re.UNICODE)
+_COUNTRY_SUFFIX = re.compile(r'^(.*\S)\s*,\s*([A-Za-z]{2})\s*$')
+
+
+Place = namedtuple('Place', ['name', 'country', 'lat', 'lng', 'population'])
+
+
+def normalize_name(name):
+    """The form names are indexed and looked up in: lower case, without
+    accents, punctuation and spaces as single spaces (``'São  Paulo!'`` ->
+    ``'sao paulo'``)."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return ' '.join(_SEPARATORS.sub(' ', name.casefold()).split())
+
+
+def _unit_vectors(lats, lngs):
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    return np.column_stack([np.cos(lats) * np.cos(lngs), np.cos(lats) * np.sin(lngs), np.sin(lats)])
+
+
+def _tree_depth(size, leaf_size):
+    depth = 0
+    while size > leaf_size:
+        size //= 2
+        depth += 1
+    return depth
+
+
+def _kd_order(xyz, leaf_size):
+    """Order the points as an implicit KD-tree.
+
+    The node of a range ``[lo, hi)`` of the order, at depth ``d``, is its
+    middle point ``m = (lo + hi) // 2``, the median along axis ``d % 3``;
+    its children are ``[lo, m)`` and ``[m + 1, hi)``, down to ranges of at
+    most ``leaf_size`` points. Every level is ordered at once, with one
+    sort of all its ranges.
+    """
+    order = np.arange(len(xyz))
+    los, his = np.zeros(1, dtype=np.int64), np.array([len(xyz)], dtype=np.int64)
+    depth = _tree_depth(len(xyz), leaf_size)
+    for level in range(depth):
+        his = np.maximum(his, los)
+        positions = _ranges(los, his)
+        ranges = np.repeat(np.arange(len(los)), his - los)
+        # Positions are in increasing order, so sorting by range keeps every
+        # range in place.
+        values = xyz[order[positions], level % 3]
+        order[positions] = order[positions][np.lexsort((values, ranges))]
+        middles = (los + his) // 2
+        los = np.column_stack([los, middles + 1]).ravel()
+        his = np.column_stack([middles, his]).ravel()
+    return order, depth
+
+
+def build_index(path, index_dir, alternate_names=False, min_population=0, leaf_size=LEAF_SIZE):
+    """Index a GeoNames-style gazetteer for :class:`Gazetteer`.
+
+    ``path`` is a tab separated file with the columns of the GeoNames
+    ``geoname`` table. Places are found by their normalized name and ASCII
+    name (and alternate names with ``alternate_names``), the most populated
+    first; the index is a directory of flat files that are memory-mapped
+    when it is used.
+
+    :param min_population: skip smaller places
+    :return: number of places indexed
+    """
+    names, countries, lats, lngs, populations, keys = [], [], [], [], [], []
+    with io.open(path, encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\r\n').split('\t')
+            if len(fields) <= _POPULATION or line.startswith('#'):
+                continue
+            population = int(fields[_POPULATION] or 0)
+            if population < min_population:
+                continue
+            place = len(names)
+            names.append(fields[_NAME])
+            countries.append(fields[_COUNTRY])
+            lats.append(float(fields[_LAT]))
+            lngs.append(float(fields[_LNG]))
+            populations.append(population)
+            variants = [fields[_NAME], fields[_ASCII_NAME]]
+            if alternate_names and fields[_ALTERNATE_NAMES]:
+                variants.extend(fields[_ALTERNATE_NAMES].split(','))
+            for key in set(normalize_name(variant) for variant in variants):
+                if key:
+                    keys.append((key.encode('utf-8'), -population, place))
+    keys.sort()
+
+    if not os.path.isdir(index_dir):
+        os.makedirs(index_dir)
+    lats, lngs = np.array(lats, dtype=np.float64), np.array(lngs, dtype=np.float64)
+    xyz = _unit_vectors(lats, lngs)
+    order, depth = _kd_order(xyz, leaf_size)
+    arrays = {
+        'lats': lats,
+        'lngs': lngs,
+        'populations': np.array(populations, dtype=np.int64),
+        'countries': np.array(countries, dtype='S2'),
+        'key_places': np.array([place for _, _, place in keys], dtype=np.int32),
+        'key_offsets': _offsets([key for key, _, _ in keys]),
+        'name_offsets': _offsets([name.encode('utf-8') for name in names]),
+        'tree_xyz': xyz[order],
+        'tree_places': order.astype(np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(index_dir, name + '.npy'), array)
+    with open(os.path.join(index_dir, 'keys.bin'), 'wb') as f:
+        f.write(b''.join(key for key, _, _ in keys))
+    with open(os.path.join(index_dir, 'names.bin'), 'wb') as f:
+        f.write(''.join(names).encode('utf-8'))
+    with open(os.path.join(index_dir, 'index.json'), 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'places': len(names), 'keys': len(keys),
+                   'depth': depth}, f)
+    return len(names)
+
+
+def _offsets(items):
+    return np.concatenate(([0], np.cumsum([len(item) for item in items], dtype=np.int64)))
+
+
+def _map_bytes(path):
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Gazetteer(object):
+    """Offline place lookups in an index of :func:`build_index`.
+
+    Nothing is read until the first lookup; the index is then
+    memory-mapped, so opening even a gazetteer of millions of places is
+    immediate, and only the pages a lookup touches are read. Names are
+    found by binary search in the sorted normalized names, places near a
+    point by a KD-tree of their unit vectors.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._index = None
+
+    def _load(self):
+        if self._index is not None:
+            return self._index
+        with open(os.path.join(self.index_dir, 'index.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != INDEX_VERSION:
+            raise ValueError("%s is a version %d gazetteer index, rebuild it with build_index()"
+                             % (self.index_dir, meta['version']))
+        index = dict((name, np.load(os.path.join(self.index_dir, name + '.npy'), mmap_mode='r'))
+                     for name in ('lats', 'lngs', 'populations', 'countries', 'key_places',
+                                  'key_offsets', 'name_offsets', 'tree_xyz', 'tree_places'))
+        index['keys'] = _map_bytes(os.path.join(self.index_dir, 'keys.bin'))
+        index['names'] = _map_bytes(os.path.join(self.index_dir, 'names.bin'))
+        index['depth'] = meta['depth']
+        self._index = index
+        return index
+
+    def __len__(self):
+        return len(self._load()['lats'])
+
+    def close(self):
+        if self._index is not None:
+            for blob in (self._index['keys'], self._index['names']):
+                if isinstance(blob, mmap.mmap):
+                    blob.close()
+            self._index = None
+
+    def place(self, place):
+        """The :class:`Place` of a place number."""
+        index = self._load()
+        offsets = index['name_offsets']
+        return Place(index['names'][offsets[place]:offsets[place + 1]].decode('utf-8'),
+                     index['countries'][place].decode('ascii'), float(index['lats'][place]),
+                     float(index['lngs'][place]), int(index['populations'][place]))
+
+    def _first_key(self, key):
+        """Position of the first indexed name not before ``key``."""
+        index = self._load()
+        keys, offsets = index['keys'], index['key_offsets']
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if keys[offsets[middle]:offsets[middle + 1]] < key:
+                lo = middle + 1
+            else:
+                hi = middle
+        return lo
+
+    def _matches(self, key, prefix=False):
+        """Positions of the indexed names equal to (or starting with) ``key``."""
+        index = self._load()
+        keys, offsets = index['keys'], index['key_offsets']
+        position = self._first_key(key)
+        while position < len(offsets) - 1:
+            found = keys[offsets[position]:offsets[position + 1]]
+            if found != key and not (prefix and found.startswith(key)):
+                return
+            yield position
+            position += 1
+
+    def lookup(self, name, country=None, limit=None):
+        """Place numbers named ``name`` (in any case, with or without
+        accents), the most populated first.
+
+        :param country: only places of this ISO country code
+        """
+        index = self._load()
+        key = normalize_name(name).encode('utf-8')
+        places = []
+        for position in self._matches(key):
+            place = int(index['key_places'][position])
+            if country is None or index['countries'][place] == country.upper().encode('ascii'):
+                places.append(place)
+                if limit is not None and len(places) >= limit:
+                    break
+        return places
+
+    def locate(self, name):
+        """``(lat, lng)`` of the most populated place called ``name``, or
+        None. A trailing country code, as in ``'Paris, US'``, restricts the
+        search to that country."""
+        qualified = _COUNTRY_SUFFIX.match(name)
+        places = self.lookup(qualified.group(1), qualified.group(2), 1) if qualified else []
+        places = places or self.lookup(name, limit=1)
+        if not places:
+            return None
+        index = self._load()
+        return float(index['lats'][places[0]]), float(index['lngs'][places[0]])
+
+    def locate_many(self, names):
+        """``{name: (lat, lng) or None}``, each distinct name looked up once."""
+        return dict((name, self.locate(name)) for name in dict.fromkeys(names))
+
+    def complete(self, prefix, limit=10):
+        """Up to ``limit`` :class:`Place` whose names start with ``prefix``,
+        the most populated first."""
+        index = self._load()
+        places = set()
+        for position in self._matches(normalize_name(prefix).encode('utf-8'), prefix=True):
+            places.add(int(index['key_places'][position]))
+        populations = index['populations']
+        places = sorted(places, key=lambda place: (-int(populations[place]), place))
+        return [self.place(place) for place in places[:limit]]
+
+    def nearest(self, lat, lng):
+        """``(place number, distance in meters)`` of the place nearest to a
+        point, or None for an empty gazetteer."""
+        index = self._load()
+        xyz, depth = index['tree_xyz'], index['depth']
+        query = _unit_vectors([lat], [lng])[0]
+        best = [np.inf, -1]
+
+        def visit(lo, hi, level):
+            if lo >= hi:
+                return
+            if level == depth:
+                distances = ((xyz[lo:hi] - query) ** 2).sum(axis=1)
+                closest = int(distances.argmin())
+                if distances[closest] < best[0]:
+                    best[:] = [float(distances[closest]), lo + closest]
+                return
+            middle = (lo + hi) // 2
+            point = xyz[middle]
+            distance = float(((point - query) ** 2).sum())
+            if distance < best[0]:
+                best[:] = [distance, middle]
+            offset = float(query[level % 3] - point[level % 3])
+            near, far = ((lo, middle), (middle + 1, hi)) if offset < 0 else ((middle + 1, hi), (lo, middle))
+            visit(near[0], near[1], level + 1)
+            if offset * offset < best[0]:
+                visit(far[0], far[1], level + 1)
+
+        visit(0, len(xyz), 0)
+        if best[1] < 0:
+            return None
+        chord = math.sqrt(best[0])
+        return int(index['tree_places'][best[1]]), 2 * EARTH_RADIUS_M * math.asin(min(chord / 2, 1.0))
+
+    def reverse(self, lat, lng, max_distance_m=None):
+        """The :class:`Place` nearest to a point, or None when there is none
+        within ``max_distance_m``."""
+        nearest = self.nearest(lat, lng)
+        if nearest is None or (max_distance_m is not None and nearest[1] > max_distance_m):
+            return None
+        return self.place(nearest[0])
+
+    def reverse_many(self, lats, lngs, max_distance_m=None):
+        return [self.reverse(lat, lng, max_distance_m)
+                for lat, lng in zip(np.asarray(lats, dtype=float).tolist(),
+                                    np.asarray(lngs, dtype=float).tolist())]
+
+
+class GazetteerGeocoder(Geocoder):
+    """Offline geocoder backed by a :class:`Gazetteer`, for hosts without
+    network access: ``set_default_geocoder(GazetteerGeocoder('geonames-index'))``.
+
+    :param gazetteer: a :class:`Gazetteer` or the directory of its index
+    """
+
+    def __init__(self, gazetteer, cache=None):
+        self.gazetteer = gazetteer if isinstance(gazetteer, Gazetteer) else Gazetteer(gazetteer)
+        self.cache = cache
+
+    def _resolve(self, names):
+        return self.gazetteer.locate_many(names), []
+
+    def reverse(self, lat, lng, max_distance_m=None):
+        """The :class:`Place` nearest to a point (see :meth:`Gazetteer.reverse`)."""
+        return self.gazetteer.reverse(lat, lng, max_distance_m)
+
+    def reverse_many(self, lats, lngs, max_distance_m=None):
+        return self.gazetteer.reverse_many(lats, lngs, max_distance_m)
+
+
+def main(argv):
+    if len(argv) not in (2, 3):
+        print('usage: python -m llplot.gazetteer GEONAMES_TSV INDEX_DIR [MIN_POPULATION]')
+        return 2
+    count = build_index(argv[0], argv[1], min_population=int(argv[2]) if len(argv) > 2 else 0)
+    print('%d places indexed in %s' % (count, argv[1]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,207 @@
+from __future__ import absolute_import
+
+import abc
+import sqlite3
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+GOOGLE_GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class GeocodingError(Exception):
+    """A lookup failed for another reason than the place not existing.
+
+    ``results`` holds whatever a batch lookup did resolve.
+    """
+
+    def __init__(self, message, results=None):
+        super(GeocodingError, self).__init__(message)
+        self.results = results or {}
+
+
+class GeocodeCache(object):
+    """Persistent SQLite cache of geocoding results.
+
+    Entries older than ``ttl`` seconds are ignored, and once the cache holds
+    more than ``max_entries`` the least recently used ones are dropped.
+    Places that do not exist are cached too, as None. The database can be
+    shared by several threads and processes.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS geocode ('
+                             'query TEXT PRIMARY KEY, lat REAL, lng REAL, '
+                             'created REAL NOT NULL, accessed REAL NOT NULL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS geocode_accessed ON geocode (accessed)')
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM geocode').fetchone()[0]
+
+    def get_many(self, queries):
+        """``{query: (lat, lng) or None}`` for the queries found in the cache."""
+        now = time.time()
+        queries = list(queries)
+        found = {}
+        with self._lock, self._db:
+            for start in range(0, len(queries), 500):
+                batch = queries[start:start + 500]
+                rows = self._db.execute(
+                    'SELECT query, lat, lng FROM geocode WHERE created > ? AND query IN (%s)'
+                    % ','.join('?' * len(batch)), [now - self.ttl] + batch)
+                for query, lat, lng in rows:
+                    found[query] = None if lat is None else (lat, lng)
+            self._db.executemany('UPDATE geocode SET accessed = ? WHERE query = ?',
+                                 [(now, query) for query in found])
+        return found
+
+    def put_many(self, results):
+        now = time.time()
+        rows = [(query, None if latlng is None else latlng[0],
+                 None if latlng is None else latlng[1], now, now)
+                for query, latlng in results.items()]
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)', rows)
+            self._db.execute('DELETE FROM geocode WHERE created <= ?', (now - self.ttl,))
+            excess = self._db.execute('SELECT COUNT(*) FROM geocode').fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._db.execute('DELETE FROM geocode WHERE query IN ('
+                                 'SELECT query FROM geocode ORDER BY accessed LIMIT ?)', (excess,))
+
+    def close(self):
+        self._db.close()
+
+
+class Geocoder(abc.ABC):
+    """Base class of geocoders.
+
+    :meth:`geocode_many` looks every distinct name up once, skipping those
+    found in ``cache`` (an optional :class:`GeocodeCache`); subclasses
+    implement :meth:`_resolve` for the others.
+    """
+
+    cache = None
+
+    @abc.abstractmethod
+    def _resolve(self, names):
+        """Look ``names`` up.
+
+        :return: ``({name: (lat, lng) or None}, [error message per failed name])``
+        """
+
+    def geocode(self, location_string):
+        """``(lat, lng)`` of a place, or None when it can not be found."""
+        return self.geocode_many([location_string])[location_string]
+
+    def geocode_many(self, location_strings):
+        """Geocode many places, each distinct name only once.
+
+        Cached names are not looked up again; the others are resolved and
+        added to the cache.
+
+        :return: ``{name: (lat, lng) or None}``
+        :raises GeocodingError: if some lookups failed; the error's
+            ``results`` has the names that were resolved
+        """
+        names = list(dict.fromkeys(location_strings))
+        results = self.cache.get_many(names) if self.cache is not None else {}
+        missing = [name for name in names if name not in results]
+        resolved, errors = self._resolve(missing) if missing else ({}, [])
+        if self.cache is not None and resolved:
+            self.cache.put_many(resolved)
+        results.update(resolved)
+        if errors:
+            raise GeocodingError('%d of %d lookups failed:\n%s'
+                                 % (len(errors), len(names), '\n'.join(errors)), results)
+        return results
+
+
+class GoogleGeocoder(Geocoder):
+    """Google geocoding client with a pooled HTTP session.
+
+    Requests time out after ``timeout`` seconds and are retried ``retries``
+    times with exponential backoff on connection errors and 429/5xx answers.
+    :meth:`geocode_many` resolves up to ``max_workers`` names in parallel.
+
+    :param url: the geocoding endpoint, e.g. a local stand-in server in tests
+    :param cache: an optional :class:`GeocodeCache`
+    """
+
+    def __init__(self, apikey=None, url=GOOGLE_GEOCODE_URL, cache=None, timeout=10,
+                 retries=3, max_workers=8):
+        self.apikey = apikey
+        self.url = url
+        self.cache = cache
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers,
+                              max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _lookup(self, location_string):
+        params = {'address': location_string}
+        if self.apikey:
+            params['key'] = self.apikey
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        geocode = response.json()
+        status = geocode.get('status', 'OK')
+        if status == 'ZERO_RESULTS' or (status == 'OK' and not geocode.get('results')):
+            return None
+        if status != 'OK':
+            raise GeocodingError('Geocoding "%s" failed: %s %s' % (
+                location_string, status, geocode.get('error_message', '')))
+        latlng_dict = geocode['results'][0]['geometry']['location']
+        return latlng_dict['lat'], latlng_dict['lng']
+
+    def _resolve(self, names):
+        """Request the names concurrently."""
+        resolved, errors = {}, []
+        with ThreadPoolExecutor(min(self.max_workers, len(names))) as pool:
+            futures = [(name, pool.submit(self._lookup, name)) for name in names]
+            for name, future in futures:
+                try:
+                    resolved[name] = future.result()
+                except (GeocodingError, requests.RequestException, ValueError) as error:
+                    errors.append('%s: %s' % (name, error))
+        return resolved, errors
+
+
+_default_geocoder = None
+
+
+def get_default_geocoder():
+    """The geocoder used by :meth:`LeafletPlotter.geocode` and friends."""
+    global _default_geocoder
+    if _default_geocoder is None:
+        _default_geocoder = GoogleGeocoder()
+    return _default_geocoder
+
+
+def set_default_geocoder(geocoder):
+    """Replace the default geocoder, e.g. with one that has a cache."""
+    global _default_geocoder
+    _default_geocoder = geocoder
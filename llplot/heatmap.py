@@ -0,0 +1,131 @@
+from __future__ import absolute_import
+
+import numpy as np
+
+from llplot.clustering import MAX_LATITUDE
+from llplot.layers import as_array
+from llplot.simplify import EARTH_RADIUS_M
+
+
+CELL_SHAPES = ('square', 'hex')
+
+SQRT3 = np.sqrt(3.0)
+# Cell indices are packed in one int64 key, 32 bits each, shifted to be non
+# negative; the offset leaves the sign bit of the key clear.
+KEY_OFFSET = 1 << 30
+KEY_MASK = (1 << 32) - 1
+
+
+def to_mercator(lats, lngs):
+    """Web Mercator (EPSG:3857) x/y in meters."""
+    lats = np.radians(np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE))
+    x = EARTH_RADIUS_M * np.radians(lngs)
+    y = EARTH_RADIUS_M * np.log(np.tan(np.pi / 4 + lats / 2))
+    return x, y
+
+
+def from_mercator(x, y):
+    lngs = np.degrees(x / EARTH_RADIUS_M)
+    lats = np.degrees(2 * np.arctan(np.exp(y / EARTH_RADIUS_M)) - np.pi / 2)
+    return lats, lngs
+
+
+def _hex_round(q, r):
+    """Round fractional axial hex coordinates to the containing hexagon."""
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def cell_indices(x, y, cell_size, shape):
+    """Integer cell coordinates of Web Mercator points.
+
+    Square cells are ``cell_size`` meters wide; hexagons (pointy top) have a
+    ``cell_size`` meters circumradius.
+    """
+    if shape == 'square':
+        return (np.floor(x / cell_size).astype(np.int64),
+                np.floor(y / cell_size).astype(np.int64))
+    if shape == 'hex':
+        return _hex_round((SQRT3 / 3 * x - y / 3) / cell_size, (2.0 / 3 * y) / cell_size)
+    raise ValueError("cell shape must be one of %s, not %r" % (CELL_SHAPES, shape))
+
+
+def cell_centers(i, j, cell_size, shape):
+    """Web Mercator x/y of the centers of the cells given by :func:`cell_indices`."""
+    if shape == 'square':
+        return (i + 0.5) * cell_size, (j + 0.5) * cell_size
+    return cell_size * SQRT3 * (i + j / 2.0), cell_size * 1.5 * j
+
+
+def pack_cells(i, j):
+    """One int64 key per cell given by :func:`cell_indices`.
+
+    :raises ValueError: if an index does not fit in a key, i.e. the cells
+        are far too small for the extent of the points
+    """
+    for indices in (i, j):
+        if len(indices) and (indices.min() < -KEY_OFFSET or indices.max() >= KEY_OFFSET):
+            raise ValueError("cells too small: their indices must be within +/-2**30, "
+                             "use a larger cell_size")
+    return ((i + KEY_OFFSET) << 32) | ((j + KEY_OFFSET) & KEY_MASK)
+
+
+class HeatmapLayer(object):
+    """Points of a heatmap, aggregated into square or hexagonal cells.
+
+    Only the cell keys and summed weights are kept, so memory and the size
+    of the page grow with the number of non empty cells, not with the number
+    of points. :meth:`add` can be called repeatedly, e.g. once per chunk of
+    a big file.
+    """
+
+    def __init__(self, cell_size, shape='square'):
+        if shape not in CELL_SHAPES:
+            raise ValueError("cell shape must be one of %s, not %r" % (CELL_SHAPES, shape))
+        if not cell_size > 0:
+            raise ValueError("cell_size must be positive, got %r" % (cell_size,))
+        self.cell_size = float(cell_size)
+        self.shape = shape
+        self.keys = np.empty(0, dtype=np.int64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.points = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, lats, lngs, weights=None):
+        lats = as_array(lats)
+        lngs = as_array(lngs)
+        if len(lats) != len(lngs):
+            raise ValueError("lats and lngs must have the same length (%d != %d)"
+                             % (len(lats), len(lngs)))
+        if weights is None:
+            weights = np.ones(len(lats))
+        else:
+            weights = as_array(weights)
+            if len(weights) != len(lats):
+                raise ValueError("expected %d weights, got %d" % (len(lats), len(weights)))
+        i, j = cell_indices(*to_mercator(lats, lngs), cell_size=self.cell_size, shape=self.shape)
+        keys = pack_cells(i, j)
+        keys, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+        self.weights = np.bincount(inverse.reshape(-1),
+                                   weights=np.concatenate((self.weights, weights)))
+        self.keys = keys
+        self.points += len(lats)
+
+    def keep(self, mask):
+        """Drop the cells where ``mask`` is False."""
+        self.keys = self.keys[mask]
+        self.weights = self.weights[mask]
+
+    def centers(self):
+        """Latitudes and longitudes of the centers of the non empty cells."""
+        i = (self.keys >> 32) - KEY_OFFSET
+        j = (self.keys & KEY_MASK) - KEY_OFFSET
+        return from_mercator(*cell_centers(i, j, self.cell_size, self.shape))
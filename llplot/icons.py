@@ -0,0 +1,131 @@
+from __future__ import absolute_import
+
+import base64
+import struct
+import zlib
+
+from functools import lru_cache
+
+import numpy as np
+
+
+ICON_WIDTH = 21
+ICON_HEIGHT = 34
+ICON_MODES = ('url', 'inline', 'sprite')
+
+# Pins of colors that are not hex codes.
+DEFAULT_PIN_COLOR = 'FF0000'
+
+_SUPERSAMPLING = 4
+
+
+def parse_hex(color):
+    """``(r, g, b)`` of a '#RRGGBB', 'RRGGBB' or '#RGB' color."""
+    value = color.lstrip('#')
+    if len(value) == 3:
+        value = ''.join(c * 2 for c in value)
+    try:
+        if len(value) != 6:
+            raise ValueError
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise ValueError("Can not make a marker icon for color %r" % (color,))
+
+
+def icon_key(color):
+    """The name of the icon of a marker color in the page: a hex code
+    without its '#', any other name as it is."""
+    return color[1:] if color.startswith('#') else color
+
+
+def pin_color(color):
+    """``color`` if it is a hex code, else :data:`DEFAULT_PIN_COLOR`."""
+    try:
+        parse_hex(color)
+    except ValueError:
+        return DEFAULT_PIN_COLOR
+    return color
+
+
+def _coverage():
+    """Antialiased alpha of the pin outline, of its inner part, and of the
+    dot in its head, as float arrays of shape (height, width)."""
+    s = _SUPERSAMPLING
+    y, x = np.mgrid[0:ICON_HEIGHT * s, 0:ICON_WIDTH * s]
+    x = (x + 0.5) / s
+    y = (y + 0.5) / s
+    cx, cy, radius = ICON_WIDTH / 2.0, 10.0, 9.8
+
+    def pin(margin):
+        head = np.hypot(x - cx, y - cy) <= radius - margin
+        # The tail narrows from the head to a point at the bottom.
+        half_width = (radius - margin) * (ICON_HEIGHT - y) / (ICON_HEIGHT - cy) * 0.75
+        tail = (y >= cy) & (np.abs(x - cx) <= half_width - margin * 0.5)
+        return head | tail
+
+    def downsample(mask):
+        return mask.reshape(ICON_HEIGHT, s, ICON_WIDTH, s).mean(axis=(1, 3))
+
+    dot = np.hypot(x - cx, y - cy) <= 3.2
+    return downsample(pin(0)), downsample(pin(1.2)), downsample(dot)
+
+
+_OUTLINE, _FILL, _DOT = _coverage()
+
+
+def pin_pixels(color):
+    """RGBA pixels (uint8, height x width x 4) of a pin of ``color``."""
+    rgb = np.array(parse_hex(color), dtype=np.float64)
+    dark = rgb * 0.6
+    pixels = np.empty((ICON_HEIGHT, ICON_WIDTH, 4))
+    # Darker border, the color inside and a darker dot in the head.
+    body = dark + (rgb - dark) * _FILL[..., None]
+    pixels[..., :3] = body + (dark * 0.7 - body) * _DOT[..., None]
+    pixels[..., 3] = 255 * _OUTLINE
+    return np.round(pixels).astype(np.uint8)
+
+
+def encode_png(pixels):
+    """PNG file content of an RGBA uint8 array."""
+    height, width = pixels.shape[:2]
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    rows = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape(height, width * 4)
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows.tobytes(), 9))
+            + chunk(b'IEND', b''))
+
+
+@lru_cache(maxsize=1024)
+def _pin_png(color):
+    return encode_png(pin_pixels(color))
+
+
+def pin_png(color):
+    """PNG of a marker pin of any ``color``, generated once per color."""
+    return _pin_png('#%02X%02X%02X' % parse_hex(color))
+
+
+def data_uri(png):
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
+
+def sprite_sheet(colors):
+    """One PNG with the pins of all ``colors`` side by side (the default
+    pin for those that are not hex codes).
+
+    :return: ``(png, offsets)`` where ``offsets[color]`` is the x position of
+        the pin of that color in the sheet
+    """
+    colors = list(colors)
+    sheet = np.zeros((ICON_HEIGHT, ICON_WIDTH * max(len(colors), 1), 4), dtype=np.uint8)
+    offsets = {}
+    for i, color in enumerate(colors):
+        sheet[:, i * ICON_WIDTH:(i + 1) * ICON_WIDTH] = pin_pixels(pin_color(color))
+        offsets[color] = i * ICON_WIDTH
+    return encode_png(sheet), offsets
@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+
+import io
+import itertools
+import os
+
+import numpy as np
+
+
+FORMATS = ('csv', 'npy', 'binary', 'parquet')
+DEFAULT_CHUNK_ROWS = 1 << 18
+_EXTENSIONS = {
+    '.csv': 'csv', '.tsv': 'csv', '.txt': 'csv',
+    '.npy': 'npy',
+    '.bin': 'binary', '.dat': 'binary', '.raw': 'binary',
+    '.parquet': 'parquet', '.pq': 'parquet',
+}
+
+
+def detect_format(path):
+    """The format of a file, from its extension."""
+    extension = os.path.splitext(os.fspath(path))[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError("can not tell the format of %s, pass format= (one of %s)"
+                         % (path, ', '.join(FORMATS)))
+    return _EXTENSIONS[extension]
+
+
+def read_chunks(path, columns, text=(), chunk_rows=DEFAULT_CHUNK_ROWS, format=None,
+                delimiter=None, header=True, dtype=None):
+    """Read some columns of a file, ``chunk_rows`` rows at a time.
+
+    Only one chunk is in memory at any time. NPY files and raw binary records
+    are memory-mapped, and their chunks are views of the file; CSV files are
+    parsed by numpy's C reader, a chunk of lines at a time; Parquet files are
+    read by row batches with the optional ``pyarrow``.
+
+    :param columns: column names (of the CSV header line, the fields of a
+        structured array, the Parquet schema) or positions
+    :param text: those of ``columns`` holding text (colors, titles), read as
+        strings instead of numbers
+    :param format: one of :data:`FORMATS`, from the extension by default
+    :param delimiter: of CSV files; a tab for .tsv files, else a comma
+    :param header: whether CSV files start with a line of column names
+    :param dtype: the numpy dtype of the records of a raw binary file
+    :return: iterator of dicts mapping every column to an array
+    """
+    format = format or detect_format(path)
+    if format == 'csv':
+        if delimiter is None:
+            delimiter = '\t' if os.fspath(path).endswith('.tsv') else ','
+        return _csv_chunks(path, columns, text, chunk_rows, delimiter, header)
+    if format == 'npy':
+        return _array_chunks(np.load(path, mmap_mode='r'), columns, chunk_rows)
+    if format == 'binary':
+        if dtype is None:
+            raise ValueError("reading raw binary records needs their dtype")
+        return _array_chunks(np.memmap(path, dtype=dtype, mode='r'), columns, chunk_rows)
+    if format == 'parquet':
+        return _parquet_chunks(path, columns, chunk_rows)
+    raise ValueError("format must be one of %s, got %r" % (', '.join(FORMATS), format))
+
+
+def _array_chunks(array, columns, chunk_rows):
+    if array.dtype.names is None and array.ndim != 2:
+        raise ValueError("expected a structured array or a 2-D array, got shape %r" % (array.shape,))
+    for start in range(0, len(array), chunk_rows):
+        chunk = array[start:start + chunk_rows]
+        if array.dtype.names is None:
+            yield dict((column, chunk[:, column]) for column in columns)
+        else:
+            yield dict((column, chunk[column if isinstance(column, str) else array.dtype.names[column]])
+                       for column in columns)
+
+
+def _csv_chunks(path, columns, text, chunk_rows, delimiter, header):
+    with io.open(path, encoding='utf-8') as f:
+        names = []
+        if header:
+            names = [name.strip().strip('"') for name in f.readline().rstrip('\r\n').split(delimiter)]
+        positions = []
+        for column in columns:
+            if isinstance(column, str):
+                if column not in names:
+                    raise ValueError("no column %r in %s" % (column, path))
+                column = names.index(column)
+            positions.append(column)
+        numbers = [(column, position) for column, position in zip(columns, positions) if column not in text]
+        strings = [(column, position) for column, position in zip(columns, positions) if column in text]
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            chunk = {}
+            for selected, dtype in ((numbers, np.float64), (strings, str)):
+                if not selected:
+                    continue
+                values = np.loadtxt(lines, dtype=dtype, delimiter=delimiter,
+                                    usecols=[position for _, position in selected],
+                                    comments=None, quotechar='"', ndmin=2)
+                for i, (column, _) in enumerate(selected):
+                    chunk[column] = values[:, i]
+            yield chunk
+
+
+def _parquet_chunks(path, columns, chunk_rows):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("reading Parquet files needs pyarrow: pip install llplot[parquet]")
+    parquet = pq.ParquetFile(path)
+    names = [column if isinstance(column, str) else parquet.schema_arrow.names[column]
+             for column in columns]
+    for batch in parquet.iter_batches(batch_size=chunk_rows, columns=sorted(set(names))):
+        yield dict((column, batch.column(batch.schema.get_field_index(name)).to_numpy(zero_copy_only=False))
+                   for column, name in zip(columns, names))
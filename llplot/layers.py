@@ -0,0 +1,293 @@
+from __future__ import absolute_import
+
+import numpy as np
+
+
+DEFAULT_TITLE = "no implementation"
+SYMBOL_SHAPES = ('o', 'x', '+')
+
+
+def as_array(values, dtype=np.float64):
+    """Return ``values`` as a 1-D numpy array of ``dtype``.
+
+    numpy arrays and objects exporting the buffer protocol (``array.array``,
+    ``memoryview``, ...) are wrapped without copying whenever the dtype
+    already matches. Scalars become one-element arrays and plain iterators
+    are consumed once.
+    """
+    if not isinstance(values, np.ndarray) and not hasattr(values, '__len__'):
+        try:
+            memoryview(values)
+        except TypeError:
+            if hasattr(values, '__iter__'):
+                return np.fromiter(values, dtype=dtype)
+    array = np.asarray(values, dtype=dtype)
+    if array.ndim != 1:
+        array = array.reshape(-1)
+    return array
+
+
+def as_path(lats, lngs, dtype=np.float64):
+    """Stack ``lats`` and ``lngs`` into an ``(n, 2)`` array of vertices."""
+    lats = as_array(lats, dtype)
+    lngs = as_array(lngs, dtype)
+    if len(lats) != len(lngs):
+        raise ValueError("lats and lngs must have the same length (%d != %d)"
+                         % (len(lats), len(lngs)))
+    path = np.empty((len(lats), 2), dtype=dtype)
+    path[:, 0] = lats
+    path[:, 1] = lngs
+    return path
+
+
+class Column(object):
+    """Append-only numpy column with amortised O(1) growth.
+
+    ``version`` changes whenever the values do, for caches built over them.
+    """
+
+    def __init__(self, dtype, capacity=16):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+        self.version = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def data(self):
+        """View of the filled part of the column (not a copy)."""
+        return self._data[:self._size]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= len(self._data):
+            return
+        capacity = max(needed, 2 * len(self._data))
+        data = np.empty(capacity, dtype=self._data.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+    def append(self, value):
+        self._reserve(1)
+        self._data[self._size] = value
+        self._size += 1
+        self.version += 1
+
+    def extend(self, values):
+        self._reserve(len(values))
+        self._data[self._size:self._size + len(values)] = values
+        self._size += len(values)
+        self.version += 1
+
+    def keep(self, mask, start=0):
+        """Drop the values from ``start`` on where ``mask`` is False."""
+        kept = self._data[start:self._size][mask]
+        self._data[start:start + len(kept)] = kept
+        self._size = start + len(kept)
+        self.version += 1
+
+
+class Interner(object):
+    """Maps values to small integer codes, in order of first appearance.
+
+    ``normalize`` is applied once per distinct raw value (e.g. to turn
+    "r" into "#FF0000"); raw values that normalize to the same thing share
+    a code.
+    """
+
+    def __init__(self, normalize=None):
+        self.values = []
+        self._normalize = normalize
+        self._codes = {}
+        self._raw_codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        try:
+            return self._raw_codes[value]
+        except KeyError:
+            pass
+        key = self._normalize(value) if self._normalize else value
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(key)
+        self._raw_codes[value] = code
+        return code
+
+    def codes(self, values):
+        """Vectorised :meth:`code` for a sequence of values."""
+        uniques, first, inverse = np.unique(np.asarray(values), return_index=True,
+                                            return_inverse=True)
+        lookup = np.empty(len(uniques), dtype=np.int32)
+        for i in np.argsort(first):
+            lookup[i] = self.code(uniques[i].item())
+        return lookup[inverse.reshape(-1)]
+
+
+class PointLayer(object):
+    """Columnar storage for markers.
+
+    Coordinates are kept in ``lats``/``lngs`` columns of the plotter's
+    coordinate dtype, colors and titles as int32 codes into
+    ``color_table``/``title_table``.
+    """
+
+    def __init__(self, dtype=np.float64, normalize_color=None):
+        self.lats = Column(dtype)
+        self.lngs = Column(dtype)
+        self.colors = Column(np.int32)
+        self.titles = Column(np.int32)
+        self.color_table = Interner(normalize_color)
+        self.title_table = Interner()
+        self.title_table.code(DEFAULT_TITLE)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def append(self, lat, lng, color, title=DEFAULT_TITLE):
+        self.lats.append(lat)
+        self.lngs.append(lng)
+        self.colors.append(self.color_table.code(color))
+        self.titles.append(self.title_table.code(title))
+
+    def extend(self, lats, lngs, color, title=DEFAULT_TITLE):
+        """Add many points at once.
+
+        ``color`` and ``title`` may be a single value shared by all points
+        or a sequence with one value per point.
+        """
+        lats = as_array(lats, self.lats.dtype)
+        lngs = as_array(lngs, self.lngs.dtype)
+        if len(lats) != len(lngs):
+            raise ValueError("lats and lngs must have the same length (%d != %d)"
+                             % (len(lats), len(lngs)))
+        colors = self._codes(self.color_table, color, len(lats))
+        titles = self._codes(self.title_table, title, len(lats))
+        self.lats.extend(lats)
+        self.lngs.extend(lngs)
+        self.colors.extend(colors)
+        self.titles.extend(titles)
+
+    @staticmethod
+    def _codes(table, values, size):
+        if isinstance(values, str) or not hasattr(values, '__len__'):
+            return np.full(size, table.code(values), dtype=np.int32)
+        if len(values) != size:
+            raise ValueError("expected %d values, got %d" % (size, len(values)))
+        return table.codes(values)
+
+    def keep(self, mask, start=0):
+        """Drop the points from ``start`` on where ``mask`` is False."""
+        for column in (self.lats, self.lngs, self.colors, self.titles):
+            column.keep(mask, start)
+
+    def point(self, index):
+        """The legacy ``(lat, lng, hex color without '#', title)`` tuple."""
+        return (float(self.lats.data[index]), float(self.lngs.data[index]),
+                self.color_table.values[self.colors.data[index]][1:],
+                self.title_table.values[self.titles.data[index]])
+
+
+class SymbolLayer(object):
+    """Columnar storage for circles and scatter symbols.
+
+    Centers are kept in ``lats``/``lngs`` columns, the radius (or half width
+    of crosses) in meters in ``sizes``, the shape as an index into
+    :data:`SYMBOL_SHAPES` and the Leaflet options as int32 codes into
+    ``style_table``, whose values are sorted ``(option, value)`` tuples.
+    """
+
+    def __init__(self, dtype=np.float64):
+        self.lats = Column(dtype)
+        self.lngs = Column(dtype)
+        self.sizes = Column(np.float64)
+        self.shapes = Column(np.int8)
+        self.styles = Column(np.int32)
+        self.style_table = Interner()
+
+    def __len__(self):
+        return len(self.lats)
+
+    def extend(self, lats, lngs, sizes, shape, options):
+        """Add many symbols of one ``shape`` and one style.
+
+        ``sizes`` may be a single value or one value per symbol.
+        """
+        if shape not in SYMBOL_SHAPES:
+            raise ValueError("unknown symbol %r, expected one of %s" % (shape, ', '.join(SYMBOL_SHAPES)))
+        lats = as_array(lats, self.lats.dtype)
+        lngs = as_array(lngs, self.lngs.dtype)
+        if len(lats) != len(lngs):
+            raise ValueError("lats and lngs must have the same length (%d != %d)"
+                             % (len(lats), len(lngs)))
+        sizes = as_array(sizes, np.float64)
+        if len(sizes) == 1:
+            sizes = np.full(len(lats), sizes[0])
+        elif len(sizes) != len(lats):
+            raise ValueError("expected %d sizes, got %d" % (len(lats), len(sizes)))
+        style = self.style_table.code(tuple(sorted(options.items())))
+        self.lats.extend(lats)
+        self.lngs.extend(lngs)
+        self.sizes.extend(sizes)
+        self.shapes.extend(np.full(len(lats), SYMBOL_SHAPES.index(shape), dtype=np.int8))
+        self.styles.extend(np.full(len(lats), style, dtype=np.int32))
+
+    def keep(self, mask, start=0):
+        """Drop the symbols from ``start`` on where ``mask`` is False."""
+        for column in (self.lats, self.lngs, self.sizes, self.shapes, self.styles):
+            column.keep(mask, start)
+
+    def style_options(self):
+        """The style table as Leaflet option dicts."""
+        return [dict(style) for style in self.style_table.values]
+
+
+class PointsView(object):
+    """Read-only, list-like view of a :class:`PointLayer`.
+
+    Kept so code written against the old ``plotter.points`` list of tuples
+    keeps working; tuples are only built when they are accessed.
+    """
+
+    def __init__(self, layer):
+        self._layer = layer
+
+    def __len__(self):
+        return len(self._layer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._layer.point(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("point index out of range")
+        return self._layer.point(index)
+
+    def __iter__(self):
+        layer = self._layer
+        colors = [color[1:] for color in layer.color_table.values]
+        titles = layer.title_table.values
+        for lat, lng, color, title in zip(layer.lats.data.tolist(),
+                                          layer.lngs.data.tolist(),
+                                          layer.colors.data.tolist(),
+                                          layer.titles.data.tolist()):
+            yield lat, lng, colors[color], titles[title]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return 'PointsView(%d points)' % len(self)
+
+    def append(self, point):
+        lat, lng, color, title = point
+        self._layer.append(lat, lng, '#' + color, title)
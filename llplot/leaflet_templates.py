@@ -0,0 +1,409 @@
+# Generic loops used by draw(compact=True). Each one receives a single JSON
+# payload per layer and builds the Leaflet objects client side, so the page
+# size grows with the data only, not with the amount of JavaScript per feature.
+
+# Written once by write_map(). ``llLatLngs`` turns the coordinates of a
+# feature into Leaflet latlngs: either a flat [lat, lng, lat, lng, ...] list
+# or a string encoded with Google's polyline algorithm at ``precision``
+# decimals (decoded with plain arithmetic, bitwise operators would overflow
+# 32 bits above 6 decimals).
+COORDINATE_HELPERS = """
+		function llLatLngs(coords, precision) {
+			var result = [], i;
+			if (typeof coords !== 'string') {
+				for (i = 0; i < coords.length; i += 2) result.push([coords[i], coords[i + 1]]);
+				return result;
+			}
+			var factor = Math.pow(10, precision), values = [0, 0], k = 0;
+			for (i = 0; i < coords.length;) {
+				var value = 0, scale = 1, chunk;
+				do {
+					chunk = coords.charCodeAt(i++) - 63;
+					value += (chunk % 32) * scale;
+					scale *= 32;
+				} while (chunk >= 32);
+				values[k] += value % 2 ? -(value + 1) / 2 : value / 2;
+				if (k === 1) result.push([values[0] / factor, values[1] / factor]);
+				k = 1 - k;
+			}
+			return result;
+		}
+"""
+
+# Marker icons, written once per page: ``llIcons[color]`` is the one icon
+# shared by every marker of that color. The payload maps colors to urls.
+ICONS = """
+		var llIcons = {{}};
+		(function (urls) {{
+			for (var key in urls) llIcons[key] = new MarkerIcon({{iconUrl: urls[key]}});
+		}})({payload});
+"""
+
+# Same as ICONS from a single sprite sheet: every color is a div icon showing
+# the sheet at its own ``offsets[color]``.
+SPRITE_ICONS = """
+		var llIcons = {{}};
+		(function (data) {{
+			var style = document.createElement('style');
+			style.textContent = '.llplot-pin div {{width: {width}px; height: {height}px; ' +
+				'background-image: url(' + data.sheet + ');}}';
+			document.head.appendChild(style);
+			for (var key in data.offsets) {{
+				llIcons[key] = L.divIcon({{
+					className: 'llplot-pin', iconSize: [{width}, {height}], iconAnchor: [22, 34],
+					popupAnchor: [-11, -34],
+					html: '<div style="background-position: -' + data.offsets[key] + 'px 0"></div>'}});
+			}}
+		}})({payload});
+"""
+
+POINTS_LOOP = """
+		(function (data) {{
+			var icons = data.icons.map(function (key) {{ return llIcons[key]; }});
+			for (var i = 0; i < data.lat.length; i++) {{
+				var title = data.titles[data.title[i]];
+				var marker = L.marker([data.lat[i], data.lng[i]], {{title: title, icon: icons[data.icon[i]]}});
+				if (data.title[i] !== 0) marker.bindPopup(title);
+				marker.addTo(llMap);
+			}}
+		}})({payload});
+"""
+
+CIRCLES_LOOP = """
+		(function (data) {{
+			for (var i = 0; i < data.lat.length; i++) {{
+				L.circle([data.lat[i], data.lng[i]], data.radius[i], data.styles[data.style[i]]).addTo(llMap);
+			}}
+		}})({payload});
+"""
+
+# Circles and scatter symbols, all drawn by one shared canvas renderer instead
+# of one SVG element each (kept on the map, so live updates reuse it). Sizes
+# are in meters: the radius of 'o' circles and the half length of the
+# strokes of 'x' and '+' crosses.
+SYMBOLS_LOOP = """
+		(function (data) {{
+			var renderer = llMap.llCanvas || (llMap.llCanvas = L.canvas({{padding: 0.5}}));
+			var styles = data.styles.map(function (style) {{ style.renderer = renderer; return style; }});
+			var degrees = 180 / Math.PI / {earth_radius};
+			for (var i = 0; i < data.lat.length; i++) {{
+				var lat = data.lat[i], lng = data.lng[i], style = styles[data.style[i]];
+				var shape = data.shapes[data.shape[i]];
+				if (shape === 'o') {{
+					style.radius = data.size[i];
+					L.circle([lat, lng], style).addTo(llMap);
+					continue;
+				}}
+				var dLat = data.size[i] * degrees, dLng = dLat / Math.cos(lat * Math.PI / 180), lines;
+				if (shape === 'x') {{
+					dLat /= Math.SQRT2;
+					dLng /= Math.SQRT2;
+					lines = [[[lat - dLat, lng - dLng], [lat + dLat, lng + dLng]],
+					         [[lat - dLat, lng + dLng], [lat + dLat, lng - dLng]]];
+				}} else {{
+					lines = [[[lat, lng - dLng], [lat, lng + dLng]], [[lat - dLat, lng], [lat + dLat, lng]]];
+				}}
+				L.polyline(lines, style).addTo(llMap);
+			}}
+		}})({payload});
+"""
+
+# ``kind`` is the Leaflet factory ("polyline" or "polygon"); each feature is
+# ``[style index, coordinates]`` or, for encoded coordinates,
+# ``[style index, encoded string, precision]``.
+FEATURES_LOOP = """
+		(function (data) {{
+			for (var i = 0; i < data.features.length; i++) {{
+				var feature = data.features[i];
+				L.{kind}(llLatLngs(feature[1], feature[2]), data.styles[feature[0]]).addTo(llMap);
+			}}
+		}})({payload});
+"""
+
+# Server-side marker clusters. ``data.levels[z - data.minZoom]`` holds the
+# clusters of zoom ``z`` (``single`` lists the points that are not merged
+# with any other); above ``data.maxZoom`` the raw points are shown.
+# Only features inside the (padded) viewport are added to the map, and the
+# layer is rebuilt on moveend, which Leaflet also fires after every zoomend.
+CLUSTERS_LOOP = """
+		(function (data) {{
+			var icons = data.points.icons.map(function (key) {{ return llIcons[key]; }});
+			var group = L.layerGroup().addTo(llMap);
+			function pointMarker(i) {{
+				var points = data.points, title = points.titles[points.title[i]];
+				var marker = L.marker([points.lat[i], points.lng[i]], {{title: title, icon: icons[points.icon[i]]}});
+				if (points.title[i] !== 0) marker.bindPopup(title);
+				return marker;
+			}}
+			function clusterMarker(lat, lng, count) {{
+				var size = count < 100 ? 30 : count < 10000 ? 40 : 50;
+				var icon = L.divIcon({{
+					className: 'llplot-cluster',
+					iconSize: [size, size],
+					html: '<div style="width:' + size + 'px;height:' + size + 'px;line-height:' + size +
+						'px;border-radius:50%;text-align:center;font:12px sans-serif;' +
+						'background:rgba(49,130,189,0.7);color:#fff">' + count + '</div>'
+				}});
+				return L.marker([lat, lng], {{icon: icon}}).on('click', function () {{
+					llMap.setView([lat, lng], Math.round(llMap.getZoom()) + 1);
+				}});
+			}}
+			function render() {{
+				var zoom = Math.max(Math.round(llMap.getZoom()), data.minZoom);
+				var bounds = llMap.getBounds().pad(0.25), i;
+				group.clearLayers();
+				if (zoom > data.maxZoom) {{
+					for (i = 0; i < data.points.lat.length; i++) {{
+						if (bounds.contains([data.points.lat[i], data.points.lng[i]])) group.addLayer(pointMarker(i));
+					}}
+					return;
+				}}
+				var level = data.levels[zoom - data.minZoom], points = data.points;
+				for (i = 0; i < level.lat.length; i++) {{
+					if (bounds.contains([level.lat[i], level.lng[i]])) {{
+						group.addLayer(clusterMarker(level.lat[i], level.lng[i], level.count[i]));
+					}}
+				}}
+				for (i = 0; i < level.single.length; i++) {{
+					var p = level.single[i];
+					if (bounds.contains([points.lat[p], points.lng[p]])) group.addLayer(pointMarker(p));
+				}}
+			}}
+			llMap.on('moveend', render);
+			render();
+		}})({payload});
+"""
+
+# Paths with several levels of detail. Each feature is ``[style index, kind,
+# zooms, coordinates of each level, precision]``; the level used is the one
+# of the highest zoom not above the current one (the coarsest below the first).
+LOD_LOOP = """
+		(function (data) {{
+			function level(zooms, zoom) {{
+				var i = 0;
+				while (i + 1 < zooms.length && zooms[i + 1] <= zoom) i++;
+				return i;
+			}}
+			var features = data.features.map(function (feature) {{
+				var current = level(feature[2], llMap.getZoom());
+				var layer = L[feature[1]](llLatLngs(feature[3][current], feature[4]), data.styles[feature[0]]);
+				layer.addTo(llMap);
+				return {{zooms: feature[2], levels: feature[3], precision: feature[4], layer: layer, current: current}};
+			}});
+			llMap.on('zoomend', function () {{
+				var zoom = llMap.getZoom();
+				features.forEach(function (feature) {{
+					var i = level(feature.zooms, zoom);
+					if (i !== feature.current) {{
+						feature.current = i;
+						feature.layer.setLatLngs(llLatLngs(feature.levels[i], feature.precision));
+					}}
+				}});
+			}});
+		}})({payload});
+"""
+
+# Heatmap of aggregated cells, drawn by the Leaflet.heat plugin. Leaflet.heat
+# has no layer opacity option, so it is set on the canvas it creates. When
+# not dissipating the radius follows the zoom, like a distance on the ground.
+HEATMAP_LOOP = """
+		(function (data) {{
+			var latlngs = [];
+			for (var i = 0; i < data.lat.length; i++) latlngs.push([data.lat[i], data.lng[i], data.weight[i]]);
+			var heat = L.heatLayer(latlngs, data.options).addTo(llMap);
+			if (heat._canvas) heat._canvas.style.opacity = data.opacity;
+			if (!data.dissipating) {{
+				var zoom = llMap.getZoom();
+				llMap.on('zoomend', function () {{
+					heat.setOptions({{radius: data.options.radius * Math.pow(2, llMap.getZoom() - zoom)}});
+				}});
+			}}
+		}})({payload});
+"""
+
+# Loader page of draw_tiles(). ``meta`` holds the tables shared by all the
+# tiles (icons, titles, styles); ``{z}/{x}/{y}.json`` tiles of the current
+# zoom (clamped to the tiled range) are fetched as they enter the viewport.
+# Each zoom has its own layer group, only the current one is on the map.
+TILES_LOADER = """
+		(function (meta) {{
+			var icons = meta.icons.map(function (key) {{ return llIcons[key]; }});
+			var groups = {{}}, loaded = {{}};
+			function group(z) {{
+				return groups[z] || (groups[z] = L.layerGroup());
+			}}
+			function addTile(z, tile) {{
+				var g = group(z), i;
+				var points = tile.points, circles = tile.circles;
+				if (points) for (i = 0; i < points.lat.length; i++) {{
+					var title = meta.titles[points.title[i]];
+					var marker = L.marker([points.lat[i], points.lng[i]], {{title: title, icon: icons[points.icon[i]]}});
+					if (points.title[i] !== 0) marker.bindPopup(title);
+					g.addLayer(marker);
+				}}
+				(tile.paths || []).forEach(function (path) {{
+					g.addLayer(L.polyline(llLatLngs(path[1]), meta.pathStyles[path[0]]));
+				}});
+				(tile.shapes || []).forEach(function (shape) {{
+					g.addLayer(L.polygon(llLatLngs(shape[1]), meta.shapeStyles[shape[0]]));
+				}});
+				// Polygons over several tiles: the piece of the fill in this
+				// tile, and the pieces of the outline apart.
+				(tile.fills || []).forEach(function (shape) {{
+					g.addLayer(L.polygon(llLatLngs(shape[1]), L.extend({{}}, meta.shapeStyles[shape[0]], {{stroke: false}})));
+				}});
+				(tile.outlines || []).forEach(function (path) {{
+					g.addLayer(L.polyline(llLatLngs(path[1]), L.extend({{}}, meta.shapeStyles[path[0]], {{fill: false}})));
+				}});
+				if (circles) for (i = 0; i < circles.lat.length; i++) {{
+					g.addLayer(L.circle([circles.lat[i], circles.lng[i]], circles.radius[i],
+						meta.circleStyles[circles.style[i]]));
+				}}
+			}}
+			function update() {{
+				var z = Math.min(Math.max(Math.round(llMap.getZoom()), meta.minZoom), meta.maxZoom);
+				var n = Math.pow(2, z), bounds = llMap.getBounds();
+				for (var key in groups) {{
+					if (+key !== z && llMap.hasLayer(groups[key])) llMap.removeLayer(groups[key]);
+				}}
+				group(z).addTo(llMap);
+				function clamp(v) {{ return Math.min(Math.max(v, 0), n - 1); }}
+				function tileX(lng) {{ return clamp(Math.floor((lng + 180) / 360 * n)); }}
+				function tileY(lat) {{
+					var r = Math.max(Math.min(lat, 85.0511), -85.0511) * Math.PI / 180;
+					return clamp(Math.floor((1 - Math.log(Math.tan(r) + 1 / Math.cos(r)) / Math.PI) / 2 * n));
+				}}
+				for (var x = tileX(bounds.getWest()); x <= tileX(bounds.getEast()); x++) {{
+					for (var y = tileY(bounds.getNorth()); y <= tileY(bounds.getSouth()); y++) {{
+						(function (tile) {{
+							if (loaded[tile]) return;
+							loaded[tile] = true;
+							fetch(tile + '.json').then(function (response) {{
+								return response.ok ? response.json() : null;
+							}}).then(function (data) {{
+								if (data) addTile(z, data);
+							}});
+						}})(z + '/' + x + '/' + y);
+					}}
+				}}
+			}}
+			llMap.on('moveend', update);
+			update();
+		}})({payload});
+"""
+
+# Live pages of draw(live=...). ``url`` is an append-only file of JSON lines,
+# one per flush, polled every ``interval`` milliseconds from the byte offset
+# reached so far (a Range request; servers ignoring it send the whole file,
+# which is then sliced). Only complete lines are read. Each line holds the
+# urls of the new icon colors and, per layer, the payload of the features
+# added since the previous line, built by the same loops as compact pages.
+# Lookup tables only carry their new entries, as ``[first index, entries]``.
+LIVE_LOADER = """
+		(function (url, interval) {{
+			var offset = 0, tables = {{}};
+			function table(name, delta) {{
+				var values = tables[name] || (tables[name] = []);
+				values.length = delta[0];
+				Array.prototype.push.apply(values, delta[1]);
+				return values;
+			}}
+			var layers = {{
+				points: function (data) {{
+					data.icons = table('icons', data.icons);
+					data.titles = table('titles', data.titles);
+{points}
+				}},
+				symbols: function (data) {{
+					data.styles = table('styles', data.styles).map(function (style) {{ return Object.assign({{}}, style); }});
+{symbols}
+				}},
+				circles: function (data) {{
+{circles}
+				}},
+				paths: function (data) {{
+{paths}
+				}},
+				shapes: function (data) {{
+{shapes}
+				}}
+			}};
+			function add(record) {{
+				for (var key in record.icons) {{
+					if (!llIcons[key]) llIcons[key] = new MarkerIcon({{iconUrl: record.icons[key]}});
+				}}
+				for (var name in layers) if (record[name]) layers[name](record[name]);
+			}}
+			function poll() {{
+				fetch(url, {{cache: 'no-store', headers: {{Range: 'bytes=' + offset + '-'}}}}).then(function (response) {{
+					if (!response.ok) return;
+					var partial = response.status === 206;
+					return response.arrayBuffer().then(function (buffer) {{
+						var bytes = new Uint8Array(buffer);
+						if (!partial) bytes = bytes.subarray(offset);
+						var end = bytes.lastIndexOf(10) + 1;
+						if (!end) return;
+						offset += end;
+						new TextDecoder().decode(bytes.subarray(0, end)).split('\\n').forEach(function (line) {{
+							if (line) add(JSON.parse(line));
+						}});
+					}});
+				}}).catch(function () {{}}).then(function () {{
+					setTimeout(poll, interval);
+				}});
+			}}
+			poll();
+		}})({url}, {interval});
+"""
+
+# Pages of draw(binary=...): the columns of the big layers are fetched from
+# ``url``, a file of llplot.binary.write_columns, and viewed in place as
+# typed arrays (little-endian, like every browser), then the same loops as
+# compact pages build the features. Paths and polygons are stored as one
+# coordinate column, the vertex index each one starts at and their styles.
+BINARY_LOADER = """
+		(function (url) {{
+			var types = {{Float32: Float32Array, Float64: Float64Array, Int32: Int32Array}};
+			function features(data) {{
+				var result = [];
+				for (var i = 0; i < data.style.length; i++) {{
+					result.push([data.style[i], data.coords.subarray(2 * data.starts[i], 2 * data.starts[i + 1])]);
+				}}
+				return {{features: result, styles: data.styles}};
+			}}
+			var layers = {{
+				points: function (data) {{
+{points}
+				}},
+				symbols: function (data) {{
+{symbols}
+				}},
+				circles: function (data) {{
+{circles}
+				}},
+				paths: function (data) {{
+					data = features(data);
+{paths}
+				}},
+				shapes: function (data) {{
+					data = features(data);
+{shapes}
+				}}
+			}};
+			fetch(url).then(function (response) {{
+				return response.arrayBuffer();
+			}}).then(function (buffer) {{
+				var view = new DataView(buffer), size = view.getUint32(8, true);
+				var header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, size)));
+				var start = Math.ceil((12 + size) / 8) * 8;
+				for (var name in header) {{
+					var data = header[name];
+					for (var key in data) {{
+						var column = data[key];
+						if (column && column.type) data[key] = new types[column.type](buffer, start + column.offset, column.length);
+					}}
+					layers[name](data);
+				}}
+			}});
+		}})({url});
+"""
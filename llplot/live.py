@@ -0,0 +1,60 @@
+from __future__ import absolute_import
+
+import io
+import os
+
+
+DEFAULT_POLL_INTERVAL = 2.0
+# Features written by the live records, in the order of a record.
+LIVE_LAYERS = ('points', 'symbols', 'circles', 'paths', 'shapes')
+# Layers only written in the page itself.
+STATIC_LAYERS = ('clusters', 'lod_paths', 'heatmap', 'grid')
+
+
+def data_path(htmlfile):
+    """The sidecar data file of a live page: ``map.html`` -> ``map.data.jsonl``."""
+    return os.path.splitext(htmlfile)[0] + '.data.jsonl'
+
+
+class LiveSession(object):
+    """State of a live page written by ``draw(htmlfile, live=...)``.
+
+    ``flushed`` holds, per layer of :data:`LIVE_LAYERS`, how many features
+    were appended to the data file so far, and ``tables`` how many entries
+    of each lookup table (icon colors, titles, symbol styles) the page has.
+    ``icon_mode`` is the ``icons`` argument of the draw: icons of colors that
+    first appear in a flush are inlined unless it is ``'url'``.
+
+    The page polls the data file with ``fetch`` and ``Range`` requests, which
+    browsers do not allow for pages opened from disk (``file://``): it has to
+    be served over HTTP, together with the data file.
+    """
+
+    def __init__(self, htmlfile, interval=DEFAULT_POLL_INTERVAL, icon_mode='url'):
+        self.htmlfile = os.path.abspath(os.fspath(htmlfile))
+        self.data_path = data_path(self.htmlfile)
+        self.interval = interval
+        self.icon_mode = icon_mode
+        self.flushed = dict.fromkeys(LIVE_LAYERS, 0)
+        self.tables = {'icons': 0, 'titles': 0, 'styles': 0}
+        self.icons = set()
+        self.static = {}
+        self.flushes = 0
+        self.bytes_written = 0
+        # Start from an empty data file: the page reads it from the start.
+        io.open(self.data_path, 'w', encoding='utf-8').close()
+
+    @property
+    def url(self):
+        """The data file, relative to the page."""
+        return os.path.basename(self.data_path)
+
+    def table_delta(self, name, values):
+        """``[first index, new entries]`` of a lookup table, for the page."""
+        start = self.tables[name]
+        self.tables[name] = len(values)
+        return [start, list(values[start:])]
+
+    def __repr__(self):
+        return 'LiveSession(%r, %d flushes, %d bytes)' % (self.data_path, self.flushes,
+                                                          self.bytes_written)
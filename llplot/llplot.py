@@ -1,18 +1,41 @@
 from __future__ import absolute_import
 
-import json
+import io
 import math
 import os
-import requests
 import warnings
 
-from collections import namedtuple
+import numpy as np
 
 from llplot.color_dicts import mpl_color_map, html_color_codes
-from llplot.google_maps_templates import SYMBOLS, CIRCLE
-
-
-Symbol = namedtuple('Symbol', ['symbol', 'lat', 'long', 'size'])
+from llplot.clustering import build_cluster_levels
+from llplot.google_maps_templates import CIRCLE
+from llplot.leaflet_templates import (COORDINATE_HELPERS, POINTS_LOOP, CIRCLES_LOOP, FEATURES_LOOP, CLUSTERS_LOOP,
+                                      LOD_LOOP, HEATMAP_LOOP, TILES_LOADER, ICONS, SPRITE_ICONS,
+                                      SYMBOLS_LOOP, LIVE_LOADER, BINARY_LOADER)
+from llplot.icons import (ICON_HEIGHT, ICON_MODES, ICON_WIDTH, data_uri, icon_key, pin_color, pin_png,
+                          sprite_sheet)
+from llplot.layers import (DEFAULT_TITLE, SYMBOL_SHAPES, Column, PointLayer, PointsView, SymbolLayer,
+                           as_array, as_path)
+from llplot.formatting import DEFAULT_PRECISION, CoordinateFormat
+from llplot.geocoding import get_default_geocoder
+from llplot.heatmap import HeatmapLayer
+from llplot.ingest import DEFAULT_CHUNK_ROWS, read_chunks
+from llplot.live import DEFAULT_POLL_INTERVAL, LiveSession
+from llplot.publish import (ASSET_FILES, ASSET_MODES, DEFAULT_CACHE_DIR, LEAFLET_CSS_URL, LEAFLET_HEAT_URL,
+                            LEAFLET_JS_URL, PublishReport, content_name, default_compressions, inline_tag,
+                            link_tag, load_asset, minify as minify_html, write_file)
+from llplot.polyline import ENCODINGS, MAX_PRECISION, encode as encode_polyline
+from llplot.binary import BinaryColumn, write_columns
+from llplot.cache import FRAGMENT_FORMAT, fingerprint
+from llplot.bounds import Bounds, clip_path, clip_polygon, path_bounds
+from llplot.styles import Style, StyleTable
+from llplot.stats import measure_layers
+from llplot.spatial import GridIndex, thin_mask
+from llplot.simplify import EARTH_RADIUS_M, SimplifyReport, meters_per_pixel, simplify_path
+from llplot.tiles import TileSet, write_tiles
+from llplot.output import (DEFAULT_BUFFER_SIZE, BufferedWriter, JSON_CHUNK_SIZE, json_values, open_output,
+                           template_parts, to_json, write_json_array)
 
 
 class InvalidSymbolError(Exception):
@@ -27,11 +50,13 @@ def safe_iter(var):
 
 
 DEFAULT_ATTRIBUTION = 'CC-BY-SA. Imagery Mapbox'
+BOUNDED_LAYERS = ('points', 'clusters', 'paths', 'shapes', 'circles', 'symbols', 'heatmap')
+INDEXED_LAYERS = ('points', 'clusters', 'symbols')
 
 class LeafletPlotter(object):
 
     def __init__(self, tile_url, center_lat, center_lng, zoom, apikey='',
-                 attribution=DEFAULT_ATTRIBUTION):
+                 attribution=DEFAULT_ATTRIBUTION, coord_dtype=np.float64):
         self.tile_url = tile_url
         self.center = (float(center_lat), float(center_lng))
         self.zoom = int(zoom)
@@ -40,70 +65,205 @@ class LeafletPlotter(object):
         self.grids = None
         self.paths = []
         self.shapes = []
-        self.points = []
+        self.lod_paths = []
+        self.simplify_reports = []
+        self.coord_dtype = np.dtype(coord_dtype)
+        self.point_layer = PointLayer(self.coord_dtype, self._resolve_color)
+        self.cluster_layer = PointLayer(self.coord_dtype, self._resolve_color)
+        self.cluster_options = {'radius': 60, 'min_zoom': 0, 'max_zoom': 16}
+        self.style_table = StyleTable()
         self.circles = []
-        self.symbols = []
+        self.symbol_layer = SymbolLayer(self.coord_dtype)
         self.heatmap_points = []
         self.ground_overlays = []
         self.radpoints = []
         self.gridsetting = None
+        self.grid_settings = None
         self.bounding_box = None
+        self.auto_fit = False
+        self.clip_box = None
+        self.layer_bounds = dict((layer, Bounds()) for layer in BOUNDED_LAYERS)
+        self._spatial_indexes = {}
+        self.draw_hooks = []
+        self.draw_stats = None
+        self.live_session = None
+        self.coordinate_format = CoordinateFormat()
+        self.fragment_cache = None
         self.coloricon = os.path.join(os.path.dirname(__file__), 'markers/%s.png')
         self.color_dict = mpl_color_map
         self.html_color_codes = html_color_codes
 
+    def __getstate__(self):
+        # The color tables are module constants: pickles (e.g. the maps sent
+        # to render_many() workers) refer to them instead of copying them.
+        state = self.__dict__.copy()
+        for name, table in (('color_dict', mpl_color_map), ('html_color_codes', html_color_codes)):
+            if state.get(name) is table:
+                del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.color_dict = mpl_color_map
+        self.html_color_codes = html_color_codes
+        self.__dict__.update(state)
+
+    @property
+    def points(self):
+        """Markers as a lazy sequence of ``(lat, lng, color, title)`` tuples."""
+        return PointsView(self.point_layer)
+
+    def _resolve_color(self, color):
+        color = self.color_dict.get(color, color)
+        return self.html_color_codes.get(color, color)
+
     @classmethod
-    def from_geocode(cls, location_string, zoom=13):
-        lat, lng = cls.geocode(location_string)
-        return cls(lat, lng, zoom)
+    def from_geocode(cls, tile_url, location_string, zoom=13, geocoder=None, **kwargs):
+        """A plotter centered on a place.
+
+        :raises ValueError: if the place can not be found
+        """
+        latlng = cls.geocode(location_string, geocoder)
+        if latlng is None:
+            raise ValueError('No results for "%s"' % location_string)
+        return cls(tile_url, latlng[0], latlng[1], zoom, **kwargs)
 
     @classmethod
-    def geocode(self, location_string):
-        geocode = requests.get(
-            'http://maps.googleapis.com/maps/api/geocode/json?address="%s"' % location_string)
-        geocode = json.loads(geocode.text)
-        latlng_dict = geocode['results'][0]['geometry']['location']
-        return latlng_dict['lat'], latlng_dict['lng']
-
-    def grid(self, slat, elat, latin, slng, elng, lngin):
+    def geocode(cls, location_string, geocoder=None):
+        """``(lat, lng)`` of a place, or None when it can not be found; see
+        :mod:`llplot.geocoding`."""
+        return (geocoder or get_default_geocoder()).geocode(location_string)
+
+    @classmethod
+    def geocode_many(cls, location_strings, geocoder=None):
+        """Geocode many places at once: duplicates are looked up once, cached
+        names are not looked up again and the others are resolved concurrently.
+
+        :return: ``{name: (lat, lng) or None}``
+        """
+        return (geocoder or get_default_geocoder()).geocode_many(location_strings)
+
+    def grid(self, slat, elat, latin, slng, elng, lngin, encoding=None, precision=5):
+        """Draw grid lines; ``encoding``/``precision`` work as in :meth:`plot`."""
         self.gridsetting = [slat, elat, latin, slng, elng, lngin]
+        self.grid_settings = self._set_encoding(self._process_kwargs({"color": "#000000"}),
+                                                encoding, precision)
+
+    def _set_encoding(self, settings, encoding, precision):
+        if encoding is not None:
+            if encoding not in ENCODINGS:
+                raise ValueError("encoding must be one of %s, not %r" % (ENCODINGS, encoding))
+            if not 0 <= precision <= MAX_PRECISION:
+                raise ValueError("precision must be between 0 and %d, got %r"
+                                 % (MAX_PRECISION, precision))
+            settings = self.style_table.intern(settings.replace(encoding=encoding, precision=precision))
+        return settings
 
-    def marker(self, lat, lng, color='#FF0000', c=None, title="no implementation"):
+    def marker(self, lat, lng, color='#FF0000', c=None, title=DEFAULT_TITLE, cluster=False):
         if c:
             color = c
-        color = self.color_dict.get(color, color)
-        color = self.html_color_codes.get(color, color)
-        self.points.append((lat, lng, color[1:], title))
+        if self.clip_box is not None and not self.clip_box.contains_point(lat, lng):
+            return
+        layer = self.cluster_layer if cluster else self.point_layer
+        layer.append(lat, lng, color, title)
+        self.layer_bounds['clusters' if cluster else 'points'].update_point(lat, lng)
+
+    def marker_many(self, lats, lngs, color='#FF0000', c=None, title=DEFAULT_TITLE,
+                    cluster=False):
+        """Add one marker per ``(lat, lng)`` pair in a single call.
+
+        :param lats: latitudes, as a sequence, numpy array or any object
+            exporting the buffer protocol
+        :param lngs: longitudes, same length as ``lats``
+        :param color: a color shared by all markers, or one color per marker
+        :param title: a title shared by all markers, or one title per marker
+        :param cluster: add the markers to the clustered layer, see
+            :meth:`cluster_markers`
+        """
+        if c is not None:
+            color = c
+        layer = self.cluster_layer if cluster else self.point_layer
+        start = len(layer)
+        layer.extend(lats, lngs, color, title)
+        self._added(layer, start, 'clusters' if cluster else 'points')
+
+    def _added(self, layer, start, name):
+        """Clip the features added to a columnar layer from ``start`` on and
+        extend the bounds of the layer with them."""
+        lats, lngs = layer.lats.data[start:], layer.lngs.data[start:]
+        if self.clip_box is not None:
+            layer.keep(self.clip_box.contains(lats, lngs), start)
+            lats, lngs = layer.lats.data[start:], layer.lngs.data[start:]
+        self.layer_bounds[name].update(lats, lngs)
+
+    def cluster_markers(self, lats, lngs, color='#FF0000', c=None, title=DEFAULT_TITLE,
+                        radius=None, min_zoom=None, max_zoom=None):
+        """Add markers that are grouped into clusters depending on the zoom.
+
+        The cluster hierarchy is computed in Python when drawing, one level
+        per zoom from ``min_zoom`` to ``max_zoom``; the page only shows the
+        clusters of the current zoom (and, above ``max_zoom``, the markers
+        themselves) that fall in the viewport.
+
+        :param radius: size in pixels of the grid cells points are merged in
+        :param min_zoom: coarsest zoom level clusters are computed for
+        :param max_zoom: last zoom level with clusters
+        """
+        self.marker_many(lats, lngs, color, c, title, cluster=True)
+        for key, value in (('radius', radius), ('min_zoom', min_zoom), ('max_zoom', max_zoom)):
+            if value is not None:
+                self.cluster_options[key] = value
 
     def scatter(self, lats, lngs, color=None, size=None, marker=True, c=None, s=None, symbol='o', **kwargs):
+        """Markers, or with ``marker=False`` symbols of ``size`` meters ('o'
+        circles, 'x' or '+' crosses; one size or one per point) drawn in a
+        batch on a canvas."""
         color = color or c
-        size = size or s or 40
+        size = size if size is not None else s if s is not None else 40
         kwargs["color"] = color
-        kwargs["size"] = size
         settings = self._process_kwargs(kwargs)
-        for lat, lng in zip(lats, lngs):
-            if marker:
-                self.marker(lat, lng, settings['color'])
-            else:
-                self._add_symbol(Symbol(symbol, lat, lng, size), **settings)
+        if marker:
+            self.marker_many(lats, lngs, settings['color'])
+            return
+        if symbol not in SYMBOL_SHAPES:
+            raise InvalidSymbolError("Symbol %s is not implemented" % symbol)
+        start = len(self.symbol_layer)
+        self.symbol_layer.extend(lats, lngs, size, symbol, self._polygon_options(settings))
+        self._added(self.symbol_layer, start, 'symbols')
 
-    def _add_symbol(self, symbol, color=None, c=None, **kwargs):
+    def circle(self, lat, lng, radius, color=None, c=None, **kwargs):
         color = color or c
         kwargs.setdefault('face_alpha', 0.5)
         kwargs.setdefault('face_color', "#000000")
         kwargs.setdefault("color", color)
         settings = self._process_kwargs(kwargs)
-        self.symbols.append((symbol, settings))
+        if self.clip_box is not None and not self.clip_box.contains_point(lat, lng):
+            return
+        self.circles.append(((lat, lng, radius), settings))
+        self.layer_bounds['circles'].update_point(lat, lng)
 
-    def circle(self, lat, lng, radius, color=None, c=None, **kwargs):
+    def circle_many(self, lats, lngs, radius, color=None, c=None, **kwargs):
+        """Add many circles of one style, ``radius`` meters each (one value
+        or one per circle).
+
+        Unlike :meth:`circle` they are stored as arrays and drawn by a single
+        canvas renderer, which keeps maps with tens of thousands of circles
+        responsive.
+        """
         color = color or c
         kwargs.setdefault('face_alpha', 0.5)
         kwargs.setdefault('face_color', "#000000")
         kwargs.setdefault("color", color)
         settings = self._process_kwargs(kwargs)
-        self.circles.append(((lat, lng, radius), settings))
+        start = len(self.symbol_layer)
+        self.symbol_layer.extend(lats, lngs, radius, 'o', self._circle_options(settings))
+        self._added(self.symbol_layer, start, 'symbols')
 
     def _process_kwargs(self, kwargs):
+        """The interned :class:`~llplot.styles.Style` of drawing keyword
+        arguments; equal arguments are only normalized once per plotter."""
+        return self.style_table.normalized(kwargs, self._normalize_kwargs)
+
+    def _normalize_kwargs(self, kwargs):
         settings = dict()
         settings["edge_color"] = kwargs.get("color", None) or \
                                  kwargs.get("edge_color", None) or \
@@ -147,28 +307,89 @@ class LeafletPlotter(object):
         # Need to replace "plum" with "#DDA0DD" and "c" with "#00FFFF" (cyan).
         for key, color in settings.items():
             if 'color' in key:
-                color = self.color_dict.get(color, color)
-                color = self.html_color_codes.get(color, color)
-                settings[key] = color
+                settings[key] = self._resolve_color(color)
 
         settings["closed"] = kwargs.get("closed", None)
-        return settings
-
-    def plot(self, lats, lngs, color=None, c=None, **kwargs):
+        return Style(**settings)
+
+    def plot(self, lats, lngs, color=None, c=None, simplify=None, simplify_px=None,
+             lod_zooms=None, encoding=None, precision=5, **kwargs):
+        """Draw a polyline.
+
+        :param simplify: drop vertices with Douglas-Peucker, keeping the line
+            within this many meters of the original
+        :param simplify_px: drop vertices keeping the line within this many
+            screen pixels of the original; with ``lod_zooms`` one level of
+            detail is written per zoom and the page picks the right one when
+            zooming, otherwise the map's initial zoom is used
+        :param encoding: 'polyline' to write the vertices with Google's
+            encoded polyline algorithm (quantized, delta encoded integers),
+            decoded by the page; about 5 times smaller than plain numbers
+        :param precision: number of decimals kept by the encoding
+        :return: a :class:`~llplot.simplify.SimplifyReport` with the number
+            of vertices kept and dropped when simplifying, else None
+        """
         color = color or c
         kwargs.setdefault("color", color)
-        settings = self._process_kwargs(kwargs)
-        path = zip(lats, lngs)
-        self.paths.append((path, settings))
-
-    def heatmap(self, lats, lngs, threshold=10, radius=10, gradient=None, opacity=0.6, maxIntensity=1, dissipating=True):
+        settings = self._set_encoding(self._process_kwargs(kwargs), encoding, precision)
+        path = as_path(lats, lngs, self.coord_dtype)
+        return self._add_path(self.paths, 'polyline', path, settings,
+                              simplify, simplify_px, lod_zooms)
+
+    def _add_path(self, target, kind, path, settings, simplify, simplify_px, lod_zooms):
+        pieces = [path]
+        if self.clip_box is not None:
+            if kind == 'polygon':
+                pieces = [clip_polygon(path, self.clip_box)]
+                pieces = [piece for piece in pieces if len(piece) >= 3]
+            else:
+                pieces = clip_path(path, self.clip_box)
+        bounds = self.layer_bounds['shapes' if kind == 'polygon' else 'paths']
+        for piece in pieces:
+            bounds.update(piece[:, 0], piece[:, 1])
+        if simplify is None and simplify_px is None:
+            target.extend((piece, settings) for piece in pieces)
+            return None
+        if simplify_px is not None and lod_zooms is None:
+            lod_zooms = [self.zoom]
+        reports = []
+        for piece in pieces:
+            levels, report = simplify_path(piece, simplify, simplify_px, lod_zooms)
+            if len(levels) == 1:
+                target.append((levels[0][1], settings))
+            else:
+                self.lod_paths.append((kind, levels, settings))
+            reports.append(report)
+        if len(reports) == 1:
+            report = reports[0]
+        else:
+            # Clipped: count the vertices clipped away as dropped.
+            zooms = lod_zooms if simplify_px is not None else [None]
+            report = SimplifyReport(len(path), [(zoom, sum(r.levels[i][1] for r in reports))
+                                                for i, zoom in enumerate(zooms)])
+        self.simplify_reports.append(report)
+        return report
+
+    def heatmap(self, lats, lngs, threshold=10, radius=10, gradient=None, opacity=0.6, maxIntensity=None,
+                dissipating=True, weights=None, cell_size=None, cell_shape='square'):
         """
+        Points are aggregated in Python into square or hexagonal cells and
+        only the cell centers and summed weights are written to the page,
+        which draws them with the Leaflet.heat plugin.
+
         :param lats: list of latitudes
         :param lngs: list of longitudes
         :param maxIntensity:(int) max frequency to use when plotting. Default (None) uses max value on map domain.
         :param threshold:
-        :param radius: The hardest param. Example (string):
-        :return:
+        :param radius: radius of influence of a cell, in pixels.
+        :param gradient: list of (r, g, b, a) tuples, from the lowest intensity to the highest.
+        :param opacity: opacity of the whole heatmap layer.
+        :param dissipating: when False the radius grows and shrinks with the zoom, as if it was in meters.
+        :param weights: optional weight of every point (default 1).
+        :param cell_size: cell width (square) or circumradius (hex) in Web Mercator meters.
+            Defaults to a quarter of ``radius`` at the map's initial zoom.
+        :param cell_shape: 'square' or 'hex'.
+        :return: the :class:`~llplot.heatmap.HeatmapLayer` holding the cells
         """
         settings = {}
         # Try to give anyone using threshold a heads up.
@@ -180,38 +401,248 @@ class LeafletPlotter(object):
         settings['opacity'] = opacity
         settings['maxIntensity'] = maxIntensity
         settings['dissipating'] = dissipating
-        settings = self._process_heatmap_kwargs(settings)
-
-        heatmap_points = []
-        for lat, lng in zip(lats, lngs):
-            heatmap_points.append((lat, lng))
-        self.heatmap_points.append((heatmap_points, settings))
-
-
-    def fit_bounds(self, nelat, nelng, swlat, swlng):
-        self.bounding_box = [nelat, nelng, swlat, swlng]
-
-    def _process_heatmap_kwargs(self, settings_dict):
-        settings_string = ''
-        settings_string += "heatmap.set('threshold', %d);\n" % settings_dict['threshold']
-        settings_string += "heatmap.set('radius', %d);\n" % settings_dict['radius']
-        settings_string += "heatmap.set('maxIntensity', %d);\n" % settings_dict['maxIntensity']
-        settings_string += "heatmap.set('opacity', %f);\n" % settings_dict['opacity']
-
-        dissipation_string = 'true' if settings_dict['dissipating'] else 'false'
-        settings_string += "heatmap.set('dissipating', %s);\n" % (dissipation_string)
 
+        if cell_size is None:
+            cell_size = radius / 4.0 * meters_per_pixel(0, self.zoom)
+        layer = HeatmapLayer(cell_size, cell_shape)
+        self._add_heat(layer, lats, lngs, weights)
+        self.heatmap_points.append((layer, settings))
+        return layer
+
+    def _add_heat(self, layer, lats, lngs, weights=None):
+        lats, lngs = as_array(lats), as_array(lngs)
+        if self.clip_box is not None:
+            inside = self.clip_box.contains(lats, lngs)
+            lats, lngs = lats[inside], lngs[inside]
+            if weights is not None:
+                weights = as_array(weights)[inside]
+        layer.add(lats, lngs, weights)
+        self.layer_bounds['heatmap'].update(lats, lngs)
+
+    def scatter_from_file(self, path, lat_column='lat', lng_column='lng', color_column=None,
+                          title_column=None, size_column=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                          format=None, delimiter=None, header=True, dtype=None, **kwargs):
+        """:meth:`scatter` the rows of a CSV, NPY, raw binary or Parquet file.
+
+        The file is read ``chunk_rows`` rows at a time by
+        :func:`~llplot.ingest.read_chunks` (see there for ``format``,
+        ``delimiter``, ``header`` and ``dtype``) and every chunk goes straight
+        to the layer's arrays, so besides the points kept, memory stays within
+        a few chunks whatever the size of the file.
+
+        :param color_column: optional column of colors, one per point
+        :param title_column: optional column of marker titles
+        :param size_column: optional column of symbol sizes, in meters
+        :param kwargs: passed to :meth:`scatter` (``color``, ``marker``,
+            ``symbol``, ...)
+        :return: number of rows read
+        """
+        marker = kwargs.pop('marker', True)
+        size = kwargs.pop('size', None)
+        columns = [column for column in (lat_column, lng_column, color_column, title_column, size_column)
+                   if column is not None]
+        text = [column for column in (color_column, title_column) if column is not None]
+        rows = 0
+        for chunk in read_chunks(path, columns, text, chunk_rows, format, delimiter, header, dtype):
+            lats, lngs = chunk[lat_column], chunk[lng_column]
+            rows += len(lats)
+            sizes = chunk[size_column] if size_column is not None else size
+            if marker and (color_column is not None or title_column is not None):
+                color = kwargs.get('color') or kwargs.get('c')
+                colors = chunk[color_column] if color_column is not None else \
+                    self._process_kwargs({'color': color})['color']
+                titles = chunk[title_column] if title_column is not None else DEFAULT_TITLE
+                self.marker_many(lats, lngs, colors, title=titles)
+            elif color_column is not None:
+                # Symbols have one style per call: one call per color of the chunk.
+                colors, inverse = np.unique(chunk[color_column], return_inverse=True)
+                for i, color in enumerate(colors):
+                    mask = inverse == i
+                    self.scatter(lats[mask], lngs[mask], marker=False,
+                                 size=sizes[mask] if isinstance(sizes, np.ndarray) else sizes,
+                                 **dict(kwargs, color=str(color)))
+            else:
+                self.scatter(lats, lngs, size=sizes, marker=marker, **kwargs)
+        return rows
+
+    def heatmap_from_file(self, path, lat_column='lat', lng_column='lng', weight_column=None,
+                          chunk_rows=DEFAULT_CHUNK_ROWS, format=None, delimiter=None, header=True,
+                          dtype=None, **kwargs):
+        """:meth:`heatmap` of the rows of a file, read in chunks like
+        :meth:`scatter_from_file`. Points are binned chunk by chunk, so memory
+        stays within a few chunks plus the cells.
+
+        :param weight_column: optional column of point weights
+        :param kwargs: passed to :meth:`heatmap`
+        :return: the :class:`~llplot.heatmap.HeatmapLayer`
+        """
+        layer = self.heatmap([], [], **kwargs)
+        columns = [column for column in (lat_column, lng_column, weight_column) if column is not None]
+        for chunk in read_chunks(path, columns, (), chunk_rows, format, delimiter, header, dtype):
+            weights = chunk[weight_column] if weight_column is not None else None
+            self._add_heat(layer, chunk[lat_column], chunk[lng_column], weights)
+        return layer
+
+    def plot_from_file(self, path, lat_column='lat', lng_column='lng', chunk_rows=DEFAULT_CHUNK_ROWS,
+                       format=None, delimiter=None, header=True, dtype=None, **kwargs):
+        """:meth:`plot` the rows of a file as one path, read in chunks like
+        :meth:`scatter_from_file`.
+
+        :param kwargs: passed to :meth:`plot`
+        """
+        lats, lngs = Column(self.coord_dtype), Column(self.coord_dtype)
+        for chunk in read_chunks(path, [lat_column, lng_column], (), chunk_rows, format, delimiter,
+                                 header, dtype):
+            lats.extend(chunk[lat_column])
+            lngs.extend(chunk[lng_column])
+        return self.plot(lats.data, lngs.data, **kwargs)
+
+    def fit_bounds(self, nelat=None, nelng=None, swlat=None, swlng=None):
+        """Zoom the map to a box; without arguments, to the bounds of all
+        the data when drawing (see :meth:`bounds`)."""
+        if nelat is None and nelng is None and swlat is None and swlng is None:
+            self.bounding_box = None
+            self.auto_fit = True
+        else:
+            self.bounding_box = [nelat, nelng, swlat, swlng]
+            self.auto_fit = False
+
+    def set_precision(self, precision=DEFAULT_PRECISION, strip_zeros=False):
+        """Write coordinates with ``precision`` decimals (6 by default, about
+        10 cm; 5 is about 1 m), without trailing zeros when ``strip_zeros``.
+        Compact and live pages always strip them, as JSON allows it."""
+        self.coordinate_format = CoordinateFormat(precision, strip_zeros)
+
+    def bounds(self, layers=BOUNDED_LAYERS):
+        """The :class:`~llplot.bounds.Bounds` of the features of ``layers``,
+        from the running bounds kept as features are added (circles and
+        symbols by their centers)."""
+        bounds = Bounds()
+        for layer in layers:
+            bounds = bounds.union(self.layer_bounds[layer])
+        return bounds
+
+    def clip(self, south, west, north, east):
+        """Only keep what is inside a box, now and for features added later.
+
+        Markers, circles, symbols and heatmap points outside are dropped,
+        paths are cut to the runs of segments touching the box (see
+        :func:`~llplot.bounds.clip_path`), polygons are clipped to the box,
+        and paths with levels of detail are dropped when they are entirely
+        outside.
+        """
+        box = self.clip_box = Bounds(south, west, north, east)
+        for name, layer in (('points', self.point_layer), ('clusters', self.cluster_layer),
+                            ('symbols', self.symbol_layer)):
+            mask = box.contains(layer.lats.data, layer.lngs.data)
+            self._compacted(name, mask)
+            layer.keep(mask)
+        pieces = [[(piece, settings) for piece in clip_path(np.asarray(path), box)]
+                  for path, settings in self.paths]
+        self._compacted('paths', [len(path) for path in pieces])
+        self.paths = [piece for path in pieces for piece in path]
+        shapes = [(clip_polygon(np.asarray(shape), box), settings) for shape, settings in self.shapes]
+        mask = [len(shape) >= 3 for shape, _ in shapes]
+        self._compacted('shapes', mask)
+        self.shapes = [shape for shape, kept in zip(shapes, mask) if kept]
+        self.lod_paths = [(kind, levels, settings) for kind, levels, settings in self.lod_paths
+                          if path_bounds(levels[-1][1]).intersects(box)]
+        mask = [box.contains_point(circle[0], circle[1]) for circle, _ in self.circles]
+        self._compacted('circles', mask)
+        self.circles = [circle for circle, kept in zip(self.circles, mask) if kept]
+        for heatmap, _ in self.heatmap_points:
+            heatmap.keep(box.contains(*heatmap.centers()))
+        self._recompute_bounds()
+
+    def _indexed_layer(self, name):
+        layers = {'points': self.point_layer, 'clusters': self.cluster_layer,
+                  'symbols': self.symbol_layer}
+        if name not in layers:
+            raise ValueError("unknown layer %r, expected one of %s" % (name, ', '.join(INDEXED_LAYERS)))
+        return layers[name]
+
+    def spatial_index(self, layer='points'):
+        """:class:`~llplot.spatial.GridIndex` over the markers of a layer
+        ('points', 'clusters' or 'symbols', which holds scatter symbols and
+        :meth:`circle_many` circles), for ``bbox`` and ``radius`` queries.
+
+        The index is built on first use and rebuilt once the layer changed;
+        its indices are positions in the layer's columns.
+        """
+        data = self._indexed_layer(layer)
+        version, index = self._spatial_indexes.get(layer, (None, None))
+        if version != data.lats.version:
+            index = GridIndex(data.lats.data, data.lngs.data)
+            self._spatial_indexes[layer] = (data.lats.version, index)
+        return index
+
+    def thin(self, min_distance_m, layers=INDEXED_LAYERS, priority=None):
+        """Drop markers that are closer than ``min_distance_m`` meters to
+        another marker of the same layer that is kept.
+
+        What is kept is a maximal subset with that spacing, see
+        :func:`~llplot.spatial.thin_mask`; ``priority`` (one value per
+        marker of each layer, higher is kept first) is only meaningful with
+        a single layer.
+
+        :return: number of markers dropped
+        """
+        if isinstance(layers, str):
+            layers = (layers,)
+        dropped = 0
+        for name in layers:
+            layer = self._indexed_layer(name)
+            if not len(layer):
+                continue
+            mask = thin_mask(layer.lats.data, layer.lngs.data, min_distance_m, priority)
+            dropped += len(mask) - int(mask.sum())
+            self._compacted(name, mask)
+            layer.keep(mask)
+        if dropped:
+            self._recompute_bounds()
+        return dropped
+
+    def _compacted(self, name, counts):
+        """Move the live watermark of a layer whose features are about to be
+        replaced by ``counts[i]`` features each (a mask when they are only
+        kept or dropped), so that :meth:`flush` still sends the features
+        added after it."""
+        session = self.live_session
+        if session is not None and name in session.flushed:
+            flushed = session.flushed[name]
+            session.flushed[name] = int(np.sum(np.asarray(counts, dtype=np.int64)[:flushed]))
+
+    def _recompute_bounds(self):
+        self.layer_bounds = dict((layer, Bounds()) for layer in BOUNDED_LAYERS)
+        for name, layer in (('points', self.point_layer), ('clusters', self.cluster_layer),
+                            ('symbols', self.symbol_layer)):
+            self.layer_bounds[name].update(layer.lats.data, layer.lngs.data)
+        for name, features in (('paths', self.paths), ('shapes', self.shapes)):
+            for path, _ in features:
+                path = np.asarray(path)
+                self.layer_bounds[name].update(path[:, 0], path[:, 1])
+        for kind, levels, _ in self.lod_paths:
+            path = levels[-1][1]
+            self.layer_bounds['shapes' if kind == 'polygon' else 'paths'].update(path[:, 0], path[:, 1])
+        for (lat, lng, _), _ in self.circles:
+            self.layer_bounds['circles'].update_point(lat, lng)
+        for heatmap, _ in self.heatmap_points:
+            self.layer_bounds['heatmap'].update(*heatmap.centers())
+
+    def _process_heatmap_kwargs(self, settings_dict, layer):
+        """Leaflet.heat options for a heatmap layer."""
+        max_intensity = settings_dict['maxIntensity']
+        if max_intensity is None:
+            max_intensity = float(layer.weights.max()) if len(layer) else 1.0
+        # maxZoom 0 turns off Leaflet.heat's own fading of intensities when
+        # zooming out, the cells already carry the aggregated weights.
+        options = {'radius': settings_dict['radius'], 'max': max_intensity, 'maxZoom': 0}
         gradient = settings_dict['gradient']
         if gradient:
-            gradient_string = "var gradient = [\n"
-            for r, g, b, a in gradient:
-                gradient_string += "\t" + "'rgba(%d, %d, %d, %d)',\n" % (r, g, b, a)
-            gradient_string += '];' + '\n'
-            gradient_string += "heatmap.set('gradient', gradient);\n"
-
-            settings_string += gradient_string
-
-        return settings_string
+            stops = np.linspace(0, 1, len(gradient)) if len(gradient) > 1 else [1.0]
+            options['gradient'] = dict(('%g' % stop, 'rgba(%d, %d, %d, %g)' % (r, g, b, a))
+                                       for stop, (r, g, b, a) in zip(stops, gradient))
+        return options
 
     def ground_overlay(self, url, bounds_dict):
         '''
@@ -241,29 +672,367 @@ class LeafletPlotter(object):
 
         return bounds_string
 
-    def polygon(self, lats, lngs, color=None, c=None, **kwargs):
+    def polygon(self, lats, lngs, color=None, c=None, simplify=None, simplify_px=None,
+                lod_zooms=None, encoding=None, precision=5, **kwargs):
+        """Draw a filled polygon. Simplification and encoding work as in :meth:`plot`."""
         color = color or c
         kwargs.setdefault("color", color)
-        settings = self._process_kwargs(kwargs)
-        shape = zip(lats, lngs)
-        self.shapes.append((shape, settings))
-
-    def draw(self, htmlfile, img_path=None, header=None, footer=None):
+        settings = self._set_encoding(self._process_kwargs(kwargs), encoding, precision)
+        shape = as_path(lats, lngs, self.coord_dtype)
+        return self._add_path(self.shapes, 'polygon', shape, settings,
+                              simplify, simplify_px, lod_zooms)
+
+    def draw(self, htmlfile=None, img_path=None, header=None, footer=None, compact=False,
+             buffer_size=DEFAULT_BUFFER_SIZE, icons='url', stats=False, workers=None, live=False,
+             binary=False):
         """Create the html file which include one google map and all points and paths. If
         no string is provided, return the raw html.
+
+        :param htmlfile: a path, a text or binary file-like object (a gzip
+            stream, an HTTP response, ...), a socket, or None to get the html
+            back as a string. File-like objects are flushed but not closed.
+        :param compact: write every layer as a single JSON payload plus one
+            generic loop that builds the Leaflet objects in the browser; markers
+            of the same color share one icon.
+        :param buffer_size: the output is written to ``htmlfile`` in chunks of
+            about this many characters.
+        :param icons: how marker icons are referenced, one icon per color in
+            every case: ``'url'`` links the bundled pin images (colors without
+            one are inlined), ``'inline'`` embeds every pin as a data URI and
+            ``'sprite'`` embeds a single sheet with all of them. Both of the
+            latter make pages that work offline.
+        :param stats: measure every layer; the list of
+            :class:`~llplot.stats.LayerStats` is kept in ``draw_stats``. Layers
+            are always measured when some hooks were added with
+            :meth:`add_draw_hook`.
+        :param workers: number of processes serializing the big columns and
+            path lists of compact layers in parallel; the html is the same as
+            with a single process.
+        :param live: write a live page, that polls a data file every 2 seconds
+            (or every ``live`` seconds) for new features; later calls with the
+            same ``htmlfile`` only :meth:`flush` the features added since.
+            The page reads the data file with ``fetch`` and ``Range``
+            requests, so it has to be served over HTTP: opened from disk
+            (``file://``) it shows the first draw and never updates.
+        :param binary: write the columns of markers, symbols, circles, paths
+            and polygons to a binary file next to ``htmlfile`` (``map.html`` ->
+            ``map.bin``), which the page fetches into typed arrays: nothing is
+            formatted or parsed as text. Coordinates are float32 (within a
+            meter), or float64 with ``binary='float64'``. The page has to be
+            served over HTTP.
+        """
+        if live and binary:
+            raise ValueError("live pages can not use binary data files")
+        if live:
+            return self._draw_live(htmlfile, live, img_path, header, footer, icons)
+        if binary:
+            return self._draw_binary(htmlfile, binary, img_path, header, footer, icons, buffer_size)
+        self.draw_stats = None
+        if htmlfile is None:
+            out = io.StringIO()
+            with open_output(out, buffer_size, workers) as f:
+                self.write_html(f, img_path, header, footer, compact, icons=icons, stats=stats)
+            return out.getvalue()
+        with open_output(htmlfile, buffer_size, workers) as f:
+            self.write_html(f, img_path, header, footer, compact, icons=icons, stats=stats)
+
+    def _draw_live(self, htmlfile, live, img_path, header, footer, icons):
+        if not isinstance(htmlfile, (str, bytes)) and not hasattr(htmlfile, '__fspath__'):
+            raise ValueError("live pages need the path of the html file, got %r" % (htmlfile,))
+        session = self.live_session
+        if session is not None and session.htmlfile == os.path.abspath(os.fspath(htmlfile)):
+            return self.flush()
+        interval = DEFAULT_POLL_INTERVAL if live is True else float(live)
+        session = self.live_session = LiveSession(htmlfile, interval, icons)
+        session.icons.update(icon_key(color) for layer in (self.point_layer, self.cluster_layer)
+                             for color in layer.color_table.values)
+        session.static = self._static_sizes()
+        with open_output(htmlfile) as f:
+            self.write_html(f, img_path, header, footer, layers=self._write_live_layers, icons=icons)
+        return self.flush()
+
+    def _draw_binary(self, htmlfile, binary, img_path, header, footer, icons, buffer_size):
+        if not isinstance(htmlfile, (str, bytes)) and not hasattr(htmlfile, '__fspath__'):
+            raise ValueError("binary data files need the path of the html file, got %r" % (htmlfile,))
+        if binary not in (True, 'float32', 'float64'):
+            raise ValueError("binary must be True, 'float32' or 'float64', got %r" % (binary,))
+        coord_dtype = '<f8' if binary == 'float64' else '<f4'
+        data_path = os.path.splitext(os.fspath(htmlfile))[0] + '.bin'
+        write_columns(data_path, self._binary_tables(coord_dtype))
+
+        def layers(f):
+            self.write_grids_compact(f)
+            self.write_clusters(f)
+            self.write_lod_paths(f)
+            self.write_heatmap(f)
+            f.write(BINARY_LOADER.format(url=to_json(os.path.basename(data_path)), **self._layer_loops()))
+
+        self.draw_stats = None
+        with open_output(htmlfile, buffer_size) as f:
+            self.write_html(f, img_path, header, footer, layers=layers, icons=icons)
+
+    def _binary_tables(self, coord_dtype):
+        """The tables of the binary data file, see :func:`~llplot.binary.write_columns`."""
+        tables = {}
+        layer = self.point_layer
+        if len(layer):
+            tables['points'] = {
+                'lat': BinaryColumn(coord_dtype, layer.lats.data),
+                'lng': BinaryColumn(coord_dtype, layer.lngs.data),
+                'icon': BinaryColumn('<i4', layer.colors.data),
+                'title': BinaryColumn('<i4', layer.titles.data),
+                'icons': [icon_key(color) for color in layer.color_table.values],
+                'titles': layer.title_table.values,
+            }
+        layer = self.symbol_layer
+        if len(layer):
+            tables['symbols'] = {
+                'lat': BinaryColumn(coord_dtype, layer.lats.data),
+                'lng': BinaryColumn(coord_dtype, layer.lngs.data),
+                'size': BinaryColumn('<f4', layer.sizes.data),
+                'shape': BinaryColumn('<i4', layer.shapes.data),
+                'style': BinaryColumn('<i4', layer.styles.data),
+                'shapes': SYMBOL_SHAPES,
+                'styles': layer.style_options(),
+            }
+        if self.circles:
+            payload = self._circles_payload(self.circles)
+            tables['circles'] = {
+                'lat': BinaryColumn(coord_dtype, np.asarray(payload['lat'])),
+                'lng': BinaryColumn(coord_dtype, np.asarray(payload['lng'])),
+                'radius': BinaryColumn('<f4', np.asarray(payload['radius'])),
+                'style': BinaryColumn('<i4', np.asarray(payload['style'], dtype=np.int32)),
+                'styles': payload['styles'],
+            }
+        for name, features, options in (('paths', self.paths, self._polyline_options),
+                                        ('shapes', self.shapes, self._polygon_options)):
+            if not features:
+                continue
+            styles = _StyleIndex()
+            coords = [np.asarray(path).ravel() for path, _ in features]
+            tables[name] = {
+                'coords': BinaryColumn(coord_dtype, coords),
+                'starts': BinaryColumn('<i4', np.concatenate(([0], np.cumsum([len(c) // 2 for c in coords])))),
+                'style': BinaryColumn('<i4', np.array([styles.index(settings, options)
+                                                       for _, settings in features], dtype=np.int32)),
+                'styles': styles.styles,
+            }
+        return tables
+
+    def _layer_loops(self):
+        """The compact loops of the layers updated live or loaded from a
+        binary file, as bodies of functions of ``data``."""
+        return {
+            'points': POINTS_LOOP.format(payload='data'),
+            'symbols': SYMBOLS_LOOP.format(payload='data', earth_radius=EARTH_RADIUS_M),
+            'circles': CIRCLES_LOOP.format(payload='data'),
+            'paths': FEATURES_LOOP.format(payload='data', kind='polyline'),
+            'shapes': FEATURES_LOOP.format(payload='data', kind='polygon'),
+        }
+
+    def _static_sizes(self):
+        return {'clusters': len(self.cluster_layer), 'lod_paths': len(self.lod_paths),
+                'heatmap': len(self.heatmap_points), 'grid': self.gridsetting}
+
+    def _write_live_layers(self, f):
+        """The layers of a live page: the ones that cannot be updated, and
+        the loader of the data file."""
+        self.write_grids_compact(f)
+        self.write_clusters(f)
+        self.write_lod_paths(f)
+        self.write_heatmap(f)
+        f.write(LIVE_LOADER.format(url=to_json(self.live_session.url),
+                                   interval=int(1000 * self.live_session.interval), **self._layer_loops()))
+
+    def flush(self):
+        """Append the features added since the last flush to the data file
+        of the live page (see ``draw(live=...)``), as one line. The cost
+        only depends on the number of new features.
+
+        Markers, symbols, circles, paths and polygons are updated live;
+        grid lines, clustered markers, paths with levels of detail and
+        heatmaps are written in the page only, and features removed once
+        flushed (by :meth:`clip` or :meth:`thin`) stay on the page. The page
+        only sees the new features when served over HTTP.
+
+        :return: number of features appended
+        """
+        session = self.live_session
+        if session is None:
+            raise ValueError("flush() needs a live page, write it with draw(htmlfile, live=True)")
+        if self._static_sizes() != session.static:
+            warnings.warn("Grid lines, clustered markers, paths with levels of detail and heatmaps "
+                          "changed since the live page was written; draw it again to show them.")
+            session.static = self._static_sizes()
+        sizes = {'points': len(self.point_layer), 'symbols': len(self.symbol_layer),
+                 'circles': len(self.circles), 'paths': len(self.paths), 'shapes': len(self.shapes)}
+        starts = dict((name, min(session.flushed[name], size)) for name, size in sizes.items())
+        added = sum(sizes[name] - starts[name] for name in sizes)
+        session.flushed = sizes
+        if not added:
+            return 0
+        colors = [icon_key(color) for color in self.point_layer.color_table.values
+                  if icon_key(color) not in session.icons]
+        session.icons.update(colors)
+        icons = dict((color, self.icon_url(color, session.icon_mode != 'url')) for color in colors)
+        with io.open(session.data_path, 'a', encoding='utf-8') as data:
+            with open_output(data) as f:
+                f.write('{"icons":%s' % to_json(icons))
+                if sizes['points'] > starts['points']:
+                    f.write(',"points":')
+                    self._write_point_layer_json(f, self.point_layer, starts['points'], session)
+                if sizes['symbols'] > starts['symbols']:
+                    f.write(',"symbols":')
+                    self._write_symbol_layer_json(f, self.symbol_layer, starts['symbols'], session)
+                if sizes['circles'] > starts['circles']:
+                    f.write(',"circles":%s' % to_json(self._circles_payload(self.circles[starts['circles']:])))
+                for name, features, options in (('paths', self.paths, self._polyline_options),
+                                                ('shapes', self.shapes, self._polygon_options)):
+                    if sizes[name] > starts[name]:
+                        f.write(',"%s":' % name)
+                        self._write_features_json(f, features[starts[name]:], options)
+                f.write('}\n')
+        session.bytes_written = os.path.getsize(session.data_path)
+        session.flushes += 1
+        return added
+
+    def add_draw_hook(self, before=None, after=None):
+        """Call ``before(layer)`` before :meth:`draw` writes a layer and
+        ``after(stats)`` with its :class:`~llplot.stats.LayerStats` once it is
+        written, e.g. to send the numbers to a metrics system."""
+        self.draw_hooks.append((before, after))
+
+    def publish(self, htmlfile, assets='inline', minify=True, compress=None, hashed=False,
+                leaflet_dir=None, cache_dir=DEFAULT_CACHE_DIR, img_path=None, header=None,
+                footer=None, compact=False):
+        """Write a page that does not depend on unpkg nor on the files of
+        this package, ready to be served with long-lived caching.
+
+        :param assets: ``'inline'`` puts the Leaflet stylesheet and scripts in
+            the page and the marker pins as data URIs; ``'copy'`` writes them
+            to a ``<name>_files`` directory next to the page, under
+            content-hashed names.
+        :param minify: drop the indentation, blank lines and comment lines.
+        :param compress: write a ``.gz`` and/or ``.br`` sibling of every file,
+            for ``'gzip'`` and ``'brotli'`` (with the optional ``brotli``
+            package); gzip, and brotli when it is installed, by default.
+        :param hashed: name the page itself after a hash of its content too.
+        :param leaflet_dir: directory holding ``leaflet.css``, ``leaflet.js``
+            (and ``leaflet-heat.js`` for heatmaps); they are downloaded once
+            into ``cache_dir`` otherwise.
+        :return: :class:`~llplot.publish.PublishReport` with the raw and
+            compressed size of every file.
+        """
+        if assets not in ASSET_MODES:
+            raise ValueError("assets must be one of %s, got %r" % (', '.join(ASSET_MODES), assets))
+        compressions = default_compressions() if compress is None else tuple(compress)
+        htmlfile = os.fspath(htmlfile)
+        directory = os.path.dirname(htmlfile)
+        files = []
+        if assets == 'inline':
+            icons = 'inline'
+            tags = dict((url, inline_tag(url, load_asset(url, leaflet_dir, cache_dir)))
+                        for url in self._asset_urls())
+        else:
+            folder = os.path.splitext(os.path.basename(htmlfile))[0] + '_files'
+            if not os.path.isdir(os.path.join(directory, folder)):
+                os.makedirs(os.path.join(directory, folder))
+
+            def copy(name, data):
+                name = content_name(name, data)
+                files.append(write_file(os.path.join(directory, folder, name), data, compressions))
+                return '%s/%s' % (folder, name)
+
+            icons = dict((color, copy('pin-%s.png' % color, self.icon_png(color)))
+                         for color in self._icon_colors())
+            tags = dict((url, link_tag(copy(ASSET_FILES[url], load_asset(url, leaflet_dir, cache_dir))))
+                        for url in self._asset_urls())
+        out = io.StringIO()
+        with open_output(out) as f:
+            self.write_html(f, img_path, header, footer, compact, icons=icons, assets=tags)
+        html = out.getvalue()
+        if minify:
+            html = minify_html(html)
+        data = html.encode('utf-8')
+        if hashed:
+            htmlfile = os.path.join(directory, content_name(os.path.basename(htmlfile), data))
+        files.insert(0, write_file(htmlfile, data, compressions))
+        return PublishReport(files)
+
+    def draw_tiles(self, outdir, min_zoom, max_zoom, processes=None, img_path=None,
+                   header=None, footer=None, icons='url'):
+        """Write the map as a loader page plus one data file per XYZ tile.
+
+        Markers, paths, polygons and circles are split into
+        ``outdir/{z}/{x}/{y}.json`` files (the scheme of ``tile_url``) for
+        every zoom from ``min_zoom`` to ``max_zoom``, and ``outdir/index.html``
+        only fetches the tiles of the current viewport. Paths with levels of
+        detail are tiled at their finest level; grid lines and heatmaps stay
+        in the page and clustered markers are not supported. The page has to
+        be served over HTTP for the browser to fetch the tiles.
+
+        :param processes: number of worker processes cutting and writing the
+            tiles; all cores by default
+        :param icons: as in :meth:`draw`
+        :return: dict with the number of ``tiles``, and how many were
+            ``written``, ``unchanged`` (not rewritten) or ``removed``
         """
-        f = open(htmlfile, 'w')
+        if not 0 <= min_zoom <= max_zoom:
+            raise ValueError("need 0 <= min_zoom <= max_zoom, got %r, %r" % (min_zoom, max_zoom))
+        if len(self.cluster_layer):
+            warnings.warn("Clustered markers are not written by draw_tiles().")
+        if len(self.symbol_layer):
+            warnings.warn("Canvas circles and symbols are not written by draw_tiles().")
+        tileset, meta = self._tileset()
+        stats = write_tiles(tileset, outdir, min_zoom, max_zoom, processes)
+        meta.update(minZoom=min_zoom, maxZoom=max_zoom)
+
+        def layers(f):
+            self.write_grids_compact(f)
+            f.write(TILES_LOADER.format(payload=to_json(meta)))
+            self.write_heatmap(f)
+
+        with open_output(os.path.join(outdir, 'index.html')) as f:
+            self.write_html(f, img_path, header, footer, layers=layers, icons=icons)
+        return stats
+
+    def _tileset(self):
+        """The features to tile, and the tables shared by all the tiles."""
+        layer = self.point_layer
+        points = (layer.lats.data, layer.lngs.data, layer.colors.data, layer.titles.data)
+        path_styles, shape_styles, circle_styles = _StyleIndex(), _StyleIndex(), _StyleIndex()
+        paths = [(path_styles.index(settings, self._polyline_options), np.asarray(path, dtype=float))
+                 for path, settings in self.paths]
+        shapes = [(shape_styles.index(settings, self._polygon_options), np.asarray(shape, dtype=float))
+                  for shape, settings in self.shapes]
+        for kind, levels, settings in self.lod_paths:
+            if kind == 'polygon':
+                shapes.append((shape_styles.index(settings, self._polygon_options), levels[-1][1]))
+            else:
+                paths.append((path_styles.index(settings, self._polyline_options), levels[-1][1]))
+        circles = (np.array([circle[0] for circle, _ in self.circles], dtype=float),
+                   np.array([circle[1] for circle, _ in self.circles], dtype=float),
+                   np.array([circle[2] for circle, _ in self.circles], dtype=float),
+                   np.array([circle_styles.index(settings, self._circle_options)
+                             for _, settings in self.circles], dtype=np.int32))
+        meta = {
+            'icons': [icon_key(color) for color in layer.color_table.values],
+            'titles': layer.title_table.values,
+            'pathStyles': path_styles.styles,
+            'shapeStyles': shape_styles.styles,
+            'circleStyles': circle_styles.styles,
+        }
+        return TileSet(points, paths, shapes, circles), meta
+
+    def write_html(self, f, img_path=None, header=None, footer=None, compact=False, layers=None,
+                   icons='url', stats=False, assets=None):
+        """Write the whole page; ``layers(f)``, when given, replaces the
+        writing of the layers inside the ``initialize`` function."""
+        if not isinstance(icons, dict) and icons not in ICON_MODES:
+            raise ValueError("icons must be one of %s, got %r" % (', '.join(ICON_MODES), icons))
         f.write('<html>\n')
         f.write('<head>\n')
-        f.write(
-            '<link rel="stylesheet" href="https://unpkg.com/leaflet@1.3.4/dist/leaflet.css" '
-            'integrity="sha512-puBpdR0798OZvTTbP4A8Ix/l+A4dHDD0DGqYW6RQ+9jxkRFclaxxQb/SJAWZfWAkuyeQUytO7+7N4QKrDh+drA==" '
-            'crossorigin=""/>\n')
-        f.write(
-            '<script src="https://unpkg.com/leaflet@1.3.4/dist/leaflet.js"'
-            'integrity="sha512-nMMmRyTVoLYqjP9hrbed9S+FzjZHW5gY1TWCHA5ckwXZBadntCNs8kEqAWdrb9O7rxbCaA4lKTIWjDXZxflOcA=="'
-            'crossorigin=""></script>'
-        )
+        self.write_assets(f, assets)
         f.write(
             '<meta http-equiv="content-type" content="text/html; charset=UTF-8"/>\n')
         f.write('<title>Leaflet - llplot </title>\n')
@@ -275,14 +1044,11 @@ class LeafletPlotter(object):
         f.write('\tvar llMap;\n')
         f.write('\tfunction initialize() {\n')
         self.write_map(f)
-        # self.write_grids(f)
-        self.write_points(f)
-        self.write_paths(f)
-        self.write_circles(f)
-        # self.write_symbols(f)
-        # self.write_shapes(f)
-        # self.write_heatmap(f)
-        # self.write_ground_overlay(f)
+        self.write_icons(f, icons)
+        if layers is None:
+            self.write_layers(f, compact, stats)
+        else:
+            layers(f)
         self.write_fitbounds(f)
         f.write('\t}\n')
         f.write('</script>\n')
@@ -313,15 +1079,104 @@ class LeafletPlotter(object):
             f.write('\t<div>'+footer+'</div>')
         f.write('</body>\n')
         f.write('</html>\n')
-        f.close()
 
     #############################################
     # # # # # # Low level Map Drawing # # # # # #
     #############################################
 
-    def write_grids(self, f):
-        if self.gridsetting is None:
+    def write_layers(self, f, compact=False, stats=False):
+        """Write every layer; with ``stats`` (or draw hooks) each one is
+        measured into ``draw_stats``."""
+        writers = self._layer_writers(compact)
+        if self.fragment_cache is not None:
+            writers = [(layer, self._cached_writer(layer, write, compact)) for layer, write in writers]
+        if not stats and not self.draw_hooks:
+            for _, write in writers:
+                write(f)
             return
+        self.draw_stats = measure_layers(f, writers, self._layer_size, self.draw_hooks)
+
+    def _layer_writers(self, compact):
+        if compact:
+            writers = [('grid', self.write_grids_compact),
+                       ('points', self.write_points_compact),
+                       ('clusters', self.write_clusters),
+                       ('paths', self.write_paths_compact),
+                       ('circles', self.write_circles_compact),
+                       ('shapes', self.write_shapes_compact)]
+        else:
+            writers = [('grid', self.write_grids),
+                       ('points', self.write_points),
+                       ('clusters', self.write_clusters),
+                       ('paths', self.write_paths),
+                       ('circles', self.write_circles),
+                       ('shapes', self.write_shapes)]
+        # self.write_ground_overlay(f)
+        return writers + [('lod_paths', self.write_lod_paths),
+                          ('symbols', self.write_symbol_layer),
+                          ('heatmap', self.write_heatmap)]
+
+    def _cached_writer(self, layer, write, compact):
+        """Wrap ``write`` to take the html of ``layer`` from
+        ``fragment_cache`` when its data and style were written before."""
+        def cached_write(f):
+            key = fingerprint(FRAGMENT_FORMAT, layer, compact, self.coordinate_format,
+                              self._layer_state(layer))
+            text = self.fragment_cache.get(key)
+            if text is None:
+                out = io.StringIO()
+                buffer = BufferedWriter(out, serializer=getattr(f, 'serializer', None))
+                write(buffer)
+                buffer.flush()
+                text = out.getvalue()
+                self.fragment_cache.put(key, text)
+            f.write(text)
+        return cached_write
+
+    def _layer_state(self, layer):
+        """Everything the html of one of the layers of write_layers() is
+        made of."""
+        if layer == 'grid':
+            return self.gridsetting, self.grid_settings
+        if layer in ('points', 'clusters'):
+            points = self.point_layer if layer == 'points' else self.cluster_layer
+            return (points.lats.data, points.lngs.data, points.colors.data, points.titles.data,
+                    points.color_table.values, points.title_table.values,
+                    self.cluster_options if layer == 'clusters' else None)
+        if layer == 'symbols':
+            symbols = self.symbol_layer
+            return (symbols.lats.data, symbols.lngs.data, symbols.sizes.data, symbols.shapes.data,
+                    symbols.styles.data, symbols.style_options())
+        if layer == 'heatmap':
+            return [(heatmap.cell_size, heatmap.shape, heatmap.points, heatmap.keys, heatmap.weights,
+                     settings)
+                    for heatmap, settings in self.heatmap_points]
+        return {'paths': self.paths, 'shapes': self.shapes, 'circles': self.circles,
+                'lod_paths': self.lod_paths}[layer]
+
+    def _layer_size(self, layer):
+        """``(features, vertices)`` of one of the layers of write_layers()."""
+        if layer == 'grid':
+            lines = len(self._grid_lines()) if self.gridsetting is not None else 0
+            return lines, 2 * lines
+        if layer in ('points', 'clusters', 'symbols'):
+            size = len({'points': self.point_layer, 'clusters': self.cluster_layer,
+                        'symbols': self.symbol_layer}[layer])
+            return size, size
+        if layer in ('paths', 'shapes'):
+            features = self.paths if layer == 'paths' else self.shapes
+            return len(features), sum(len(coords) for coords, _ in features)
+        if layer == 'circles':
+            return len(self.circles), len(self.circles)
+        if layer == 'lod_paths':
+            return len(self.lod_paths), sum(len(path) for _, levels, _ in self.lod_paths
+                                            for _, path in levels)
+        if layer == 'heatmap':
+            cells = sum(len(heatmap) for heatmap, _ in self.heatmap_points)
+            return cells, cells
+        raise ValueError("unknown layer %r" % (layer,))
+
+    def _grid_lines(self):
         slat = self.gridsetting[0]
         elat = self.gridsetting[1]
         latin = self.gridsetting[2]
@@ -341,23 +1196,26 @@ class LeafletPlotter(object):
         for lng in r:
             self.grids.append(
                 [(slat + latin / 2.0, lng + lngin / 2.0), (elat + latin / 2.0, lng + lngin / 2.0)])
+        return self.grids
 
-        for line in self.grids:
-            settings = self._process_kwargs({"color": "#000000"})
+    def write_grids(self, f):
+        if self.gridsetting is None:
+            return
+        settings = self.grid_settings or self._process_kwargs({"color": "#000000"})
+        for line in self._grid_lines():
             self.write_polyline(f, line, settings)
 
     def write_points(self, f):
-        for id, point in enumerate(self.points):
-            self.write_point(f, point[0], point[1], point[2], point[3], id)
+        layer = self.point_layer
+        # All the coordinates are formatted at once, not marker by marker.
+        latlngs = self.coordinate_format.rows([layer.lats.data, layer.lngs.data], ['[', ', ', ']\n'])
+        for id, (latlng, point) in enumerate(zip(latlngs.split('\n'), self.points)):
+            self._write_marker(f, latlng, point[2], point[3], id)
 
     def write_circles(self, f):
         for circle, settings in self.circles:
             self.write_circle(f, circle[0], circle[1], circle[2], settings)
 
-    def write_symbols(self, f):
-        for symbol, settings in self.symbols:
-            self.write_symbol(f, symbol, settings)
-
     def write_paths(self, f):
         for path, settings in self.paths:
             self.write_polyline(f, path, settings)
@@ -366,6 +1224,230 @@ class LeafletPlotter(object):
         for shape, settings in self.shapes:
             self.write_polygon(f, shape, settings)
 
+    def write_points_compact(self, f):
+        layer = self.point_layer
+        if not len(layer):
+            return
+        head, tail = template_parts(POINTS_LOOP)
+        f.write(head)
+        self._write_point_layer_json(f, layer)
+        f.write(tail)
+
+    def _write_point_layer_json(self, f, layer, start=0, session=None):
+        """The points of ``layer`` from ``start`` on; for a live ``session``
+        the tables only hold the entries the page does not have yet."""
+        icons = [icon_key(color) for color in layer.color_table.values]
+        titles = layer.title_table.values
+        if session is not None:
+            icons, titles = session.table_delta('icons', icons), session.table_delta('titles', titles)
+        f.write('{"lat":')
+        write_json_array(f, layer.lats.data[start:], self.coordinate_format.precision)
+        f.write(',"lng":')
+        write_json_array(f, layer.lngs.data[start:], self.coordinate_format.precision)
+        f.write(',"icon":')
+        write_json_array(f, layer.colors.data[start:])
+        f.write(',"icons":%s' % to_json(icons))
+        f.write(',"title":')
+        write_json_array(f, layer.titles.data[start:])
+        f.write(',"titles":%s}' % to_json(titles))
+
+    def write_clusters(self, f):
+        layer = self.cluster_layer
+        if not len(layer):
+            return
+        options = self.cluster_options
+        levels = build_cluster_levels(layer.lats.data, layer.lngs.data, **options)
+        head, tail = template_parts(CLUSTERS_LOOP)
+        f.write(head)
+        f.write('{"minZoom":%d,"maxZoom":%d,"points":' % (options['min_zoom'], options['max_zoom']))
+        self._write_point_layer_json(f, layer)
+        f.write(',"levels":[')
+        for i, level in enumerate(levels):
+            # Clusters of one are written as a reference to the point only.
+            merged = level.counts > 1
+            f.write('{"lat":' if i == 0 else ',{"lat":')
+            write_json_array(f, level.lats[merged], self.coordinate_format.precision)
+            f.write(',"lng":')
+            write_json_array(f, level.lngs[merged], self.coordinate_format.precision)
+            f.write(',"count":')
+            write_json_array(f, level.counts[merged])
+            f.write(',"single":')
+            write_json_array(f, level.points[~merged])
+            f.write('}')
+        f.write(']}')
+        f.write(tail)
+
+    def write_circles_compact(self, f):
+        if not self.circles:
+            return
+        f.write(CIRCLES_LOOP.format(payload=to_json(self._circles_payload(self.circles))))
+
+    def _circles_payload(self, circles):
+        styles = _StyleIndex()
+        lats, lngs, radii, style_ids = [], [], [], []
+        for (lat, lng, radius), settings in circles:
+            lats.append(lat)
+            lngs.append(lng)
+            radii.append(radius)
+            style_ids.append(styles.index(settings, self._circle_options))
+        payload = {
+            'lat': np.round(np.asarray(lats, dtype=float), self.coordinate_format.precision).tolist(),
+            'lng': np.round(np.asarray(lngs, dtype=float), self.coordinate_format.precision).tolist(),
+            'radius': np.asarray(radii, dtype=float).tolist(),
+            'style': style_ids,
+            'styles': styles.styles,
+        }
+        return payload
+
+    def write_symbol_layer(self, f):
+        layer = self.symbol_layer
+        if not len(layer):
+            return
+        head, tail = template_parts(SYMBOLS_LOOP, earth_radius=EARTH_RADIUS_M)
+        f.write(head)
+        self._write_symbol_layer_json(f, layer)
+        f.write(tail)
+
+    def _write_symbol_layer_json(self, f, layer, start=0, session=None):
+        styles = layer.style_options()
+        if session is not None:
+            styles = session.table_delta('styles', styles)
+        f.write('{"lat":')
+        write_json_array(f, layer.lats.data[start:], self.coordinate_format.precision)
+        f.write(',"lng":')
+        write_json_array(f, layer.lngs.data[start:], self.coordinate_format.precision)
+        f.write(',"size":')
+        write_json_array(f, layer.sizes.data[start:], 3)
+        f.write(',"shape":')
+        write_json_array(f, layer.shapes.data[start:])
+        f.write(',"style":')
+        write_json_array(f, layer.styles.data[start:])
+        f.write(',"shapes":%s,"styles":%s}' % (to_json(SYMBOL_SHAPES), to_json(styles)))
+
+    def write_paths_compact(self, f):
+        self._write_features_compact(f, 'polyline', self.paths, self._polyline_options)
+
+    def write_shapes_compact(self, f):
+        self._write_features_compact(f, 'polygon', self.shapes, self._polygon_options)
+
+    def write_grids_compact(self, f):
+        if self.gridsetting is None:
+            return
+        settings = self.grid_settings or self._process_kwargs({"color": "#000000"})
+        lines = [(line, settings) for line in self._grid_lines()]
+        self._write_features_compact(f, 'polyline', lines, self._polyline_options)
+
+    def _write_features_compact(self, f, kind, features, options):
+        if not features:
+            return
+        head, tail = template_parts(FEATURES_LOOP, kind=kind)
+        f.write(head)
+        self._write_features_json(f, features, options)
+        f.write(tail)
+
+    def _write_features_json(self, f, features, options):
+        styles = _StyleIndex()
+        f.write('{"features":[')
+        serializer = getattr(f, 'serializer', None)
+        if serializer is not None and sum(len(coords) for coords, _ in features) > JSON_CHUNK_SIZE:
+            batches = _feature_batches(features, styles, options)
+            texts = serializer.map(_features_json, batches, self.coordinate_format.precision)
+            for i, text in enumerate(texts):
+                f.write(',' + text if i else text)
+        else:
+            for i, (coords, settings) in enumerate(features):
+                f.write('%s[%d,' % (',' if i else '', styles.index(settings, options)))
+                self._write_feature_coordinates(f, coords, settings)
+                f.write(']')
+        f.write('],"styles":%s}' % to_json(styles.styles))
+
+    def write_lod_paths(self, f):
+        if not self.lod_paths:
+            return
+        styles = _StyleIndex()
+        head, tail = template_parts(LOD_LOOP)
+        f.write(head)
+        f.write('{"features":[')
+        for i, (kind, levels, settings) in enumerate(self.lod_paths):
+            options = self._polygon_options if kind == 'polygon' else self._polyline_options
+            f.write('%s[%d,"%s",%s,[' % (',' if i else '', styles.index(settings, options), kind,
+                                         to_json([zoom for zoom, _ in levels])))
+            for j, (_, path) in enumerate(levels):
+                if j:
+                    f.write(',')
+                self._write_feature_coordinates(f, path, settings, with_precision=False)
+            f.write('],%d]' % settings.get('precision', 0))
+        f.write('],"styles":%s}' % to_json(styles.styles))
+        f.write(tail)
+
+    def _write_feature_coordinates(self, f, coords, settings, with_precision=True):
+        """Coordinates of a compact feature: a flat JSON list, or an encoded
+        string followed by its precision."""
+        if settings.get('encoding') == 'polyline':
+            f.write(to_json(encode_polyline(coords, settings['precision'])))
+            if with_precision:
+                f.write(',%d' % settings['precision'])
+        else:
+            write_json_array(f, np.asarray(coords, dtype=float).ravel(), self.coordinate_format.precision)
+
+    @staticmethod
+    def _polyline_options(settings):
+        return {
+            'color': settings.get('color') or settings.get('edge_color'),
+            'opacity': settings.get('edge_alpha'),
+            'weight': settings.get('edge_width'),
+        }
+
+    @staticmethod
+    def _polygon_options(settings):
+        return {
+            'color': settings.get('edge_color') or settings.get('color'),
+            'opacity': settings.get('edge_alpha'),
+            'weight': settings.get('edge_width'),
+            'fillColor': settings.get('face_color') or settings.get('color'),
+            'fillOpacity': settings.get('face_alpha'),
+        }
+
+    @staticmethod
+    def _circle_options(settings):
+        color = settings.get('color') or settings.get('edge_color')
+        return {
+            'stroke': settings.get('stroke') != False,
+            'fill': settings.get('fill') != False,
+            'color': color,
+            'opacity': settings.get('opacity') or 1.0,
+            'weight': settings.get('weight') or 3,
+            'lineCap': settings.get('line_cap') or 'round',
+            'lineJoin': settings.get('line_join') or 'round',
+            'dashArray': settings.get('dash_array') or '',
+            'dashOffset': settings.get('dash_offset') or '',
+            'fillRule': settings.get('fill_rule') or 'evenodd',
+            'fillColor': settings.get('fill_color') or color,
+            'fillOpacity': settings.get('fill_opacity') or 0.2,
+            'bubblingMouseEvents': settings.get('bubbling_mouse_events') != False,
+        }
+
+    def _asset_urls(self):
+        return [LEAFLET_CSS_URL, LEAFLET_JS_URL] + ([LEAFLET_HEAT_URL] if self.heatmap_points else [])
+
+    def write_assets(self, f, assets=None):
+        """Link the Leaflet stylesheet and scripts from unpkg, or write the
+        tag given for each of their urls by ``assets``."""
+        if assets is not None:
+            f.write(''.join(assets[url] for url in self._asset_urls()))
+            return
+        f.write(
+            '<link rel="stylesheet" href="%s" '
+            'integrity="sha512-puBpdR0798OZvTTbP4A8Ix/l+A4dHDD0DGqYW6RQ+9jxkRFclaxxQb/SJAWZfWAkuyeQUytO7+7N4QKrDh+drA==" '
+            'crossorigin=""/>\n' % LEAFLET_CSS_URL)
+        f.write(
+            '<script src="%s"'
+            'integrity="sha512-nMMmRyTVoLYqjP9hrbed9S+FzjZHW5gY1TWCHA5ckwXZBadntCNs8kEqAWdrb9O7rxbCaA4lKTIWjDXZxflOcA=="'
+            'crossorigin=""></script>' % LEAFLET_JS_URL
+        )
+        if self.heatmap_points:
+            f.write('<script src="%s"></script>\n' % LEAFLET_HEAT_URL)
+
     # TODO: Add support for mapTypeId: google.maps.MapTypeId.SATELLITE
     def write_map(self,  f):
         f.write('\t\tvar MarkerIcon = L.Icon.extend({\n'
@@ -381,41 +1463,70 @@ class LeafletPlotter(object):
         f.write('\t\tllMap = L.map("mapid", {\n')
         f.write('\t\t\tzoomSnap: 0,\n')
         f.write('\t\t\tmaxZoom: 18\n')
-        f.write('\t\t\t}).setView([%f, %f], %d);\n' %
-                (self.center[0], self.center[1], self.zoom))
+        f.write('\t\t\t}).setView([%s, %s], %d);\n' %
+                (self.coordinate_format.number(self.center[0]),
+                 self.coordinate_format.number(self.center[1]), self.zoom))
         f.write('\t\tbaseLayer.addTo(llMap);\n')
+        f.write(COORDINATE_HELPERS)
+
+    def icon_url(self, color, inline=False):
+        """Url of the pin of ``color`` (a hex code without '#'): the bundled
+        image if there is one, else a data URI of a generated pin (the
+        default pin if ``color`` is not a hex code)."""
+        path = self.coloricon % color
+        if not inline and os.path.exists(path):
+            return path
+        return data_uri(pin_png(pin_color(color)))
+
+    def icon_png(self, color):
+        """The PNG image of the pin of ``color``: the bundled one if there is
+        one, else a generated one."""
+        path = self.coloricon % color
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+        return pin_png(pin_color(color))
+
+    def _icon_colors(self):
+        return sorted(set(icon_key(color) for layer in (self.point_layer, self.cluster_layer)
+                          for color in layer.color_table.values))
+
+    def write_icons(self, f, mode='url'):
+        """Define ``llIcons``, one icon per marker color, for the markers;
+        ``mode`` is one of :data:`~llplot.icons.ICON_MODES` or a dict of the
+        url of every color."""
+        colors = self._icon_colors()
+        if not colors:
+            return
+        if mode == 'sprite':
+            sheet, offsets = sprite_sheet(colors)
+            f.write(SPRITE_ICONS.format(payload=to_json({'sheet': data_uri(sheet), 'offsets': offsets}),
+                                        width=ICON_WIDTH, height=ICON_HEIGHT))
+        else:
+            if isinstance(mode, dict):
+                urls = dict((color, mode[color]) for color in colors)
+            else:
+                urls = dict((color, self.icon_url(color, mode == 'inline')) for color in colors)
+            f.write(ICONS.format(payload=to_json(urls)))
 
     def write_point(self, f, lat, lon, color, title, id):
-        f.write('\t\tvar latlng = [%f, %f];\n' %
-                (lat, lon))
-        f.write('\t\tvar img = new MarkerIcon({iconUrl: \'%s\'});\n' %
-                (self.coloricon % color))
-        f.write('\t\tvar marker'+str(id)+' = L.marker(latlng, {\n')
-        f.write('\t\ttitle: "%s",\n' % title)
-        f.write('\t\ticon: img,\n')
-        f.write('\t\t});\n')
-
-        if title != "no implementation":
-            f.write('\t\tmarker'+str(id)+'.bindPopup("'+title+'");\n')
-
-        f.write('\t\tmarker'+str(id)+'.addTo(llMap);\n')
-        f.write('\n')
-
-    def write_symbol(self, f, symbol, settings):
-        strokeColor = settings.get('color') or settings.get('edge_color')
-        strokeOpacity = settings.get('edge_alpha')
-        strokeWeight = settings.get('edge_width')
-        fillColor = settings.get('face_color')
-        fillOpacity = settings.get('face_alpha')
-        try:
-            template = SYMBOLS[symbol.symbol]
-        except KeyError:
-            raise InvalidSymbolError("Symbol %s is not implemented" % symbol.symbol)
-
-        f.write(template.format(lat=symbol.lat, long=symbol.long, size=symbol.size, strokeColor=strokeColor,
-                                strokeOpacity=strokeOpacity, strokeWeight=strokeWeight,
-                                fillColor=fillColor, fillOpacity=fillOpacity))
-
+        fmt = self.coordinate_format
+        self._write_marker(f, '[%s, %s]' % (fmt.number(lat), fmt.number(lon)), color, title, id)
+
+    @staticmethod
+    def _write_marker(f, latlng, color, title, id):
+        popup = ''
+        if title != DEFAULT_TITLE:
+            popup = '\t\tmarker%d.bindPopup("%s");\n' % (id, title)
+        f.write('\t\tvar latlng = %s;\n'
+                '\t\tvar img = llIcons["%s"];\n'
+                '\t\tvar marker%d = L.marker(latlng, {\n'
+                '\t\ttitle: "%s",\n'
+                '\t\ticon: img,\n'
+                '\t\t});\n'
+                '%s'
+                '\t\tmarker%d.addTo(llMap);\n'
+                '\n' % (latlng, color, id, title, popup, id))
 
     def write_circle(self, f, lat, lng, radius, settings):
 
@@ -432,7 +1543,8 @@ class LeafletPlotter(object):
         fillOpacity = settings.get('fill_opacity') or 0.2
         fillRule = settings.get('fill_rule') or "evenodd"
         bubblingMouseEvents = 0 if settings.get('bubbling_mouse_events') == False else 1
-        f.write(CIRCLE.format(latlng=[lat, lng], radius=radius, strokeColor=strokeColor,
+        fmt = self.coordinate_format
+        f.write(CIRCLE.format(latlng='[%s, %s]' % (fmt.number(lat), fmt.number(lng)), radius=radius, strokeColor=strokeColor,
                               strokeOpacity=strokeOpacity, strokeWeight=strokeWeight,fill=fill,
                               lineCap=lineCap, lineJoin=lineJoin, dashArray=dashArray,
                               dashOffset=dashOffset, fillRule=fillRule, bubblingMouseEvents=bubblingMouseEvents,
@@ -445,67 +1557,71 @@ class LeafletPlotter(object):
         strokeOpacity = settings.get('edge_alpha')
         strokeWeight = settings.get('edge_width')
 
-        f.write('var PolylineCoordinates = [\n')
-        for coordinate in path:
-            f.write('[%f, %f],\n' %
-                    (coordinate[0], coordinate[1]))
-        f.write('];\n')
-        f.write('\n')
-
-        f.write('var Path = L.polyline( PolylineCoordinates, {\n')
-        # f.write('clickable: %s,\n' % (str(clickable).lower()))
-        # f.write('geodesic: %s,\n' % (str(geodesic).lower()))
-        f.write('color: "%s",\n' % (strokeColor))
-        f.write('opacity: %f,\n' % (strokeOpacity))
-        f.write('weight: %d\n' % (strokeWeight))
-        f.write('}).addTo(llMap);\n')
-        f.write('\n\n')
+        if settings.get('encoding') == 'polyline':
+            f.write('var PolylineCoordinates = llLatLngs(%s, %d);\n\n'
+                    % (to_json(encode_polyline(path, settings['precision'])), settings['precision']))
+        else:
+            f.write('var PolylineCoordinates = [\n')
+            self._write_coordinates(f, path)
+            f.write('];\n'
+                    '\n')
+
+        # clickable: false, geodesic: true are not supported by Leaflet.
+        f.write('var Path = L.polyline( PolylineCoordinates, {\n'
+                'color: "%s",\n'
+                'opacity: %f,\n'
+                'weight: %d\n'
+                '}).addTo(llMap);\n'
+                '\n\n' % (strokeColor, strokeOpacity, strokeWeight))
 
     def write_polygon(self, f, path, settings):
-        clickable = False
-        geodesic = True
         strokeColor = settings.get('edge_color') or settings.get('color')
         strokeOpacity = settings.get('edge_alpha')
         strokeWeight = settings.get('edge_width')
         fillColor = settings.get('face_color') or settings.get('color')
         fillOpacity= settings.get('face_alpha')
-        f.write('var coords = [\n')
-        for coordinate in path:
-            f.write('new google.maps.LatLng(%f, %f),\n' %
-                    (coordinate[0], coordinate[1]))
-        f.write('];\n')
-        f.write('\n')
-
-        f.write('var polygon = new google.maps.Polygon({\n')
-        f.write('clickable: %s,\n' % (str(clickable).lower()))
-        f.write('geodesic: %s,\n' % (str(geodesic).lower()))
-        f.write('fillColor: "%s",\n' % (fillColor))
-        f.write('fillOpacity: %f,\n' % (fillOpacity))
-        f.write('paths: coords,\n')
-        f.write('strokeColor: "%s",\n' % (strokeColor))
-        f.write('strokeOpacity: %f,\n' % (strokeOpacity))
-        f.write('strokeWeight: %d\n' % (strokeWeight))
-        f.write('});\n')
-        f.write('\n')
-        f.write('polygon.setMap(map);\n')
-        f.write('\n\n')
+        if settings.get('encoding') == 'polyline':
+            f.write('var coords = llLatLngs(%s, %d);\n\n'
+                    % (to_json(encode_polyline(path, settings['precision'])), settings['precision']))
+        else:
+            f.write('var coords = [\n')
+            self._write_coordinates(f, path)
+            f.write('];\n'
+                    '\n')
+
+        f.write('var polygon = L.polygon(coords, {\n'
+                'color: "%s",\n'
+                'opacity: %f,\n'
+                'weight: %d,\n'
+                'fillColor: "%s",\n'
+                'fillOpacity: %f\n'
+                '}).addTo(llMap);\n'
+                '\n\n' % (strokeColor, strokeOpacity, strokeWeight, fillColor, fillOpacity))
+
+    def _write_coordinates(self, f, path, chunk_size=JSON_CHUNK_SIZE):
+        """Write ``[lat, lng],`` lines, one write per ``chunk_size`` vertices."""
+        path = np.asarray(path, dtype=float)
+        for start in range(0, len(path), chunk_size):
+            chunk = path[start:start + chunk_size]
+            f.write(self.coordinate_format.rows([chunk[:, 0], chunk[:, 1]], ['[', ', ', '],\n']))
 
     def write_heatmap(self, f):
-        for heatmap_points, settings_string in self.heatmap_points:
-            f.write('var heatmap_points = [\n')
-            for heatmap_lat, heatmap_lng in heatmap_points:
-                f.write('new google.maps.LatLng(%f, %f),\n' %
-                        (heatmap_lat, heatmap_lng))
-            f.write('];\n')
-            f.write('\n')
-            f.write('var pointArray = new google.maps.MVCArray(heatmap_points);' + '\n')
-            f.write('var heatmap;' + '\n')
-            f.write('heatmap = new google.maps.visualization.HeatmapLayer({' + '\n')
-            f.write('\n')
-            f.write('data: pointArray' + '\n')
-            f.write('});' + '\n')
-            f.write('heatmap.setMap(map);' + '\n')
-            f.write(settings_string)
+        for layer, settings in self.heatmap_points:
+            if not len(layer):
+                continue
+            lats, lngs = layer.centers()
+            head, tail = template_parts(HEATMAP_LOOP)
+            f.write(head)
+            f.write('{"lat":')
+            write_json_array(f, lats, self.coordinate_format.precision)
+            f.write(',"lng":')
+            write_json_array(f, lngs, self.coordinate_format.precision)
+            f.write(',"weight":')
+            write_json_array(f, layer.weights, 6)
+            f.write(',"options":%s,"opacity":%s,"dissipating":%s}' % (
+                to_json(self._process_heatmap_kwargs(settings, layer)),
+                to_json(settings['opacity']), to_json(bool(settings['dissipating']))))
+            f.write(tail)
 
     def write_ground_overlay(self, f):
 
@@ -519,46 +1635,114 @@ class LeafletPlotter(object):
             f.write('groundOverlay.setMap(map);' + '\n')
 
     def write_fitbounds(self, f):
-        if self.bounding_box is None:
+        bounding_box = self.bounding_box
+        if bounding_box is None and self.auto_fit:
+            bounds = self.bounds()
+            if not bounds.empty:
+                bounding_box = [bounds.north, bounds.east, bounds.south, bounds.west]
+        if bounding_box is None:
             return
-        nelat = self.bounding_box[0]
-        nelng = self.bounding_box[1]
-        swlat = self.bounding_box[2]
-        swlng = self.bounding_box[3]
+        f.write('var bounds = [[%s, %s], [%s, %s]];\n'
+                'llMap.fitBounds(bounds);\n' % tuple(self.coordinate_format.number(value)
+                                                    for value in bounding_box))
+
+
+def _feature_batches(features, styles, options, size=JSON_CHUNK_SIZE // 2):
+    """Split compact features into lists of ``(style id, coordinates,
+    encoding, precision)`` holding about ``size`` vertices each."""
+    batch, vertices = [], 0
+    for coords, settings in features:
+        batch.append((styles.index(settings, options), coords,
+                      settings.get('encoding'), settings.get('precision')))
+        vertices += len(coords)
+        if vertices >= size:
+            yield batch
+            batch, vertices = [], 0
+    if batch:
+        yield batch
+
+
+def _features_json(features, decimals):
+    """The JSON written by ``_write_features_compact`` for a batch of
+    :func:`_feature_batches`, without the separating commas around it."""
+    parts = []
+    for style_id, coords, encoding, precision in features:
+        if encoding == 'polyline':
+            parts.append('[%d,%s,%d]' % (style_id, to_json(encode_polyline(coords, precision)),
+                                         precision))
+        else:
+            parts.append('[%d,[%s]]' % (style_id, json_values(np.asarray(coords, dtype=float).ravel(),
+                                                               decimals)))
+    return ','.join(parts)
+
+
+class _StyleIndex(object):
+    """Deduplicates Leaflet option dicts for the compact writers.
+
+    ``options(style)`` is only called once per distinct style, the other
+    features of that style get its index from a lookup.
+    """
+
+    def __init__(self):
+        self.styles = []
+        self._ids = {}
+        self._style_ids = {}
+
+    def index(self, style, options):
+        style_id = self._style_ids.get((style, options))
+        if style_id is None:
+            option_dict = options(style)
+            key = to_json(option_dict)
+            style_id = self._ids.get(key)
+            if style_id is None:
+                style_id = self._ids[key] = len(self.styles)
+                self.styles.append(option_dict)
+            self._style_ids[(style, options)] = style_id
+        return style_id
+
+
+def add_demo_features(plotter):
+    """Add the features of the demo map around Stanford University (drawn
+    by ``python -m llplot.llplot``, and the ``demo`` benchmark)."""
+    plotter.grid(37.42, 37.43, 0.001, -122.15, -122.14, 0.001)
+    plotter.marker(37.427, -122.145, "yellow")
+    plotter.marker(37.428, -122.146, "cornflowerblue")
+    plotter.marker(37.429, -122.144, "k")
+    # Where geocoding "Stanford University" leads, without the network.
+    plotter.marker(37.427474, -122.169719, "red")
+    plotter.circle(37.429, -122.145, 100, "#FF0000", ew=2)
+    path = [(37.429, 37.428, 37.427, 37.427, 37.427),
+            (-122.145, -122.145, -122.145, -122.146, -122.146)]
+    path2 = [[i + .01 for i in path[0]], [i + .02 for i in path[1]]]
+    path3 = [(37.433302, 37.431257, 37.427644, 37.430303),
+             (-122.14488, -122.133121, -122.137799, -122.148743)]
+    path4 = [(37.423074, 37.422700, 37.422410, 37.422188, 37.422274, 37.422495, 37.422962,
+              37.423552, 37.424387, 37.425920, 37.425937),
+             (-122.150288, -122.149794, -122.148936, -122.148142, -122.146747, -122.14561,
+              -122.144773, -122.143936, -122.142992, -122.147863, -122.145953)]
+    plotter.plot(path[0], path[1], "plum", edge_width=10)
+    plotter.plot(path2[0], path2[1], "red")
+    plotter.polygon(path3[0], path3[1], edge_color="cyan", edge_width=5, face_color="blue",
+                    face_alpha=0.1)
+    plotter.heatmap(path4[0], path4[1], threshold=10, radius=40)
+    plotter.heatmap(path3[0], path3[1], threshold=10, radius=40, dissipating=False,
+                    gradient=[(30, 30, 30, 0), (30, 30, 30, 1), (50, 50, 50, 1)])
+    plotter.scatter(path4[0], path4[1], c='r', marker=True)
+    plotter.scatter(path4[0], path4[1], s=90, marker=False, alpha=0.9, symbol='x', c='red',
+                    edge_width=4)
+    # Get more points with:
+    # http://www.findlatitudeandlongitude.com/click-lat-lng-list/
+    scatter_path = ([37.424435, 37.424417, 37.424417, 37.424554, 37.424775, 37.425099, 37.425235,
+                     37.425082, 37.424656, 37.423957, 37.422952, 37.421759, 37.420447, 37.419135,
+                     37.417822, 37.417209],
+                    [-122.142048, -122.141275, -122.140503, -122.139688, -122.138872, -122.138078,
+                     -122.137241, -122.136405, -122.135568, -122.134731, -122.133894, -122.133057,
+                     -122.13222, -122.131383, -122.130557, -122.129999])
+    plotter.scatter(scatter_path[0], scatter_path[1], c='r', marker=True)
 
-        f.write('var bounds = [[%f, %f], [%f, %f]];\n' %
-                (self.bounding_box[0], self.bounding_box[1],
-                 self.bounding_box[2], self.bounding_box[3]))
-        f.write('llMap.fitBounds(bounds);\n')
 
 if __name__ == "__main__":
 
-    mymap = LeafletPlotter(37.428, -122.145, 16)
-    # mymap = GoogleMapPlotter.from_geocode("Stanford University")
-
-    mymap.grid(37.42, 37.43, 0.001, -122.15, -122.14, 0.001)
-    mymap.marker(37.427, -122.145, "yellow")
-    mymap.marker(37.428, -122.146, "cornflowerblue")
-    mymap.marker(37.429, -122.144, "k")
-    lat, lng = mymap.geocode("Stanford University")
-    mymap.marker(lat, lng, "red")
-    mymap.circle(37.429, -122.145, 100, "#FF0000", ew=2)
-    path = [(37.429, 37.428, 37.427, 37.427, 37.427),
-             (-122.145, -122.145, -122.145, -122.146, -122.146)]
-    path2 = [[i+.01 for i in path[0]], [i+.02 for i in path[1]]]
-    path3 = [(37.433302 , 37.431257 , 37.427644 , 37.430303), (-122.14488, -122.133121, -122.137799, -122.148743)]
-    path4 = [(37.423074, 37.422700, 37.422410, 37.422188, 37.422274, 37.422495, 37.422962, 37.423552, 37.424387, 37.425920, 37.425937),
-         (-122.150288, -122.149794, -122.148936, -122.148142, -122.146747, -122.14561, -122.144773, -122.143936, -122.142992, -122.147863, -122.145953)]
-    mymap.plot(path[0], path[1], "plum", edge_width=10)
-    mymap.plot(path2[0], path2[1], "red")
-    mymap.polygon(path3[0], path3[1], edge_color="cyan", edge_width=5, face_color="blue", face_alpha=0.1)
-    mymap.heatmap(path4[0], path4[1], threshold=10, radius=40)
-    mymap.heatmap(path3[0], path3[1], threshold=10, radius=40, dissipating=False, gradient=[(30,30,30,0), (30,30,30,1), (50, 50, 50, 1)])
-    mymap.scatter(path4[0], path4[1], c='r', marker=True)
-    mymap.scatter(path4[0], path4[1], s=90, marker=False, alpha=0.9, symbol='x', c='red', edge_width=4)
-    # Get more points with:
-    # http://www.findlatitudeandlongitude.com/click-lat-lng-list/
-    scatter_path = ([37.424435, 37.424417, 37.424417, 37.424554, 37.424775, 37.425099, 37.425235, 37.425082, 37.424656, 37.423957, 37.422952, 37.421759, 37.420447, 37.419135, 37.417822, 37.417209],
-                    [-122.142048, -122.141275, -122.140503, -122.139688, -122.138872, -122.138078, -122.137241, -122.136405, -122.135568, -122.134731, -122.133894, -122.133057, -122.13222, -122.131383, -122.130557, -122.129999])
-    mymap.scatter(scatter_path[0], scatter_path[1], c='r', marker=True)
+    mymap = LeafletPlotter('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', 37.428, -122.145, 16)
+    add_demo_features(mymap)
     mymap.draw('./mymap.html')
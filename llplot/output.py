@@ -0,0 +1,193 @@
+from __future__ import absolute_import
+
+import collections
+import io
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from llplot.formatting import format_values
+
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+JSON_CHUNK_SIZE = 1 << 16
+
+
+class BufferedWriter(object):
+    """Collects the many small writes done by the ``write_*`` methods and
+    forwards them to ``target`` in chunks of about ``buffer_size`` characters.
+
+    ``target`` may be a text or binary file-like object (anything with a
+    ``write`` method, e.g. a gzip stream or an HTTP response) or a socket
+    (anything with ``sendall``). Binary targets receive UTF-8 bytes.
+
+    Writers may hand big serialization jobs to ``serializer``, a
+    :class:`ParallelSerializer`, when there is one.
+    """
+
+    def __init__(self, target, buffer_size=DEFAULT_BUFFER_SIZE, encoding='utf-8', serializer=None):
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.serializer = serializer
+        self.bytes_written = 0
+        self._flushed = 0
+        self._chunks = []
+        self._size = 0
+        if hasattr(target, 'write'):
+            self._send = target.write
+            self._binary = _is_binary(target)
+        elif hasattr(target, 'sendall'):
+            self._send = target.sendall
+            self._binary = True
+        else:
+            raise TypeError("can not write html to %r" % (target,))
+
+    def write(self, text):
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    @property
+    def position(self):
+        """Number of characters written so far, flushed or not."""
+        return self._flushed + self._size
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if not self._chunks:
+            return
+        data = ''.join(self._chunks)
+        self._chunks = []
+        self._flushed += self._size
+        self._size = 0
+        if self._binary is None:
+            try:
+                self._send(data)
+                self._binary = False
+                self.bytes_written += len(data)
+                return
+            except TypeError:
+                self._binary = True
+        if self._binary:
+            data = data.encode(self.encoding)
+        self._send(data)
+        self.bytes_written += len(data)
+
+
+def _is_binary(fileobj):
+    """True, False, or None when it has to be found out on the first write."""
+    if isinstance(fileobj, io.TextIOBase):
+        return False
+    if isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    mode = getattr(fileobj, 'mode', None)
+    if isinstance(mode, str):
+        return 'b' in mode
+    return None
+
+
+class ParallelSerializer(object):
+    """Runs serialization jobs in ``workers`` processes.
+
+    :meth:`map` yields the results in input order, with at most a few jobs
+    per worker queued, so the output is the same as serial mode whatever
+    order the workers finish in, and memory stays bounded.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(workers)
+
+    def map(self, function, items, *args):
+        pending = collections.deque()
+        for item in items:
+            pending.append(self._pool.submit(function, item, *args))
+            if len(pending) >= 4 * self.workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        self._pool.shutdown()
+
+
+@contextmanager
+def open_output(target, buffer_size=DEFAULT_BUFFER_SIZE, workers=None):
+    """Yield a :class:`BufferedWriter` for a path or a file-like object.
+
+    Paths are opened (and closed) here; file-like objects are only flushed,
+    closing them is left to the caller. With more than one of ``workers``,
+    the writer gets a :class:`ParallelSerializer`.
+    """
+    serializer = ParallelSerializer(workers) if workers and workers > 1 else None
+    try:
+        if isinstance(target, (str, bytes)) or hasattr(target, '__fspath__'):
+            with io.open(os.fspath(target), 'w', encoding='utf-8') as fileobj:
+                writer = BufferedWriter(fileobj, buffer_size, serializer=serializer)
+                yield writer
+                writer.flush()
+            return
+        writer = BufferedWriter(target, buffer_size, serializer=serializer)
+        yield writer
+        writer.flush()
+        if hasattr(target, 'flush'):
+            target.flush()
+    finally:
+        if serializer is not None:
+            serializer.close()
+
+
+def to_json(obj):
+    """Compact JSON that is safe to embed inside a <script> block."""
+    return json.dumps(obj, separators=(',', ':')).replace('</', '<\\/')
+
+
+def json_values(values, decimals=None):
+    """The items of a JSON list of ``values``, without the brackets.
+
+    Integers, and floats rounded to ``decimals``, are formatted by
+    :func:`~llplot.formatting.format_values` (without trailing zeros).
+    """
+    if decimals is not None and values.dtype.kind == 'f':
+        return format_values(values, decimals, strip_zeros=True)
+    if values.dtype.kind in 'iu':
+        return format_values(values, 0)
+    return json.dumps(values.tolist(), separators=(',', ':'))[1:-1]
+
+
+def write_json_array(f, values, decimals=None, chunk_size=JSON_CHUNK_SIZE):
+    """Write a 1-D numpy array as a JSON list, ``chunk_size`` values at a time.
+
+    Only one chunk is ever converted to Python objects, so huge columns are
+    streamed with flat memory use. Columns of several chunks are converted
+    in parallel when ``f`` has a serializer.
+    """
+    chunks = (values[start:start + chunk_size] for start in range(0, len(values), chunk_size))
+    serializer = getattr(f, 'serializer', None)
+    if serializer is not None and len(values) > 2 * chunk_size:
+        texts = serializer.map(json_values, chunks, decimals)
+    else:
+        texts = (json_values(chunk, decimals) for chunk in chunks)
+    f.write('[')
+    for i, text in enumerate(texts):
+        if i:
+            f.write(',')
+        f.write(text)
+    f.write(']')
+
+
+def template_parts(template, **kwargs):
+    """Split a ``str.format`` template around its ``{payload}`` field.
+
+    The two halves are written before and after a payload that is streamed
+    straight into the writer instead of being formatted in memory.
+    """
+    marker = '\0payload\0'
+    head, tail = template.format(payload=marker, **kwargs).split(marker)
+    return head, tail
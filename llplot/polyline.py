@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+import numpy as np
+
+
+ENCODINGS = ('polyline',)
+MAX_PRECISION = 8
+
+# An int64 needs at most 13 chunks of 5 bits.
+_CHUNKS = 13
+_SHIFTS = np.arange(_CHUNKS, dtype=np.int64) * 5
+
+
+def encode(path, precision=5):
+    """Encode an ``(n, 2)`` lat/lng array with Google's polyline algorithm.
+
+    Coordinates are quantized to ``precision`` decimals and delta encoded,
+    then every value is zigzag encoded and split in 5 bit chunks, all with
+    numpy. The result only holds characters from '?' (63) to '~' (126).
+    """
+    if not 0 <= precision <= MAX_PRECISION:
+        raise ValueError("precision must be between 0 and %d, got %r" % (MAX_PRECISION, precision))
+    path = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+    if not len(path):
+        return ''
+    quantized = np.round(path * 10 ** precision).astype(np.int64)
+    deltas = np.diff(quantized, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = (deltas << 1) ^ (deltas >> 63)
+
+    chunks = (values[:, None] >> _SHIFTS) & 31
+    sizes = 1 + ((values[:, None] >> _SHIFTS[1:]) > 0).sum(axis=1)
+    more = np.arange(_CHUNKS) < (sizes - 1)[:, None]
+    chunks = chunks | (more * 0x20)
+    used = np.arange(_CHUNKS) < sizes[:, None]
+    return (chunks[used] + 63).astype(np.uint8).tobytes().decode('ascii')
+
+
+def decode(encoded, precision=5):
+    """Inverse of :func:`encode`, an ``(n, 2)`` float array."""
+    codes = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    ends = np.flatnonzero(codes < 0x20)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(codes)) - np.repeat(starts, ends - starts + 1)
+    values = np.add.reduceat((codes & 31) << (5 * position), starts) if len(codes) else codes
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / 10.0 ** precision
@@ -0,0 +1,152 @@
+from __future__ import absolute_import
+
+import gzip
+import hashlib
+import io
+import os
+
+from collections import namedtuple
+
+import requests
+
+
+LEAFLET_VERSION = '1.3.4'
+LEAFLET_CSS_URL = 'https://unpkg.com/leaflet@%s/dist/leaflet.css' % LEAFLET_VERSION
+LEAFLET_JS_URL = 'https://unpkg.com/leaflet@%s/dist/leaflet.js' % LEAFLET_VERSION
+LEAFLET_HEAT_URL = 'https://unpkg.com/leaflet.heat@0.2.0/dist/leaflet-heat.js'
+# File names of the assets in a ``leaflet_dir`` and in the download cache.
+ASSET_FILES = {
+    LEAFLET_CSS_URL: 'leaflet.css',
+    LEAFLET_JS_URL: 'leaflet.js',
+    LEAFLET_HEAT_URL: 'leaflet-heat.js',
+}
+ASSET_MODES = ('inline', 'copy')
+COMPRESSIONS = ('gzip', 'brotli')
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'llplot',
+                                 'leaflet-%s' % LEAFLET_VERSION)
+
+
+PublishedFile = namedtuple('PublishedFile', ['path', 'raw', 'gzip', 'brotli'])
+PublishedFile.__doc__ = """A file written by :meth:`LeafletPlotter.publish`
+and its sizes in bytes: ``raw``, and ``gzip``/``brotli`` for its compressed
+siblings (None when they were not written)."""
+
+
+class PublishReport(object):
+    """The files of a published page, the page first."""
+
+    def __init__(self, files):
+        self.files = files
+
+    @property
+    def path(self):
+        return self.files[0].path
+
+    def total(self, field='raw'):
+        sizes = [getattr(published, field) for published in self.files]
+        return None if None in sizes else sum(sizes)
+
+    def __str__(self):
+        lines = ['%-40s %12s %12s %12s' % ('file', 'raw', 'gzip', 'brotli')]
+        for published in self.files + [PublishedFile('total', self.total(), self.total('gzip'),
+                                                     self.total('brotli'))]:
+            lines.append('%-40s %12s %12s %12s' % tuple(
+                [os.path.basename(published.path)] +
+                ['-' if size is None else '%d' % size for size in published[1:]]))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'PublishReport(%d files, %s raw bytes)' % (len(self.files), self.total())
+
+
+def content_name(name, data):
+    """``name`` with a hash of ``data`` before its extension, e.g.
+    ``leaflet.1a2b3c4d5e.js``: the file can be cached forever, as any change
+    gives it a new name."""
+    stem, extension = os.path.splitext(name)
+    return '%s.%s%s' % (stem, hashlib.sha256(data).hexdigest()[:10], extension)
+
+
+def load_asset(url, leaflet_dir=None, cache_dir=DEFAULT_CACHE_DIR, timeout=30):
+    """The bytes of one of the :data:`ASSET_FILES`: read from
+    ``leaflet_dir`` when given, else downloaded once into ``cache_dir``."""
+    name = ASSET_FILES[url]
+    if leaflet_dir is not None:
+        with open(os.path.join(leaflet_dir, name), 'rb') as f:
+            return f.read()
+    path = os.path.join(cache_dir, name)
+    if not os.path.exists(path):
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # Written under another name first, so that concurrent downloads
+        # never leave a truncated file.
+        partial = '%s.%d' % (path, os.getpid())
+        with open(partial, 'wb') as f:
+            f.write(response.content)
+        os.replace(partial, path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def minify(html):
+    """Drop the indentation, blank lines and ``//`` comment lines of a page.
+
+    Lines are kept, so that the JavaScript does not depend on where
+    semicolons may be omitted; no line of the generated scripts continues a
+    string from the line before.
+    """
+    lines = (line.strip() for line in html.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+def inline_tag(url, data):
+    """A ``<style>`` or ``<script>`` element holding an asset."""
+    text = data.decode('utf-8')
+    if url.endswith('.css'):
+        return '<style>\n%s\n</style>\n' % text.replace('</style', '<\\/style')
+    return '<script>\n%s\n</script>\n' % text.replace('</script', '<\\/script')
+
+
+def link_tag(url):
+    if url.endswith('.css'):
+        return '<link rel="stylesheet" href="%s"/>\n' % url
+    return '<script src="%s"></script>\n' % url
+
+
+def _compressor(method):
+    if method == 'gzip':
+        # No timestamp: the same page always gives the same bytes.
+        return '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if method == 'brotli':
+        try:
+            import brotli
+        except ImportError:
+            raise ImportError("brotli compression needs the brotli package: pip install llplot[brotli]")
+        return '.br', brotli.compress
+    raise ValueError("compression must be one of %s, got %r" % (', '.join(COMPRESSIONS), method))
+
+
+def default_compressions():
+    """gzip, and brotli when the package is installed."""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return ('gzip',)
+    return COMPRESSIONS
+
+
+def write_file(path, data, compressions=()):
+    """Write ``data`` to ``path`` and a ``.gz``/``.br`` sibling for every
+    one of ``compressions``; return its :class:`PublishedFile`."""
+    with io.open(path, 'wb') as f:
+        f.write(data)
+    sizes = {}
+    for method in compressions:
+        suffix, compress = _compressor(method)
+        compressed = compress(data)
+        with io.open(path + suffix, 'wb') as f:
+            f.write(compressed)
+        sizes[method] = len(compressed)
+    return PublishedFile(path, len(data), sizes.get('gzip'), sizes.get('brotli'))
@@ -0,0 +1,122 @@
+from __future__ import absolute_import
+
+from collections import namedtuple
+
+import numpy as np
+
+
+EARTH_RADIUS_M = 6378137.0
+# Ground resolution of a 256px Web Mercator tile at zoom 0 on the equator.
+METERS_PER_PIXEL_Z0 = 2 * np.pi * EARTH_RADIUS_M / 256
+
+
+class SimplifyReport(namedtuple('SimplifyReport', ['vertices', 'levels'])):
+    """How many vertices a simplified path kept.
+
+    ``levels`` is a list of ``(zoom, kept)`` pairs, with ``zoom`` None when
+    the path was simplified with a fixed tolerance in meters.
+    """
+
+    @property
+    def kept(self):
+        return max(kept for _, kept in self.levels)
+
+    @property
+    def dropped(self):
+        return self.vertices - self.kept
+
+
+def meters_per_pixel(lat, zoom):
+    return METERS_PER_PIXEL_Z0 * np.cos(np.radians(lat)) / 2.0 ** zoom
+
+
+def local_meters(path):
+    """Equirectangular projection of ``(n, 2)`` lat/lng vertices, in meters."""
+    if not len(path):
+        return np.empty((0, 2))
+    lats = np.radians(path[:, 0].astype(np.float64))
+    lngs = np.radians(path[:, 1].astype(np.float64))
+    xy = np.empty((len(path), 2))
+    xy[:, 0] = EARTH_RADIUS_M * lngs * np.cos(lats.mean())
+    xy[:, 1] = EARTH_RADIUS_M * lats
+    return xy
+
+
+def dp_importance(xy, min_tolerance=0.0):
+    """Douglas-Peucker importance of every vertex of ``xy``.
+
+    A vertex is kept by Douglas-Peucker with tolerance ``t`` exactly when its
+    importance is greater than ``t``: the importance is its distance to the
+    chord that was split at it, capped by the importance of the vertex that
+    created that chord. Computing it once gives every level of detail with a
+    simple comparison.
+
+    All segments of one recursion depth are processed together with numpy,
+    so the Python loop runs once per depth rather than once per vertex.
+    Segments whose farthest vertex is within ``min_tolerance`` are not split
+    any further.
+    """
+    n = len(xy)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = importance[-1] = np.inf
+    starts = np.array([0])
+    ends = np.array([n - 1])
+    caps = np.array([np.inf])
+    while len(starts):
+        lengths = ends - starts - 1
+        active = lengths > 0
+        starts, ends, caps, lengths = starts[active], ends[active], caps[active], lengths[active]
+        if not len(starts):
+            break
+        offsets = np.cumsum(lengths) - lengths
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        index = starts[segment] + 1 + np.arange(lengths.sum()) - offsets[segment]
+
+        a = xy[starts[segment]]
+        ab = xy[ends[segment]] - a
+        ap = xy[index] - a
+        norm = (ab * ab).sum(axis=1)
+        t = np.where(norm > 0, (ap * ab).sum(axis=1) / np.where(norm > 0, norm, 1), 0)
+        delta = ap - np.clip(t, 0, 1)[:, None] * ab
+        distance = np.sqrt((delta * delta).sum(axis=1))
+
+        farthest = np.maximum.reduceat(distance, offsets)
+        is_max = np.flatnonzero(distance == farthest[segment])
+        _, first = np.unique(segment[is_max], return_index=True)
+        split = index[is_max[first]]
+
+        keep = farthest > min_tolerance
+        split, farthest = split[keep], np.minimum(farthest[keep], caps[keep])
+        importance[split] = farthest
+        starts, ends = (np.concatenate((starts[keep], split)),
+                        np.concatenate((split, ends[keep])))
+        caps = np.concatenate((farthest, farthest))
+    return importance
+
+
+def simplify_path(path, tolerance=None, tolerance_px=None, zooms=None):
+    """Simplify an ``(n, 2)`` lat/lng path with Douglas-Peucker.
+
+    :param tolerance: maximum deviation in meters, gives a single level
+    :param tolerance_px: maximum deviation in screen pixels, gives one level
+        per zoom in ``zooms``
+    :return: ``(levels, report)`` where ``levels`` is a list of
+        ``(zoom, path)`` sorted by zoom (``zoom`` is None for ``tolerance``)
+        and ``report`` a :class:`SimplifyReport`
+    """
+    if (tolerance is None) == (tolerance_px is None):
+        raise ValueError("give exactly one of tolerance (meters) or tolerance_px")
+    if tolerance is not None:
+        tolerances = [(None, float(tolerance))]
+    else:
+        if not zooms:
+            raise ValueError("tolerance_px needs at least one zoom level")
+        mean_lat = float(np.mean(path[:, 0])) if len(path) else 0.0
+        tolerances = [(zoom, tolerance_px * meters_per_pixel(mean_lat, zoom))
+                      for zoom in sorted(set(zooms))]
+    importance = dp_importance(local_meters(path), min(t for _, t in tolerances))
+    levels = [(zoom, path[importance > t]) for zoom, t in tolerances]
+    report = SimplifyReport(len(path), [(zoom, len(level)) for zoom, level in levels])
+    return levels, report
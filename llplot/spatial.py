@@ -0,0 +1,206 @@
+from __future__ import absolute_import
+
+import numpy as np
+
+from llplot.layers import as_array
+from llplot.simplify import EARTH_RADIUS_M
+
+
+# Cells per axis of the 3D grid of thin() are packed in 21 bits each.
+_AXIS_BITS = 21
+
+
+def haversine(lat, lng, lats, lngs):
+    """Distances in meters from ``(lat, lng)`` to arrays of points."""
+    lat, lng, lats, lngs = np.radians(lat), np.radians(lng), np.radians(lats), np.radians(lngs)
+    a = (np.sin((lats - lat) / 2) ** 2
+         + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _ranges(starts, ends):
+    """Concatenation of ``arange(start, end)`` for every pair, vectorized."""
+    counts = ends - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+class GridIndex(object):
+    """Static grid hash over points, for box and radius queries.
+
+    Points are bucketed in square cells of ``cell_size`` degrees and sorted
+    by cell, row by row, so the cells of one row of a query box are a single
+    contiguous slice found by binary search: a query costs
+    ``O(rows * log n + matches)`` instead of a scan of all the points. Besides
+    a copy of the coordinates, the index holds two int64 arrays of the size
+    of the data.
+
+    :param cell_size: in degrees; by default about 4 points per cell for
+        uniformly spread data
+    """
+
+    def __init__(self, lats, lngs, cell_size=None):
+        # A snapshot: the index stays valid when the source arrays change.
+        self.lats = as_array(lats, np.float64).copy()
+        self.lngs = as_array(lngs, np.float64).copy()
+        if len(self.lats) != len(self.lngs):
+            raise ValueError("lats and lngs must have the same length (%d != %d)"
+                             % (len(self.lats), len(self.lngs)))
+        if cell_size is None:
+            span = 0.0
+            if len(self.lats):
+                span = max(np.ptp(self.lats), np.ptp(self.lngs))
+            cell_size = max(span / np.sqrt(max(len(self.lats) / 4.0, 1.0)), 1e-6)
+        self.cell_size = float(cell_size)
+        self.columns = int(np.ceil(360.0 / self.cell_size)) + 1
+        keys = self._rows(self.lats) * self.columns + self._columns(self.lngs)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.lats)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.order.nbytes
+
+    def _rows(self, lats):
+        return np.floor((np.asarray(lats) + 90.0) / self.cell_size).astype(np.int64)
+
+    def _columns(self, lngs):
+        return np.floor((np.asarray(lngs) + 180.0) / self.cell_size).astype(np.int64)
+
+    def bbox(self, south, west, north, east):
+        """Sorted indices of the points inside a box (edges included). A box
+        with ``west > east`` crosses the antimeridian."""
+        if west > east:
+            return np.union1d(self.bbox(south, west, north, 180.0),
+                              self.bbox(south, -180.0, north, east))
+        rows = np.arange(self._rows(max(south, -90.0)), self._rows(min(north, 90.0)) + 1)
+        first, last = self._columns(max(west, -180.0)), self._columns(min(east, 180.0))
+        starts = np.searchsorted(self.keys, rows * self.columns + first, 'left')
+        ends = np.searchsorted(self.keys, rows * self.columns + last, 'right')
+        candidates = self.order[_ranges(starts, ends)]
+        lats, lngs = self.lats[candidates], self.lngs[candidates]
+        inside = (lats >= south) & (lats <= north) & (lngs >= west) & (lngs <= east)
+        return np.sort(candidates[inside])
+
+    def radius(self, lat, lng, radius_m):
+        """Sorted indices of the points at most ``radius_m`` meters (great
+        circle) from ``(lat, lng)``."""
+        dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+        south, north = lat - dlat, lat + dlat
+        widest = max(abs(south), abs(north))
+        if widest >= 90.0:
+            west, east = -180.0, 180.0
+        else:
+            dlng = dlat / np.cos(np.radians(widest))
+            if dlng >= 180.0:
+                west, east = -180.0, 180.0
+            else:
+                west, east = (lng - dlng + 180.0) % 360.0 - 180.0, (lng + dlng + 180.0) % 360.0 - 180.0
+        candidates = self.bbox(south, west, north, east)
+        close = haversine(lat, lng, self.lats[candidates], self.lngs[candidates]) <= radius_m
+        return candidates[close]
+
+
+def _unit_vectors(lats, lngs):
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    return np.column_stack((np.cos(lats) * np.cos(lngs), np.cos(lats) * np.sin(lngs), np.sin(lats)))
+
+
+def close_pairs(lats, lngs, distance_m, other_lats=None, other_lngs=None):
+    """Pairs of points at most ``distance_m`` meters apart.
+
+    Points are placed on the unit sphere and bucketed in a 3D grid whose
+    cells are as wide as the chord of ``distance_m``; only the 27 cells
+    around each point are compared, all with numpy.
+
+    :return: ``(i, j)`` index arrays; without ``other_*`` the pairs of the
+        points among themselves with ``j < i``, else ``i`` indexes the
+        points and ``j`` the other points
+    """
+    xyz = _unit_vectors(as_array(lats, np.float64), as_array(lngs, np.float64))
+    same = other_lats is None
+    other = xyz if same else _unit_vectors(as_array(other_lats, np.float64),
+                                           as_array(other_lngs, np.float64))
+    chord = 2 * np.sin(min(distance_m / EARTH_RADIUS_M, np.pi) / 2)
+    if not len(xyz) or not len(other) or chord <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    origin = np.minimum(xyz.min(axis=0), other.min(axis=0)) - chord
+    cells = np.floor((xyz - origin) / chord).astype(np.int64) + 1
+    other_cells = np.floor((other - origin) / chord).astype(np.int64) + 1
+    if max(cells.max(), other_cells.max()) + 2 >= 1 << _AXIS_BITS:
+        raise ValueError("points too spread out for a distance of %r m" % (distance_m,))
+
+    def pack(c):
+        return (c[:, 0] << (2 * _AXIS_BITS)) | (c[:, 1] << _AXIS_BITS) | c[:, 2]
+
+    # Both sets are sorted by cell: the queries then stay sorted once shifted
+    # to a neighbour cell, and the searches and gathers below run through
+    # memory in order.
+    keys = pack(cells)
+    query_order = np.argsort(keys, kind='stable')
+    keys = keys[query_order]
+    xyz = xyz[query_order]
+    other_keys = pack(other_cells)
+    order = query_order if same else np.argsort(other_keys, kind='stable')
+    other = xyz if same else other[order]
+    cell_keys, cell_starts, cell_counts = np.unique(other_keys[order], return_index=True,
+                                                    return_counts=True)
+    firsts, seconds = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                shifted = keys + ((dx << (2 * _AXIS_BITS)) + (dy << _AXIS_BITS) + dz)
+                found = np.minimum(np.searchsorted(cell_keys, shifted), len(cell_keys) - 1)
+                hit = np.flatnonzero(cell_keys[found] == shifted)
+                starts = cell_starts[found[hit]]
+                counts = cell_counts[found[hit]]
+                i = np.repeat(hit, counts)
+                j = _ranges(starts, starts + counts)
+                delta = xyz[i] - other[j]
+                close = np.einsum('ij,ij->i', delta, delta) <= chord * chord
+                i, j = query_order[i[close]], order[j[close]]
+                if same:
+                    i, j = i[j < i], j[j < i]
+                firsts.append(i)
+                seconds.append(j)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def thin_mask(lats, lngs, min_distance_m, priority=None, seed=0):
+    """Mask of a maximal subset of points at least ``min_distance_m`` apart.
+
+    Every dropped point is within the distance of a kept one. Conflicts are
+    settled in rounds (Luby's algorithm): a point is kept when it beats all
+    its undecided neighbours, by ``priority`` (higher wins) or by a seeded
+    random priority, so the result is reproducible and the number of rounds
+    stays logarithmic even for points along a track.
+    """
+    n = len(as_array(lats))
+    i, j = close_pairs(lats, lngs, min_distance_m)
+    if priority is None:
+        priority = np.random.RandomState(seed).permutation(n)
+    else:
+        # Break ties by index so that every pair has a winner.
+        priority = np.argsort(np.argsort(as_array(priority), kind='stable'), kind='stable')
+    # Orient every pair from the loser to the winner.
+    swap = priority[i] > priority[j]
+    losers, winners = np.where(swap, j, i), np.where(swap, i, j)
+    state = np.zeros(n, dtype=np.int8)  # 0 undecided, 1 kept, 2 dropped
+    while True:
+        beaten = np.zeros(n, dtype=bool)
+        beaten[losers] = True
+        state[(state == 0) & ~beaten] = 1
+        dropped = losers[state[winners] == 1]
+        state[dropped] = 2
+        pending = (state[losers] == 0) & (state[winners] == 0)
+        if not pending.any():
+            break
+        losers, winners = losers[pending], winners[pending]
+    state[state == 0] = 1
+    return state == 1
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+import time
+
+from collections import namedtuple
+
+
+LayerStats = namedtuple('LayerStats', ['layer', 'features', 'vertices', 'chars', 'seconds'])
+LayerStats.__doc__ = """What drawing one layer cost.
+
+``features`` and ``vertices`` are the number of features of the layer and
+of coordinates written for them (all levels of detail included), ``chars``
+the size of its html (characters, i.e. UTF-8 bytes for ASCII content) and
+``seconds`` the wall time spent writing it.
+"""
+
+
+def measure_layers(f, writers, sizes, hooks=()):
+    """Call ``write(f)`` for every ``(layer, write)`` of ``writers`` and
+    measure it.
+
+    Layers for which ``sizes(layer)`` reports no features are skipped. The
+    ``before(layer)`` and ``after(stats)`` callables of ``hooks`` (either may
+    be None) are called around every layer.
+
+    :param f: a :class:`~llplot.output.BufferedWriter`
+    :return: list of :class:`LayerStats`
+    """
+    stats = []
+    for layer, write in writers:
+        features, vertices = sizes(layer)
+        if not features:
+            continue
+        for before, _ in hooks:
+            if before is not None:
+                before(layer)
+        position = f.position
+        start = time.perf_counter()
+        write(f)
+        layer_stats = LayerStats(layer, features, vertices, f.position - position,
+                                 time.perf_counter() - start)
+        stats.append(layer_stats)
+        for _, after in hooks:
+            if after is not None:
+                after(layer_stats)
+    return stats
@@ -0,0 +1,86 @@
+from __future__ import absolute_import
+
+from collections import namedtuple
+
+
+STYLE_FIELDS = ('edge_color', 'edge_alpha', 'edge_width', 'face_alpha', 'face_color', 'color',
+                'stroke', 'fill', 'fill_color', 'opacity', 'weight', 'line_cap', 'line_join',
+                'dash_array', 'dash_offset', 'fill_opacity', 'fill_rule', 'closed',
+                'encoding', 'precision')
+
+
+class Style(namedtuple('Style', STYLE_FIELDS)):
+    """Immutable, hashable drawing settings of paths, polygons and circles.
+
+    Reads like the settings dicts it replaces (``style['color']``,
+    ``style.get('edge_alpha')``, ``dict(style)``); use :meth:`replace` to
+    derive a changed copy.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, **settings):
+        values = dict.fromkeys(STYLE_FIELDS)
+        values['precision'] = 0
+        values.update(settings)
+        return super(Style, cls).__new__(cls, **values)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in STYLE_FIELDS:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in STYLE_FIELDS else default
+
+    def keys(self):
+        return STYLE_FIELDS
+
+    def replace(self, **changes):
+        return self._replace(**changes)
+
+
+class StyleTable(object):
+    """The distinct styles of a plotter.
+
+    Every style is stored once: :meth:`intern` returns the shared instance
+    equal to a style, which all the features using it reference, and
+    :meth:`id` its position in ``styles``. The table also remembers which
+    style a set of keyword arguments normalized to, so repeated calls with
+    the same arguments skip the normalization.
+    """
+
+    def __init__(self):
+        self.styles = []
+        self._ids = {}
+        self._normalized = {}
+
+    def __len__(self):
+        return len(self.styles)
+
+    def __getitem__(self, style_id):
+        return self.styles[style_id]
+
+    def intern(self, style):
+        style_id = self._ids.get(style)
+        if style_id is None:
+            style_id = self._ids[style] = len(self.styles)
+            self.styles.append(style)
+        return self.styles[style_id]
+
+    def id(self, style):
+        return self._ids[self.intern(style)]
+
+    def normalized(self, kwargs, normalize):
+        """The interned ``normalize(kwargs)``, computed once per distinct
+        (hashable) ``kwargs``."""
+        try:
+            key = tuple(sorted(kwargs.items()))
+            style = self._normalized.get(key)
+        except TypeError:
+            return self.intern(normalize(kwargs))
+        if style is None:
+            style = self._normalized[key] = self.intern(normalize(kwargs))
+        return style
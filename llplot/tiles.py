@@ -0,0 +1,274 @@
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from llplot.bounds import Bounds, clip_polygon
+from llplot.clustering import project
+from llplot.output import to_json
+
+
+MANIFEST = 'tiles.json'
+
+
+def tile_xy(lats, lngs, zoom):
+    """XYZ tile coordinates of lat/lng arrays at ``zoom``."""
+    x, y = project(np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64))
+    n = 2 ** zoom
+    return (np.clip(np.floor(x * n), 0, n - 1).astype(np.int64),
+            np.clip(np.floor(y * n), 0, n - 1).astype(np.int64))
+
+
+def unproject(x, y):
+    """Latitudes and longitudes of Web Mercator world coordinates, the
+    inverse of :func:`~llplot.clustering.project`."""
+    return (np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y))))),
+            (np.asarray(x) - 0.5) * 360.0)
+
+
+def tile_bounds(x, y, zoom):
+    """:class:`~llplot.bounds.Bounds` of the XYZ tile ``(x, y)`` of ``zoom``;
+    the first and last rows reach the poles, like :func:`tile_xy`."""
+    n = 2 ** zoom
+    lats, lngs = unproject(np.array([x, x + 1]) / float(n), np.array([y + 1, y]) / float(n))
+    return Bounds(-90.0 if y == n - 1 else float(lats[0]), float(lngs[0]),
+                  90.0 if y == 0 else float(lats[1]), float(lngs[1]))
+
+
+def _crossings(start, end):
+    """``(segment, t)`` of every point where the segments from ``start`` to
+    ``end`` (tile coordinates along one axis) cross a tile edge."""
+    low, high = np.floor(np.minimum(start, end)), np.floor(np.maximum(start, end))
+    counts = (high - low).astype(np.int64)
+    segments = np.repeat(np.arange(len(start)), counts)
+    offsets = np.arange(len(segments)) - np.repeat(np.cumsum(counts) - counts, counts)
+    edges = low[segments] + 1 + offsets
+    return segments, (edges - start[segments]) / (end - start)[segments]
+
+
+def split_path(path, zoom):
+    """Cut an ``(n, 2)`` path at the edges of the tiles of ``zoom``.
+
+    Vertices are added where segments cross a tile edge, so that every
+    piece stays in its tile and a long segment is in every tile it crosses.
+
+    :return: list of ``((x, y), piece)``, consecutive pieces sharing their
+        end vertices
+    """
+    n = 2 ** zoom
+    x, y = project(path[:, 0], path[:, 1])
+    x, y = x * n, y * n
+    segments, ts = [np.arange(len(path) - 1)], [np.zeros(len(path) - 1)]
+    for values in (x, y):
+        segment, t = _crossings(values[:-1], values[1:])
+        segments.append(segment)
+        ts.append(t)
+    segments, ts = np.concatenate(segments), np.concatenate(ts)
+    order = np.lexsort((ts, segments))
+    segments, ts = segments[order], ts[order]
+    # Edges crossed at a vertex, or at a tile corner, would give empty segments.
+    keep = ts < 1 - 1e-12
+    keep[1:] &= (segments[1:] != segments[:-1]) | (ts[1:] - ts[:-1] > 1e-12)
+    segments, ts = segments[keep], ts[keep]
+    x = np.append(x[segments] + ts * (x[segments + 1] - x[segments]), x[-1])
+    y = np.append(y[segments] + ts * (y[segments + 1] - y[segments]), y[-1])
+    lats, lngs = unproject(x / n, y / n)
+    # The original vertices are kept as they are.
+    original = np.append(ts == 0, True)
+    lats[original], lngs[original] = path[:, 0], path[:, 1]
+    dense = np.column_stack((lats, lngs))
+    # Each segment is in the tile of its middle.
+    xs = np.clip(np.floor((x[1:] + x[:-1]) / 2), 0, n - 1).astype(np.int64)
+    ys = np.clip(np.floor((y[1:] + y[:-1]) / 2), 0, n - 1).astype(np.int64)
+    breaks = np.flatnonzero((xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(xs)]))
+    return [((int(xs[start]), int(ys[start])), dense[start:end + 1])
+            for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def _rounded(values):
+    return np.round(values, 6).tolist()
+
+
+class TileSet(object):
+    """The features of a plotter, split into XYZ tiles.
+
+    Everything is plain numpy arrays and lists so a tile set can be sent to
+    worker processes once and cut into tiles there.
+
+    * points are written to the tile containing them,
+    * paths are cut at the tile edges by :func:`split_path`, so that every
+      tile they cross has the piece inside it,
+    * polygons within one tile are written to it whole; larger ones are
+      clipped to every tile they overlap, and written as a fill without
+      stroke plus the pieces of their outline, so that the tile edges do
+      not show,
+    * circles go to the tile of their center.
+    """
+
+    def __init__(self, points, paths, shapes, circles):
+        self.points = points
+        self.paths = paths
+        self.shapes = shapes
+        self.circles = circles
+
+    def tiles(self, zoom, shard=0, shards=1):
+        """``{(x, y): payload}`` of the non empty tiles of ``zoom`` whose x
+        is ``shard`` modulo ``shards``."""
+        tiles = {}
+
+        def tile(x, y):
+            payload = tiles.get((x, y))
+            if payload is None:
+                payload = tiles[(x, y)] = {}
+            return payload
+
+        def add_path(name, style, path):
+            for (x, y), piece in split_path(path, zoom):
+                if x % shards == shard:
+                    tile(x, y).setdefault(name, []).append([style, _rounded(piece.ravel())])
+
+        lats, lngs, icons, titles = self.points
+        if len(lats):
+            xs, ys = tile_xy(lats, lngs, zoom)
+            for (x, y), index in _groups(xs, ys, shard, shards):
+                tile(x, y)['points'] = {'lat': _rounded(lats[index]), 'lng': _rounded(lngs[index]),
+                                        'icon': icons[index].tolist(),
+                                        'title': titles[index].tolist()}
+
+        for style, path in self.paths:
+            if len(path) >= 2:
+                add_path('paths', style, path)
+
+        for style, shape in self.shapes:
+            if not len(shape):
+                continue
+            xs, ys = tile_xy(shape[:, 0], shape[:, 1], zoom)
+            if xs.min() == xs.max() and ys.min() == ys.max():
+                if int(xs[0]) % shards == shard:
+                    tile(int(xs[0]), int(ys[0])).setdefault('shapes', []).append(
+                        [style, _rounded(shape.ravel())])
+                continue
+            for x in range(int(xs.min()), int(xs.max()) + 1):
+                if x % shards != shard:
+                    continue
+                # Clipped to the column first, then to the tiles of the column.
+                box = tile_bounds(x, 0, zoom)
+                column = clip_polygon(shape, Bounds(-90.0, box.west, 90.0, box.east))
+                if len(column) < 3:
+                    continue
+                _, column_ys = tile_xy(column[:, 0], column[:, 1], zoom)
+                for y in range(int(column_ys.min()), int(column_ys.max()) + 1):
+                    piece = clip_polygon(column, tile_bounds(x, y, zoom))
+                    if len(piece) >= 3:
+                        tile(x, y).setdefault('fills', []).append([style, _rounded(piece.ravel())])
+            add_path('outlines', style, np.concatenate((shape, shape[:1])))
+
+        lats, lngs, radii, styles = self.circles
+        if len(lats):
+            xs, ys = tile_xy(lats, lngs, zoom)
+            for (x, y), index in _groups(xs, ys, shard, shards):
+                tile(x, y)['circles'] = {'lat': _rounded(lats[index]), 'lng': _rounded(lngs[index]),
+                                         'radius': radii[index].tolist(),
+                                         'style': styles[index].tolist()}
+        return tiles
+
+
+def _groups(xs, ys, shard, shards):
+    """Yield ``((x, y), indices)`` for every tile holding some of the items."""
+    selected = np.flatnonzero(xs % shards == shard)
+    keys = (xs[selected] << 32) | ys[selected]
+    order = np.argsort(keys, kind='stable')
+    keys, selected = keys[order], selected[order]
+    uniques, starts = np.unique(keys, return_index=True)
+    ends = np.append(starts[1:], len(keys))
+    for key, start, end in zip(uniques.tolist(), starts.tolist(), ends.tolist()):
+        yield (key >> 32, key & 0xFFFFFFFF), selected[start:end]
+
+
+_worker = {}
+
+
+def _init_worker(tileset, outdir, manifest):
+    _worker.update(tileset=tileset, outdir=outdir, manifest=manifest)
+
+
+def _write_shard(zoom, shard, shards):
+    """Write the tiles of one shard of a zoom level, skipping unchanged ones.
+
+    :return: ``{"z/x/y": (sha1, written)}``
+    """
+    outdir, manifest = _worker['outdir'], _worker['manifest']
+    results = {}
+    for (x, y), payload in _worker['tileset'].tiles(zoom, shard, shards).items():
+        key = '%d/%d/%d' % (zoom, x, y)
+        data = to_json(payload).encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        path = os.path.join(outdir, key + '.json')
+        written = manifest.get(key) != digest or not os.path.exists(path)
+        if written:
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        results[key] = (digest, written)
+    return results
+
+
+def write_tiles(tileset, outdir, min_zoom, max_zoom, processes=None):
+    """Write ``outdir/{z}/{x}/{y}.json`` for every non empty tile.
+
+    Tiles are cut and written by ``processes`` worker processes (all cores
+    by default, 1 to stay in this process). A manifest with the hash of
+    every tile makes runs incremental: tiles whose content did not change
+    are not rewritten and tiles that became empty are removed.
+
+    :return: dict with the number of ``tiles``, ``written``, ``unchanged``
+        and ``removed`` tiles
+    """
+    manifest_path = os.path.join(outdir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+
+    processes = processes or os.cpu_count() or 1
+    tasks = []
+    for zoom in range(min_zoom, max_zoom + 1):
+        # Split zoom levels with enough tiles so that every process gets work.
+        shards = min(2 ** zoom, processes)
+        tasks.extend((zoom, shard, shards) for shard in range(shards))
+
+    results = {}
+    if processes == 1:
+        _init_worker(tileset, outdir, manifest)
+        for task in tasks:
+            results.update(_write_shard(*task))
+        _worker.clear()
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                 initargs=(tileset, outdir, manifest)) as pool:
+            for result in pool.map(_write_shard, *zip(*tasks)):
+                results.update(result)
+
+    removed = 0
+    for key in set(manifest) - set(results):
+        path = os.path.join(outdir, key + '.json')
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+    with open(manifest_path, 'w') as f:
+        json.dump(dict((key, digest) for key, (digest, _) in results.items()), f,
+                  sort_keys=True)
+    written = sum(1 for _, was_written in results.values() if was_written)
+    return {'tiles': len(results), 'written': written,
+            'unchanged': len(results) - written, 'removed': removed}
@@ -16,10 +16,12 @@ setup(
     long_description=read('README.rst'),
     license='MIT',
     keywords='python wrapper google maps',
-    packages = find_packages(),
+    packages = find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
     package_data = {
         'llplot': ['markers/*.png'],
     },
-    install_requires=['requests'],
+    # numpy 1.23 added the quotechar of loadtxt, used to read CSV files.
+    install_requires=['requests', 'numpy>=1.23'],
+    extras_require={'parquet': ['pyarrow'], 'brotli': ['brotli']},
 )
@@ -0,0 +1,68 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import llplot
+from llplot.batch import render_many
+
+
+def _setup(tile_url):
+    return {'tile_url': tile_url}
+
+
+def _build(spec, shared):
+    if spec is None:
+        raise ValueError('no region')
+    plotter = llplot.LeafletPlotter(shared['tile_url'], spec[0], spec[1], 10)
+    plotter.marker(spec[0], spec[1], 'red')
+    return plotter
+
+
+class TestRenderMany(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def jobs(self, specs):
+        for i, spec in enumerate(specs):
+            yield os.path.join(self.outdir, '%d.html' % i), spec
+
+    def test_specs_over_a_pool(self):
+        specs = [(i, i) for i in range(10)] + [None]
+        report = render_many(self.jobs(specs), _build, processes=2, max_pending=3,
+                             setup=_setup, setup_args=('tiles/{z}/{x}/{y}.png',), compact=True)
+        self.assertEqual(10, report.rendered)
+        self.assertEqual([os.path.join(self.outdir, '10.html')], list(report.errors))
+        self.assertIn('no region', report.errors[os.path.join(self.outdir, '10.html')])
+        with open(os.path.join(self.outdir, '3.html')) as f:
+            self.assertIn('tiles/{z}/{x}/{y}.png', f.read())
+        self.assertGreater(report.maps_per_second, 0)
+
+    def test_plotters_in_process(self):
+        done = []
+        plotters = [_build((1, 2), _setup('')), _build((3, 4), _setup(''))]
+        report = render_many(self.jobs(plotters), processes=1,
+                             progress=lambda htmlfile, error: done.append(error))
+        self.assertEqual(2, report.rendered)
+        self.assertEqual([None, None], done)
+        self.assertEqual(sum(os.path.getsize(path) for path, _ in self.jobs(plotters)),
+                         report.bytes_written)
+
+    def test_plotters_are_pickled_without_the_color_tables(self):
+        plotter = _build((1, 2), _setup(''))
+        data = pickle.dumps(plotter)
+        state = dict(plotter.__dict__)
+        self.assertLess(len(data), len(pickle.dumps(state)) - 2000)
+        copy = pickle.loads(data)
+        self.assertIs(plotter.html_color_codes, copy.html_color_codes)
+        copy.marker(1, 2, 'cornflowerblue')
+        self.assertEqual('6495ED', copy.points[-1][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
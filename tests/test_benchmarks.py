@@ -0,0 +1,26 @@
+import unittest
+
+from benchmarks.suite import compare, run_case
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_run_case(self):
+        metrics = run_case('marker_many', 100)
+        self.assertGreater(metrics['html_bytes'], 0)
+        self.assertGreater(metrics['peak_rss'], 0)
+
+    def test_demo_map(self):
+        self.assertGreater(run_case('demo', 0)['html_bytes'], 0)
+
+    def test_compare_flags_regressions_above_threshold(self):
+        baseline = {'plot/1000': {'add_s': 1.0, 'draw_s': 0.01, 'peak_rss': 100, 'html_bytes': 100}}
+        results = {'plot/1000': {'add_s': 1.1, 'draw_s': 0.03, 'peak_rss': 200, 'html_bytes': 100},
+                   'plot/10': {'add_s': 9.0, 'draw_s': 9.0, 'peak_rss': 9, 'html_bytes': 9}}
+        self.assertEqual([('plot/1000', 'peak_rss', 100, 200)], compare(results, baseline, 0.25))
+        self.assertEqual([('plot/1000', 'add_s', 1.0, 1.1), ('plot/1000', 'peak_rss', 100, 200)],
+                         compare(results, baseline, 0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
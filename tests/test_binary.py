@@ -0,0 +1,57 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.binary import BinaryColumn, read_columns, write_columns
+
+
+class TestBinaryColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trip_and_layout(self):
+        path = os.path.join(self.dir, 'data.bin')
+        write_columns(path, {'paths': {
+            'coords': BinaryColumn('<f8', [np.arange(3.0), np.arange(2.0)]),
+            'style': BinaryColumn('<i4', np.array([7, 8], dtype=np.int8)),
+            'styles': [{'color': 'red'}]}})
+        with open(path, 'rb') as f:
+            magic, version, header_size = struct.unpack('<4sII', f.read(12))
+        self.assertEqual((b'LLPB', 1), (magic, version))
+        tables = read_columns(path)
+        np.testing.assert_array_equal([0, 1, 2, 0, 1], tables['paths']['coords'])
+        self.assertEqual('<i4', tables['paths']['style'].dtype.str)
+        np.testing.assert_array_equal([7, 8], tables['paths']['style'])
+        self.assertEqual([{'color': 'red'}], tables['paths']['styles'])
+
+    def test_draw_binary(self):
+        gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        gmap.marker_many([1.5, 2], [3, 4], 'red', title=['a', 'b'])
+        gmap.plot([0, 1, 2], [0, 1, 2], 'blue')
+        gmap.polygon([0, 1, 1], [0, 0, 1], encoding='polyline')
+        html = os.path.join(self.dir, 'map.html')
+        gmap.draw(html, binary='float64')
+        with open(html) as f:
+            page = f.read()
+        self.assertIn('"map.bin"', page)
+        self.assertNotIn('1.5', page)
+        tables = read_columns(os.path.join(self.dir, 'map.bin'))
+        np.testing.assert_array_equal([1.5, 2], tables['points']['lat'])
+        self.assertEqual(['a', 'b'], tables['points']['titles'][1:])
+        np.testing.assert_array_equal([0, 3], tables['paths']['starts'])
+        np.testing.assert_array_equal([0, 0, 1, 0, 1, 1], tables['shapes']['coords'])
+        self.assertRaises(ValueError, gmap.draw, None, binary=True)
+        self.assertRaises(ValueError, gmap.draw, html, binary='float16')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.bounds import Bounds, clip_path, clip_polygon
+
+
+class TestClipping(unittest.TestCase):
+
+    def test_clip_polygon(self):
+        box = Bounds(0, 0, 1, 1)
+        square = np.array([[-1, -1], [-1, 2], [2, 2], [2, -1]], dtype=float)
+        self.assertEqual({(0, 0), (0, 1), (1, 0), (1, 1)},
+                         set(map(tuple, clip_polygon(square, box).tolist())))
+        self.assertEqual(0, len(clip_polygon(square + 5, box)))
+
+    def test_clip_path_keeps_the_runs_inside(self):
+        box = Bounds(0, 0, 1, 1)
+        path = np.array([[5, 5], [6, 6], [.5, .5], [.6, .6], [7, 7], [8, 8], [9, 9],
+                         [.2, .2], [9, 9]])
+        pieces = clip_path(path, box)
+        self.assertEqual([[6, 6], [.5, .5], [.6, .6], [7, 7]], pieces[0].tolist())
+        self.assertEqual([[9, 9], [.2, .2], [9, 9]], pieces[1].tolist())
+
+    def test_clip_path_keeps_segments_crossing_the_box(self):
+        box = Bounds(0, 0, 1, 1)
+        path = np.array([[-5, -5], [.5, -1], [.5, 2], [3, 2], [3, -2]])
+        self.assertEqual([[[.5, -1], [.5, 2]]], [piece.tolist() for piece in clip_path(path, box)])
+        # Passing by a corner without touching the box.
+        self.assertEqual([], clip_path(np.array([[-1, .5], [.5, 2]]), box))
+
+
+class TestPlotterBounds(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+
+    def test_running_bounds_and_auto_fit(self):
+        self.gmap.marker_many(np.array([1.0, 3.0]), np.array([10.0, 12.0]))
+        self.gmap.plot([-5, 2], [11, 11], 'red')
+        self.gmap.circle(2, 20, 10)
+        self.assertEqual((1, 10, 3, 12), self.gmap.layer_bounds['points'].as_tuple())
+        self.assertEqual((-5, 10, 3, 20), self.gmap.bounds().as_tuple())
+        self.assertNotIn('fitBounds', self.gmap.draw())
+        self.gmap.fit_bounds()
+        self.assertIn('[[3.000000, 20.000000], [-5.000000, 10.000000]]', self.gmap.draw())
+
+    def test_clip_box(self):
+        self.gmap.marker_many([1, 5, 2], [1, 5, 2], ['red', 'blue', 'green'])
+        self.gmap.polygon([-1, -1, 2, 2], [-1, 2, 2, -1])
+        self.gmap.clip(0, 0, 3, 3)
+        self.gmap.marker(4, 4)
+        self.gmap.circle_many([1, 9], [1, 9], 10)
+        self.gmap.heatmap([1, 9, 1], [1, 9, 1.0001], weights=[1, 5, 2])
+        self.assertEqual([(1.0, 1.0, 'FF0000', 'no implementation'),
+                          (2.0, 2.0, '008000', 'no implementation')], list(self.gmap.points))
+        self.assertEqual(1, len(self.gmap.symbol_layer))
+        heatmap, _ = self.gmap.heatmap_points[0]
+        self.assertEqual(3.0, heatmap.weights.sum())
+        self.assertEqual((0, 0, 2, 2), self.gmap.layer_bounds['shapes'].as_tuple())
+
+
+if __name__ == '__main__':
+    unittest.main()
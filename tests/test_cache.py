@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.cache import FragmentCache, fingerprint
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_fingerprint(self):
+        a = np.arange(10.0)
+        self.assertEqual(fingerprint(a, {'b': 1, 'a': (2, None)}), fingerprint(a.copy(), {'a': (2, None), 'b': 1}))
+        self.assertNotEqual(fingerprint(a), fingerprint(a.astype(np.float32)))
+        self.assertNotEqual(fingerprint(['ab', 'c']), fingerprint(['a', 'bc']))
+
+    def test_lru_eviction(self):
+        cache = FragmentCache(max_size=10)
+        cache.put('a', 'xxxx')
+        cache.put('b', 'yyyy')
+        self.assertEqual('xxxx', cache.get('a'))
+        cache.put('c', 'zzzz')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual('zzzz', cache.get('c'))
+        self.assertEqual((2, 1, 1, 8), (cache.hits, cache.misses, cache.evictions, cache.size))
+
+    def test_shared_directory(self):
+        FragmentCache(directory=self.dir).put('a', 'html')
+        other = FragmentCache(directory=self.dir, max_disk_size=8)
+        self.assertEqual('html', other.get('a'))
+        self.assertEqual(1, other.disk_hits)
+        other.put('b', 'more html')
+        self.assertEqual([], os.listdir(self.dir))
+        self.assertIsNone(FragmentCache(directory=self.dir).get('a'))
+
+
+class TestPlotterFragmentCache(unittest.TestCase):
+
+    def build(self, overlay):
+        gmap = llplot.LeafletPlotter('', 37.5, -122.25, 10)
+        gmap.polygon([37.1, 37.2, 37.3], [-122.1, -122.3, -122.2], 'blue')
+        gmap.marker_many([37.1, 37.2], [-122.1, -122.2], 'red')
+        gmap.plot([37.1, overlay], [-122.1, -122.2], 'green')
+        return gmap
+
+    def test_reuses_unchanged_layers(self):
+        cache = FragmentCache()
+        for compact in (False, True):
+            for overlay in (37.2, 37.3, 37.3):
+                gmap = self.build(overlay)
+                expected = gmap.draw(compact=compact)
+                gmap.fragment_cache = cache
+                self.assertEqual(expected, gmap.draw(compact=compact))
+        # Per mode: every layer once, then the overlay once more.
+        self.assertEqual(2 * 10, cache.misses)
+        self.assertEqual(2 * 17, cache.hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.clustering import build_cluster_levels
+
+
+class TestClusterLevels(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.lats = 10 * rng.random_sample(5000)
+        self.lngs = 10 * rng.random_sample(5000)
+
+    def test_every_level_accounts_for_all_points(self):
+        levels = build_cluster_levels(self.lats, self.lngs, min_zoom=2, max_zoom=12)
+        self.assertEqual(list(range(2, 13)), [level.zoom for level in levels])
+        for level in levels:
+            self.assertEqual(5000, level.counts.sum())
+
+    def test_coarser_levels_have_fewer_clusters(self):
+        levels = build_cluster_levels(self.lats, self.lngs, max_zoom=12)
+        sizes = [len(level.counts) for level in levels]
+        self.assertEqual(sorted(sizes), sizes)
+        self.assertEqual(1, sizes[0])
+        self.assertAlmostEqual(self.lats.mean(), levels[0].lats[0])
+
+    def test_singletons_point_at_their_marker(self):
+        lats, lngs = [0.0, 0.0, 45.0], [0.0, 0.00001, 90.0]
+        top = build_cluster_levels(lats, lngs, max_zoom=10)[-1]
+        self.assertEqual([2, 1], sorted(top.counts.tolist(), reverse=True))
+        self.assertEqual(2, top.points[top.counts == 1][0])
+
+
+class TestClusterMarkers(unittest.TestCase):
+
+    def test_clustered_markers_are_kept_apart(self):
+        gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        gmap.marker(1, 2)
+        gmap.marker(3, 4, cluster=True)
+        gmap.cluster_markers([5, 6], [7, 8], max_zoom=8)
+        self.assertEqual(1, len(gmap.point_layer))
+        self.assertEqual(3, len(gmap.cluster_layer))
+        self.assertEqual(8, gmap.cluster_options['max_zoom'])
+        self.assertIn('"maxZoom":8', gmap.draw())
+
+
+if __name__ == '__main__':
+    unittest.main()
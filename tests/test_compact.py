@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import unittest
+
+import llplot
+
+
+def _payloads(html):
+    """JSON payloads passed to the compact loops, in draw order."""
+    payloads = []
+    for line in html.splitlines():
+        line = line.strip()
+        if line.startswith('})(') and line.endswith(');'):
+            payloads.append(json.loads(line[3:-2]))
+    return payloads
+
+
+class TestCompactDraw(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        fd, self.path = tempfile.mkstemp(suffix='.html')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def draw(self):
+        self.gmap.draw(self.path, compact=True)
+        with open(self.path) as f:
+            return f.read()
+
+    def test_markers_share_one_icon_per_color(self):
+        self.gmap.marker_many([1, 2, 3], [4, 5, 6], ['red', 'blue', 'red'])
+        html = self.draw()
+        icons, points = _payloads(html)
+        self.assertEqual([1.0, 2.0, 3.0], points['lat'])
+        self.assertEqual([0, 1, 0], points['icon'])
+        self.assertEqual(sorted(icons), sorted(points['icons']))
+        self.assertEqual(1, html.count('L.marker('))
+
+    def test_paths_and_circles_deduplicate_styles(self):
+        self.gmap.plot([1, 2], [3, 4], 'red')
+        self.gmap.plot([5, 6], [7, 8], 'red')
+        self.gmap.circle(1, 2, 10, 'blue')
+        paths, circles = _payloads(self.draw())
+        self.assertEqual(1, len(paths['styles']))
+        self.assertEqual([[0, [1.0, 3.0, 2.0, 4.0]], [0, [5.0, 7.0, 6.0, 8.0]]],
+                         paths['features'])
+        self.assertEqual([10.0], circles['radius'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.formatting import CoordinateFormat, format_rows, format_values
+from llplot.output import json_values
+
+
+class TestFormatting(unittest.TestCase):
+
+    def test_same_as_percent_f(self):
+        rng = np.random.RandomState(0)
+        lats, lngs = rng.uniform(-90, 90, 5000), rng.uniform(-180, 180, 5000)
+        lats[:3] = [0.0, -1.5, 12.0000004]
+        expected = ''.join('[%f, %f],\n' % (lat, lng) for lat, lng in zip(lats, lngs))
+        self.assertEqual(expected, format_rows([lats, lngs], ['[', ', ', '],\n']))
+        self.assertEqual('1.25,-3', format_values([1.25, -3.0], 2, strip_zeros=True))
+
+    def test_strip_zeros_and_precision(self):
+        values = [1.5, -0.25, 3.0, 0.0, -1e-7, 1234.000001, 37.123456789]
+        self.assertEqual('1.5,-0.25,3,0,0,1234.000001,37.123457', format_values(values, 6, True))
+        self.assertEqual('1.50,-0.25,3.00,0.00,0.00,1234.00,37.12', format_values(values, 2))
+        self.assertEqual('2;0;3', format_values([1.5, 0.25, 3], 0, separator=';'))
+        self.assertEqual('', format_values([]))
+        self.assertRaises(ValueError, CoordinateFormat, 16)
+
+    def test_values_out_of_integer_range(self):
+        self.assertEqual(('%.1f' % 1e300)[:-2] + ',NaN', format_values([1e300, float('nan')], 1, True))
+        self.assertEqual(['1.5', 'Infinity', '-Infinity'],
+                         CoordinateFormat(3, True).each([1.5, float('inf'), -float('inf')]))
+        self.assertEqual('NaN,-Infinity', json_values(np.array([np.nan, -np.inf]), 2))
+
+
+class TestPlotterPrecision(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.gmap = llplot.LeafletPlotter('', 37.5, -122.25, 10)
+        self.gmap.scatter([37.123456789, 37.5], [-122.0, -122.987654321], 'red', marker=True)
+        self.gmap.plot([37.1, 37.2], [-122.1, -122.2], 'blue')
+        self.gmap.circle(37.5, -122.5, 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _draw(self, **kwargs):
+        path = os.path.join(self.dir, 'map.html')
+        self.gmap.draw(path, **kwargs)
+        with open(path) as f:
+            return f.read()
+
+    def test_default_matches_percent_f(self):
+        html = self._draw()
+        self.assertIn('var latlng = [37.123457, -122.000000];', html)
+        self.assertIn('[37.100000, -122.100000],\n', html)
+        self.assertIn('L.circle([37.500000, -122.500000]', html)
+
+    def test_set_precision(self):
+        self.gmap.set_precision(4, strip_zeros=True)
+        html = self._draw()
+        self.assertIn('var latlng = [37.1235, -122];', html)
+        self.assertIn('[37.1, -122.1],\n', html)
+        self.assertIn('setView([37.5, -122.25], 10)', html)
+        html = self._draw(compact=True)
+        self.assertIn('"lat":[37.1235,37.5],"lng":[-122,-122.9877]', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
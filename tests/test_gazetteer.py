@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.gazetteer import Gazetteer, GazetteerGeocoder, build_index, normalize_name
+from llplot.geocoding import Geocoder, GeocodeCache
+from llplot.spatial import haversine
+
+
+PLACES = [
+    # name, ASCII name, alternate names, lat, lng, country, population
+    (u'Paris', u'Paris', u'Lutetia,Parigi', 48.85341, 2.3488, 'FR', 2138551),
+    (u'Paris', u'Paris', u'', 33.66094, -95.55551, 'US', 24782),
+    (u'São Paulo', u'Sao Paulo', u'', -23.5475, -46.63611, 'BR', 10021295),
+    (u'Madrid', u'Madrid', u'', 40.4165, -3.70256, 'ES', 3255944),
+    (u'Wellington', u'Wellington', u'', -41.28664, 174.77557, 'NZ', 381900),
+    (u'Suva', u'Suva', u'', -18.14161, 178.44149, 'FJ', 77366),
+]
+
+
+class TestGazetteer(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.tsv = os.path.join(self.dir, 'cities.txt')
+        with io.open(self.tsv, 'w', encoding='utf-8') as f:
+            for i, (name, ascii_name, alternates, lat, lng, country, population) in enumerate(PLACES):
+                f.write(u'\t'.join([str(i), name, ascii_name, alternates, str(lat), str(lng), u'P', u'PPL',
+                                    country, u'', u'', u'', u'', u'', str(population), u'', u'0',
+                                    u'UTC', u'2024-01-01']) + u'\n')
+        self.index = os.path.join(self.dir, 'index')
+        self.assertEqual(len(PLACES), build_index(self.tsv, self.index, alternate_names=True))
+        self.gazetteer = Gazetteer(self.index)
+
+    def tearDown(self):
+        self.gazetteer.close()
+        shutil.rmtree(self.dir)
+
+    def test_forward(self):
+        self.assertEqual('sao paulo', normalize_name(u' SÃO-paulo! '))
+        self.assertEqual((48.85341, 2.3488), self.gazetteer.locate('paris'))
+        self.assertEqual((33.66094, -95.55551), self.gazetteer.locate('Paris, us'))
+        self.assertEqual((-23.5475, -46.63611), self.gazetteer.locate('sao paulo'))
+        self.assertEqual((48.85341, 2.3488), self.gazetteer.locate('Parigi'))
+        self.assertIsNone(self.gazetteer.locate('Atlantis'))
+        self.assertEqual([0, 1], self.gazetteer.lookup('PARIS'))
+        self.assertEqual(['Madrid'], [place.name for place in self.gazetteer.complete('ma')])
+
+    def test_reverse_matches_a_scan(self):
+        lats = np.array([place[3] for place in PLACES])
+        lngs = np.array([place[4] for place in PLACES])
+        rng = np.random.RandomState(0)
+        for lat, lng in zip(rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)):
+            place, distance = self.gazetteer.nearest(lat, lng)
+            distances = haversine(lat, lng, lats, lngs)
+            self.assertEqual(distances.argmin(), place)
+            self.assertAlmostEqual(distances.min(), distance, delta=1e-3)
+        # Across the antimeridian.
+        self.assertEqual('Suva', self.gazetteer.reverse(-18.0, -179.9).name)
+        self.assertIsNone(self.gazetteer.reverse(0, 0, max_distance_m=1000))
+
+    def test_geocoder(self):
+        # The index is only read by the first lookup.
+        GazetteerGeocoder(os.path.join(self.dir, 'missing'))
+        geocoder = GazetteerGeocoder(self.index, cache=GeocodeCache(':memory:'))
+        self.assertIsInstance(geocoder, Geocoder)
+        self.assertEqual({'Madrid': (40.4165, -3.70256), 'Atlantis': None},
+                         llplot.LeafletPlotter.geocode_many(['Madrid', 'Atlantis', 'Madrid'], geocoder))
+        gmap = llplot.LeafletPlotter.from_geocode('tiles', 'Wellington', geocoder=geocoder)
+        self.assertEqual((-41.28664, 174.77557), gmap.center)
+        self.assertEqual(['Paris', 'Madrid'], [place.name for place in
+                                              geocoder.reverse_many([48.9, 40.0], [2.3, -3.7])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from urlparse import parse_qs, urlparse
+
+import llplot
+from llplot.geocoding import GeocodeCache, Geocoder, GeocodingError, GoogleGeocoder
+
+
+PLACES = {'Madrid': (40.4168, -3.7038), 'Paris': (48.8566, 2.3522)}
+
+
+class StandInGeocoder(BaseHTTPRequestHandler):
+    """Answers like Google's geocoding API for the names in PLACES."""
+
+    requests = []
+
+    def do_GET(self):
+        address = parse_qs(urlparse(self.path).query)['address'][0]
+        self.requests.append(address)
+        if address == 'Broken':
+            body = {'status': 'REQUEST_DENIED', 'error_message': 'no key'}
+        elif address in PLACES:
+            lat, lng = PLACES[address]
+            body = {'status': 'OK', 'results': [{'geometry': {'location': {'lat': lat, 'lng': lng}}}]}
+        else:
+            body = {'status': 'ZERO_RESULTS', 'results': []}
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGeocoding(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), StandInGeocoder)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:%d/geocode/json' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandInGeocoder.requests = []
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = GeocodeCache(os.path.join(self.tmpdir, 'geocode.sqlite'))
+        self.geocoder = GoogleGeocoder(url=self.url, cache=self.cache, retries=0)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_batch_is_deduplicated_and_cached(self):
+        names = ['Madrid', 'Paris', 'Madrid', 'Atlantis'] * 5
+        results = llplot.LeafletPlotter.geocode_many(names, geocoder=self.geocoder)
+        self.assertEqual({'Madrid': PLACES['Madrid'], 'Paris': PLACES['Paris'], 'Atlantis': None},
+                         results)
+        self.assertEqual(3, len(StandInGeocoder.requests))
+        self.assertEqual(results, self.geocoder.geocode_many(names))
+        self.assertEqual(3, len(StandInGeocoder.requests))
+
+    def test_from_geocode(self):
+        gmap = llplot.LeafletPlotter.from_geocode('tiles', 'Paris', 11, geocoder=self.geocoder)
+        self.assertEqual(PLACES['Paris'], gmap.center)
+        self.assertEqual(11, gmap.zoom)
+
+    def test_unknown_places(self):
+        self.assertIsNone(llplot.LeafletPlotter.geocode('Atlantis', self.geocoder))
+        self.assertIsNone(self.geocoder.geocode('Atlantis'))
+        self.assertRaises(ValueError, llplot.LeafletPlotter.from_geocode, 'tiles', 'Atlantis',
+                          geocoder=self.geocoder)
+        # Subclasses must implement _resolve.
+        self.assertRaises(TypeError, Geocoder)
+
+    def test_failures_are_reported_but_not_cached(self):
+        with self.assertRaises(GeocodingError) as context:
+            self.geocoder.geocode_many(['Broken', 'Madrid'])
+        self.assertEqual({'Madrid': PLACES['Madrid']}, context.exception.results)
+        self.assertEqual(1, len(self.cache))
+
+    def test_cache_expiry_and_size_limit(self):
+        cache = GeocodeCache(':memory:', ttl=3600, max_entries=2)
+        cache.put_many({'a': (1, 2), 'b': None})
+        self.assertEqual({'a': (1, 2), 'b': None}, cache.get_many(['a', 'b', 'c']))
+        cache.get_many(['a'])
+        cache.put_many({'c': (5, 6)})
+        self.assertEqual(['a', 'c'], sorted(cache.get_many(['a', 'b', 'c'])))
+        cache.ttl = -1
+        self.assertEqual({}, cache.get_many(['a', 'c']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.heatmap import HeatmapLayer, to_mercator
+
+
+class TestHeatmapLayer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        self.lats = 40 + rng.randn(20000) * 0.01
+        self.lngs = -3 + rng.randn(20000) * 0.01
+
+    def test_points_fall_in_the_cell_whose_center_is_nearest(self):
+        for shape in ('square', 'hex'):
+            layer = HeatmapLayer(100, shape)
+            layer.add(self.lats[:500], self.lngs[:500])
+            x, y = to_mercator(self.lats[:500], self.lngs[:500])
+            cx, cy = to_mercator(*layer.centers())
+            distances = np.hypot(x[:, None] - cx[None, :], y[:, None] - cy[None, :])
+            # Each point is at most one circumradius (hex) or half diagonal
+            # (square) from some center.
+            limit = 100.0 if shape == 'hex' else 100 * np.sqrt(2) / 2
+            self.assertTrue((distances.min(axis=1) <= limit + 1e-6).all())
+
+    def test_cells_round_trip_in_every_quadrant(self):
+        lats = np.array([35.68, 35.68, -33.87, -33.87, 0.001])
+        lngs = np.array([3.0, 139.7, 151.2, -70.6, -0.001])
+        for shape in ('square', 'hex'):
+            layer = HeatmapLayer(100, shape)
+            layer.add(lats, lngs)
+            self.assertEqual(5, len(layer))
+            self.assertTrue((layer.keys >= 0).all())
+            x, y = to_mercator(lats, lngs)
+            cx, cy = to_mercator(*layer.centers())
+            distances = np.hypot(x[:, None] - cx[None, :], y[:, None] - cy[None, :])
+            self.assertTrue((distances.min(axis=1) <= 100.0 + 1e-6).all())
+
+    def test_cells_too_small_for_the_keys(self):
+        layer = HeatmapLayer(0.001)
+        self.assertRaises(ValueError, layer.add, [0, 1], [179, 179])
+        self.assertEqual(0, len(layer))
+        layer.add([0, 0.00001], [0, 0.00001])
+        self.assertEqual(2, len(layer))
+
+    def test_chunks_accumulate_into_the_same_cells(self):
+        whole = HeatmapLayer(250, 'hex')
+        whole.add(self.lats, self.lngs, weights=np.full(len(self.lats), 2.0))
+        chunked = HeatmapLayer(250, 'hex')
+        for start in range(0, len(self.lats), 3000):
+            chunked.add(self.lats[start:start + 3000], self.lngs[start:start + 3000],
+                        weights=np.full(len(self.lats[start:start + 3000]), 2.0))
+        np.testing.assert_array_equal(whole.keys, chunked.keys)
+        np.testing.assert_allclose(whole.weights, chunked.weights)
+        self.assertEqual(40000, chunked.weights.sum())
+        self.assertEqual(20000, chunked.points)
+
+
+class TestLeafletHeatmap(unittest.TestCase):
+
+    def test_only_cells_are_written(self):
+        gmap = llplot.LeafletPlotter('', 40, -3, 12)
+        rng = np.random.RandomState(4)
+        layer = gmap.heatmap(40 + rng.randn(50000) * 1e-3, -3 + rng.randn(50000) * 1e-3,
+                             radius=20, dissipating=False)
+        html = gmap.draw()
+        self.assertIn('leaflet-heat.js', html)
+        self.assertIn('L.heatLayer', html)
+        self.assertLess(len(layer), 5000)
+        self.assertIn('"max":%s' % layer.weights.max(), html)
+
+
+if __name__ == '__main__':
+    unittest.main()
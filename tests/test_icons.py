@@ -0,0 +1,68 @@
+import struct
+import unittest
+import zlib
+
+import numpy as np
+
+import llplot
+from llplot.icons import ICON_HEIGHT, ICON_WIDTH, pin_png, sprite_sheet
+
+
+def _read_png(png):
+    """RGBA array of an unfiltered 8 bit RGBA PNG, as written by llplot."""
+    width, height = struct.unpack('>II', png[16:24])
+    data, position = b'', 8
+    while position < len(png):
+        size, = struct.unpack('>I', png[position:position + 4])
+        if png[position + 4:position + 8] == b'IDAT':
+            data += png[position + 8:position + 8 + size]
+        position += size + 12
+    rows = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(height, -1)
+    return rows[:, 1:].reshape(height, width, 4)
+
+
+class TestIcons(unittest.TestCase):
+
+    def test_pin_of_any_color(self):
+        pixels = _read_png(pin_png('#3366cc'))
+        self.assertEqual((ICON_HEIGHT, ICON_WIDTH, 4), pixels.shape)
+        # Opaque inside, in the requested color, transparent in the corners.
+        self.assertEqual((0x33, 0x66, 0xCC, 255), tuple(pixels[6, 5]))
+        self.assertEqual(0, pixels[0, 0, 3])
+        self.assertEqual(0, pixels[-1, 0, 3])
+        self.assertIs(pin_png('#3366CC'), pin_png('3366cc'))
+        self.assertRaises(ValueError, pin_png, 'cornflower')
+
+    def test_sprite_sheet(self):
+        png, offsets = sprite_sheet(['#FF0000', '#00FF00'])
+        pixels = _read_png(png)
+        self.assertEqual((ICON_HEIGHT, 2 * ICON_WIDTH, 4), pixels.shape)
+        self.assertEqual({'#FF0000': 0, '#00FF00': ICON_WIDTH}, offsets)
+        self.assertEqual((0, 255, 0, 255), tuple(pixels[6, ICON_WIDTH + 5]))
+
+    def test_one_icon_per_color(self):
+        gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        gmap.marker_many([1, 2, 3], [4, 5, 6], ['#123456', 'red', '#123456'])
+        html = gmap.draw(icons='inline')
+        self.assertEqual(2, html.count('data:image/png;base64,'))
+        self.assertNotIn('.png', html)
+        html = gmap.draw(icons='sprite')
+        self.assertEqual(1, html.count('data:image/png;base64,'))
+        html = gmap.draw()
+        self.assertIn('FF0000.png', html)
+        self.assertEqual(1, html.count('data:image/png;base64,'))
+        self.assertRaises(ValueError, gmap.draw, icons='png')
+
+    def test_named_and_unknown_colors(self):
+        gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        gmap.marker(1, 2, 'cornflowerblue')
+        gmap.marker(1, 2, 'notacolor')
+        for icons in ('url', 'inline', 'sprite'):
+            html = gmap.draw(icons=icons)
+            self.assertIn('"notacolor"', html)
+            self.assertIn('"6495ED"', html)
+        self.assertEqual(pin_png('#FF0000'), gmap.icon_png('notacolor'))
+
+
+if __name__ == '__main__':
+    unittest.main()
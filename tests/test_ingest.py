@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.ingest import read_chunks
+
+
+class TestReadChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, 'points.csv')
+        with open(self.csv, 'w') as f:
+            f.write('id,lat,lng,color,title,weight\n')
+            for i in range(7):
+                f.write('%d,%.2f,%.2f,%s,"a, %d",%d\n' % (i, 37 + i / 100.0, -122, '#FF0000' if i % 2 else 'b', i, i))
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_csv_chunks(self):
+        chunks = list(read_chunks(self.csv, ['lat', 5, 'title'], text=['title'], chunk_rows=3))
+        self.assertEqual([3, 3, 1], [len(chunk['lat']) for chunk in chunks])
+        self.assertEqual([0, 1, 2], chunks[0][5].tolist())
+        self.assertEqual('a, 6', chunks[2]['title'][0])
+        self.assertRaises(ValueError, list, read_chunks(self.csv, ['latitude']))
+
+    def test_arrays_are_memory_mapped(self):
+        records = np.zeros(5, dtype=[('lat', '<f8'), ('lng', '<f8')])
+        records['lat'] = np.arange(5)
+        np.save(os.path.join(self.dir, 'points.npy'), records)
+        records.tofile(os.path.join(self.dir, 'points.bin'))
+        np.save(os.path.join(self.dir, 'table.npy'), np.arange(10.0).reshape(5, 2))
+        chunk = next(read_chunks(os.path.join(self.dir, 'points.npy'), ['lat'], chunk_rows=2))
+        self.assertIsInstance(chunk['lat'].base, np.memmap)
+        chunks = list(read_chunks(os.path.join(self.dir, 'points.bin'), ['lat', 'lng'], chunk_rows=2,
+                                  dtype=records.dtype))
+        self.assertEqual([4.0], chunks[-1]['lat'].tolist())
+        chunk = next(read_chunks(os.path.join(self.dir, 'table.npy'), [1], chunk_rows=2))
+        self.assertEqual([1.0, 3.0], chunk[1].tolist())
+
+    def test_scatter_from_file(self):
+        self.assertEqual(7, self.gmap.scatter_from_file(self.csv, color_column='color',
+                                                        title_column='title', chunk_rows=2))
+        self.assertEqual((37.01, -122.0, 'FF0000', 'a, 1'), self.gmap.points[1])
+        self.gmap.scatter_from_file(self.csv, color_column='color', size_column='weight',
+                                    marker=False, symbol='x', chunk_rows=4)
+        self.assertEqual(7, len(self.gmap.symbol_layer))
+        self.assertEqual(2, len(self.gmap.symbol_layer.style_table))
+        self.assertEqual(21, self.gmap.symbol_layer.sizes.data.sum())
+
+    def test_size_applies_to_every_chunk(self):
+        for color_column in ('color', None):
+            gmap = llplot.LeafletPlotter('', 0, 0, 0)
+            gmap.scatter_from_file(self.csv, color_column=color_column, size=90, marker=False,
+                                   color='red', chunk_rows=2)
+            self.assertEqual([90.0] * 7, gmap.symbol_layer.sizes.data.tolist())
+
+    def test_heatmap_and_plot_from_file(self):
+        layer = self.gmap.heatmap_from_file(self.csv, weight_column='weight', chunk_rows=3)
+        self.assertEqual(21, layer.weights.sum())
+        self.gmap.plot_from_file(self.csv, chunk_rows=3, color='red')
+        self.assertEqual(7, len(self.gmap.paths[0][0]))
+        self.assertEqual((37.0, -122.0, 37.06, -122.0), self.gmap.bounds(['heatmap', 'paths']).as_tuple())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import llplot
+
+
+class TestLive(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.html = os.path.join(self.dir, 'map.html')
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def records(self):
+        with open(os.path.join(self.dir, 'map.data.jsonl')) as f:
+            return [json.loads(line) for line in f]
+
+    def test_flush_appends_only_new_features(self):
+        self.gmap.marker_many([1, 2], [1, 2], 'red', title=['a', 'b'])
+        self.assertEqual(2, self.gmap.draw(self.html, live=5))
+        with open(self.html) as f:
+            page = f.read()
+        self.assertIn('"map.data.jsonl", 5000', page)
+        self.assertNotIn('"lat":[1.0', page)
+
+        self.gmap.marker(3, 3, 'blue', title='a')
+        self.gmap.plot([0, 1], [0, 1], 'red')
+        self.assertEqual(2, self.gmap.draw(self.html, live=True))
+        self.assertEqual(0, self.gmap.flush())
+        first, second = self.records()
+        self.assertEqual([1.0, 2.0], first['points']['lat'])
+        self.assertEqual([0, ['FF0000']], first['points']['icons'])
+        self.assertEqual([3.0], second['points']['lat'])
+        # Only the new table entries are sent.
+        self.assertEqual([1, ['0000FF']], second['points']['icons'])
+        self.assertEqual([3, []], second['points']['titles'])
+        self.assertEqual(['0000FF'], list(second['icons']))
+        self.assertEqual(1, len(second['paths']['features']))
+        self.assertNotIn('shapes', second)
+        self.assertEqual(2, self.gmap.live_session.flushes)
+
+    def test_flush_after_thin_and_clip(self):
+        self.gmap.marker_many([1, 1.00001, 1.00002, 5], [1, 1, 1, 5], 'red')
+        self.gmap.plot([0, 1], [0, 1], 'red')
+        self.gmap.circle(4, 4, 10)
+        self.gmap.draw(self.html, live=True)
+        self.assertEqual(2, self.gmap.thin(100))
+        self.gmap.marker_many([2, 3], [2, 3], 'red')
+        self.assertEqual(2, self.gmap.flush())
+        self.assertEqual([2.0, 3.0], self.records()[-1]['points']['lat'])
+
+        self.gmap.clip(0.5, 0.5, 10, 10)
+        self.gmap.marker(6, 6, 'red')
+        self.gmap.plot([1, 2], [1, 2], 'red')
+        self.gmap.circle(7, 7, 10)
+        self.assertEqual(3, self.gmap.flush())
+        last = self.records()[-1]
+        self.assertEqual([6.0], last['points']['lat'])
+        self.assertEqual(1, len(last['paths']['features']))
+        self.assertEqual([7.0], last['circles']['lat'])
+
+    def test_static_layers_warn(self):
+        self.assertRaises(ValueError, self.gmap.flush)
+        self.gmap.draw(self.html, live=True)
+        self.gmap.heatmap([1, 2], [1, 2])
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.gmap.flush()
+        self.assertEqual(1, len(caught))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import gzip
+import io
+import os
+import socket
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.output import BufferedWriter
+
+
+class TestDrawTargets(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        self.gmap.marker_many(range(100), range(100), 'red', title='t')
+        self.gmap.plot([1, 2, 3], [4, 5, 6])
+        self.html = self.gmap.draw()
+
+    def test_draw_without_file_returns_html(self):
+        self.assertTrue(self.html.startswith('<html>'))
+        self.assertTrue(self.html.endswith('</html>\n'))
+
+    def test_draw_to_path(self):
+        fd, path = tempfile.mkstemp(suffix='.html')
+        os.close(fd)
+        try:
+            self.assertIsNone(self.gmap.draw(path))
+            with open(path) as f:
+                self.assertEqual(self.html, f.read())
+        finally:
+            os.remove(path)
+
+    def test_draw_to_text_and_binary_files(self):
+        text = io.StringIO()
+        self.gmap.draw(text, buffer_size=64)
+        self.assertEqual(self.html, text.getvalue())
+        raw = io.BytesIO()
+        with gzip.GzipFile(fileobj=raw, mode='wb') as stream:
+            self.gmap.draw(stream, buffer_size=64)
+        self.assertEqual(self.html, gzip.decompress(raw.getvalue()).decode('utf-8'))
+
+    def test_draw_to_socket(self):
+        left, right = socket.socketpair()
+        try:
+            self.gmap.draw(left, buffer_size=64)
+            left.close()
+            received = b''.join(iter(lambda: right.recv(65536), b''))
+        finally:
+            right.close()
+        self.assertEqual(self.html, received.decode('utf-8'))
+
+
+class TestBufferedWriter(unittest.TestCase):
+
+    def test_small_writes_are_forwarded_in_chunks(self):
+        calls = []
+
+        class Sink(object):
+            def write(self, data):
+                calls.append(data)
+
+        writer = BufferedWriter(Sink(), buffer_size=10)
+        for _ in range(25):
+            writer.write('a')
+        writer.flush()
+        self.assertEqual(['a' * 10, 'a' * 10, 'a' * 5], calls)
+
+
+
+class TestParallelDraw(unittest.TestCase):
+
+    def test_same_html_as_serial(self):
+        rng = np.random.RandomState(3)
+        gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        gmap.marker_many(rng.rand(140000), rng.rand(140000), 'red')
+        for i in range(80):
+            gmap.plot(rng.rand(1000), rng.rand(1000), 'blue',
+                      encoding='polyline' if i % 2 else None)
+        self.assertEqual(gmap.draw(compact=True), gmap.draw(compact=True, workers=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.polyline import decode, encode
+
+
+class TestEncodedPolyline(unittest.TestCase):
+
+    def test_reference_example(self):
+        # The example of Google's encoded polyline algorithm documentation.
+        path = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual('_p~iF~ps|U_ulLnnqC_mqNvxq`@', encode(path))
+
+    def test_round_trip_at_every_precision(self):
+        rng = np.random.RandomState(5)
+        path = np.column_stack((rng.uniform(-85, 85, 300), rng.uniform(-180, 180, 300)))
+        for precision in (0, 5, 7):
+            decoded = decode(encode(path, precision), precision)
+            np.testing.assert_allclose(np.round(path, precision), decoded, atol=1e-9)
+
+    def test_invalid_precision(self):
+        self.assertRaises(ValueError, encode, [(0, 0)], 12)
+
+
+class TestEncodedLayers(unittest.TestCase):
+
+    def test_encoded_paths_are_much_smaller(self):
+        rng = np.random.RandomState(6)
+        lats = 37 + np.cumsum(rng.randn(5000)) * 2e-5
+        lngs = -122 + np.cumsum(rng.randn(5000)) * 2e-5
+        plain = llplot.LeafletPlotter('', 37, -122, 12)
+        plain.plot(lats, lngs)
+        encoded = llplot.LeafletPlotter('', 37, -122, 12)
+        encoded.plot(lats, lngs, encoding='polyline', precision=6)
+        for compact in (False, True):
+            self.assertLess(5 * len(encoded.draw(compact=compact)), len(plain.draw(compact=compact)))
+
+    def test_unknown_encoding(self):
+        gmap = llplot.LeafletPlotter('', 0, 0, 1)
+        self.assertRaises(ValueError, gmap.polygon, [1, 2], [3, 4], encoding='gzip')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import llplot
+from llplot.publish import content_name, minify
+
+
+class TestPublish(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.leaflet_dir = os.path.join(self.dir, 'leaflet')
+        os.mkdir(self.leaflet_dir)
+        for name, text in (('leaflet.css', '.leaflet-container { overflow: hidden; }'),
+                           ('leaflet.js', 'window.L = {};\n//# sourceMappingURL=leaflet.js.map')):
+            with open(os.path.join(self.leaflet_dir, name), 'w') as f:
+                f.write(text)
+        self.gmap = llplot.LeafletPlotter('', 37.5, -122.25, 10)
+        self.gmap.marker(37.1, -122.1, 'red')
+        self.gmap.marker(37.2, -122.2, '#123456')
+        self.gmap.plot([37.1, 37.2], [-122.1, -122.2], 'blue')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_inline(self):
+        path = os.path.join(self.dir, 'map.html')
+        report = self.gmap.publish(path, leaflet_dir=self.leaflet_dir, compress=['gzip'])
+        with open(path) as f:
+            html = f.read()
+        self.assertNotIn('unpkg', html)
+        self.assertIn('<style>\n.leaflet-container', html)
+        self.assertIn('data:image/png;base64,', html)
+        self.assertNotIn('\n\t', html)
+        self.assertNotIn('sourceMappingURL', html)
+        with gzip.open(path + '.gz', 'rt') as f:
+            self.assertEqual(html, f.read())
+        self.assertEqual([(path, len(html), os.path.getsize(path + '.gz'), None)], report.files)
+        self.assertIn('total', str(report))
+
+    def test_copy_with_hashed_names(self):
+        path = os.path.join(self.dir, 'map.html')
+        report = self.gmap.publish(path, assets='copy', minify=False, compress=(), hashed=True,
+                                   leaflet_dir=self.leaflet_dir)
+        names = sorted(os.listdir(os.path.join(self.dir, 'map_files')))
+        self.assertEqual(4, len(names))
+        with open(report.path) as f:
+            html = f.read()
+        self.assertEqual(content_name('map.html', html.encode('utf-8')), os.path.basename(report.path))
+        for name in names:
+            self.assertIn('map_files/%s' % name, html)
+        self.assertIn('\t\tvar baseLayer', html)
+
+    def test_minify(self):
+        self.assertEqual('var a = 1;\nb("  x  ");\n', minify('\t\tvar a = 1;\n\n  // note\n  b("  x  ");  \n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
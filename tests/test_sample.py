@@ -1,11 +1,14 @@
+import array
 import unittest
 
+import numpy as np
+
 import llplot
 
 class TestMarkers(unittest.TestCase):
 
     def setUp(self):
-        self.gmap = llplot.GoogleMapPlotter(0, 0, 0)
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
 
     def test_marker_stores_lat_lon(self):
         self.gmap.marker(1, 11)
@@ -20,6 +23,21 @@ class TestMarkers(unittest.TestCase):
         self.gmap.marker(2, 22)
         self.gmap.draw('/tmp/DEL.html')
 
+    def test_marker_many_matches_marker(self):
+        lats = np.array([1.0, 2.0, 3.0])
+        lngs = array.array('d', [11.0, 22.0, 33.0])
+        self.gmap.marker_many(lats, lngs, ['r', 'red', 'blue'], title='x')
+        self.assertEqual([(1.0, 11.0, 'FF0000', 'x'),
+                          (2.0, 22.0, 'FF0000', 'x'),
+                          (3.0, 33.0, '0000FF', 'x')], list(self.gmap.points))
+        self.assertEqual(2, len(self.gmap.point_layer.color_table))
+
+    def test_scatter_markers_are_stored_in_bulk(self):
+        self.gmap.scatter([1, 2], [3, 4], c='g')
+        self.assertEqual(2, len(self.gmap.points))
+        self.assertEqual((2.0, 4.0, '008000', 'no implementation'),
+                         self.gmap.points[-1])
+
 
 if __name__ == '__main__':
     unittest.main()
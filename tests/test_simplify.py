@@ -0,0 +1,83 @@
+import unittest
+import warnings
+
+import numpy as np
+
+import llplot
+from llplot.simplify import dp_importance, simplify_path
+
+
+def _reference_dp(xy, tolerance, start, end, keep):
+    """Textbook recursive Douglas-Peucker on segments."""
+    if end - start < 2:
+        return
+    a, b = xy[start], xy[end]
+    ab = b - a
+    best, best_index = -1.0, None
+    for i in range(start + 1, end):
+        ap = xy[i] - a
+        norm = ab.dot(ab)
+        t = min(max(ap.dot(ab) / norm, 0), 1) if norm else 0
+        distance = np.hypot(*(ap - t * ab))
+        if distance > best:
+            best, best_index = distance, i
+    if best > tolerance:
+        keep[best_index] = True
+        _reference_dp(xy, tolerance, start, best_index, keep)
+        _reference_dp(xy, tolerance, best_index, end, keep)
+
+
+class TestDouglasPeucker(unittest.TestCase):
+
+    def test_matches_recursive_implementation(self):
+        rng = np.random.RandomState(1)
+        xy = np.cumsum(rng.randn(500, 2), axis=0)
+        importance = dp_importance(xy)
+        for tolerance in (0.5, 2.0, 10.0):
+            keep = np.zeros(len(xy), dtype=bool)
+            keep[[0, -1]] = True
+            _reference_dp(xy, tolerance, 0, len(xy) - 1, keep)
+            np.testing.assert_array_equal(keep, importance > tolerance)
+
+    def test_empty_path(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            for kwargs in ({'tolerance': 10}, {'tolerance_px': 1, 'zooms': [4, 8]}):
+                levels, report = simplify_path(np.empty((0, 2)), **kwargs)
+                self.assertEqual([0] * len(levels), [len(path) for _, path in levels])
+                self.assertEqual(0, report.vertices)
+
+    def test_straight_line_keeps_endpoints(self):
+        path = np.column_stack((np.linspace(0, 0.01, 100), np.zeros(100)))
+        levels, report = simplify_path(path, tolerance=1.0)
+        self.assertEqual([(None, 2)], report.levels)
+        self.assertEqual(98, report.dropped)
+        np.testing.assert_array_equal(path[[0, -1]], levels[0][1])
+
+
+class TestPlotSimplification(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 37, -122, 12)
+        rng = np.random.RandomState(2)
+        self.lats = 37 + np.cumsum(rng.randn(2000)) * 1e-4
+        self.lngs = -122 + np.cumsum(rng.randn(2000)) * 1e-4
+
+    def test_levels_of_detail_grow_with_zoom(self):
+        report = self.gmap.plot(self.lats, self.lngs, simplify_px=1, lod_zooms=[16, 8, 12])
+        kept = [kept for _, kept in report.levels]
+        self.assertEqual([8, 12, 16], [zoom for zoom, _ in report.levels])
+        self.assertEqual(sorted(kept), kept)
+        self.assertEqual([], self.gmap.paths)
+        self.assertEqual(1, len(self.gmap.lod_paths))
+        self.assertIn('setLatLngs', self.gmap.draw())
+
+    def test_single_tolerance_replaces_the_path(self):
+        report = self.gmap.polygon(self.lats, self.lngs, simplify=20)
+        self.assertEqual(report.kept, len(self.gmap.shapes[0][0]))
+        self.assertEqual([report], self.gmap.simplify_reports)
+        self.assertIsNone(self.gmap.plot(self.lats, self.lngs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.spatial import GridIndex, close_pairs, haversine, thin_mask
+
+
+class TestGridIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.lats = 37.7 + 0.1 * rng.random_sample(5000)
+        self.lngs = -122.5 + 0.1 * rng.random_sample(5000)
+        self.index = GridIndex(self.lats, self.lngs)
+
+    def test_bbox_matches_a_scan(self):
+        lats, lngs = self.lats, self.lngs
+        for south, west in ((37.71, -122.49), (37.75, -122.45), (37.6, -122.6)):
+            north, east = south + 0.02, west + 0.03
+            expected = np.flatnonzero((lats >= south) & (lats <= north) & (lngs >= west) & (lngs <= east))
+            np.testing.assert_array_equal(expected, self.index.bbox(south, west, north, east))
+
+    def test_radius_matches_a_scan(self):
+        expected = np.flatnonzero(haversine(37.75, -122.45, self.lats, self.lngs) <= 800)
+        self.assertTrue(len(expected))
+        np.testing.assert_array_equal(expected, self.index.radius(37.75, -122.45, 800))
+
+    def test_antimeridian(self):
+        index = GridIndex([0, 0, 0], [179.9, -179.9, 0])
+        np.testing.assert_array_equal([0, 1], index.bbox(-1, 179, 1, -179))
+        np.testing.assert_array_equal([0, 1], index.radius(0, 180, 20000))
+
+
+class TestThin(unittest.TestCase):
+
+    def test_kept_points_are_spaced_and_maximal(self):
+        rng = np.random.RandomState(1)
+        lats = 37.7 + 0.05 * rng.random_sample(3000)
+        lngs = -122.5 + 0.05 * rng.random_sample(3000)
+        mask = thin_mask(lats, lngs, 200)
+        self.assertTrue(0 < mask.sum() < 3000)
+        self.assertEqual(0, len(close_pairs(lats[mask], lngs[mask], 200)[0]))
+        near, _ = close_pairs(lats[~mask], lngs[~mask], 200, lats[mask], lngs[mask])
+        self.assertEqual((~mask).sum(), len(np.unique(near)))
+
+    def test_priority(self):
+        mask = thin_mask([0, 0, 0], [0, 0.00001, 1], 10, priority=[1, 2, 0])
+        self.assertEqual([False, True, True], mask.tolist())
+
+    def test_plotter_thin_and_index(self):
+        gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        gmap.marker_many([0, 0, 0, 1], [0, 0.00001, 0.00002, 1])
+        self.assertEqual([0, 1, 2], gmap.spatial_index().radius(0, 0, 10).tolist())
+        self.assertEqual(2, gmap.thin(5, priority=[3, 2, 1, 0]))
+        self.assertEqual([(0.0, 0.0), (1.0, 1.0)], [point[:2] for point in gmap.points])
+        # The index follows the layer.
+        self.assertEqual([0], gmap.spatial_index('points').radius(0, 0, 10).tolist())
+        self.assertRaises(ValueError, gmap.spatial_index, 'paths')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import llplot
+
+
+class TestDrawStats(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+        self.gmap.marker_many([1, 2, 3], [4, 5, 6], 'red')
+        self.gmap.plot([1, 2, 3], [4, 5, 6], 'blue')
+        self.gmap.plot([1, 2], [4, 5], 'blue')
+
+    def test_no_stats_by_default(self):
+        self.gmap.draw()
+        self.assertIsNone(self.gmap.draw_stats)
+
+    def test_stats_per_layer(self):
+        html = self.gmap.draw(compact=True, stats=True)
+        points, paths = self.gmap.draw_stats
+        self.assertEqual(('points', 3, 3), points[:3])
+        self.assertEqual(('paths', 2, 5), paths[:3])
+        self.assertLess(points.chars + paths.chars, len(html))
+        self.assertGreater(paths.chars, 0)
+        self.assertGreaterEqual(paths.seconds, 0)
+
+    def test_hooks(self):
+        calls = []
+        self.gmap.add_draw_hook(before=lambda layer: calls.append(layer),
+                                after=lambda stats: calls.append(stats.features))
+        self.gmap.add_draw_hook(after=lambda stats: calls.append(stats.layer))
+        self.gmap.draw()
+        self.assertEqual(['points', 3, 'points', 'paths', 2, 'paths'], calls)
+        self.assertEqual(2, len(self.gmap.draw_stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+import llplot
+from llplot.styles import Style
+from tests.test_compact import _payloads
+
+
+class TestStyleTable(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+
+    def test_features_share_one_style(self):
+        for i in range(100):
+            self.gmap.plot([i, i + 1], [0, 1], 'r', edge_width=2)
+            self.gmap.circle(i, 0, 10, 'red')
+        self.assertEqual(2, len(self.gmap.style_table))
+        styles = set(id(settings) for _, settings in self.gmap.paths)
+        self.assertEqual(1, len(styles))
+        style = self.gmap.paths[0][1]
+        self.assertEqual('#FF0000', style['color'])
+        self.assertEqual(2, style.get('edge_width'))
+        self.assertIsNone(style.get('unknown'))
+        self.assertEqual('#FF0000', dict(style)['color'])
+        self.assertRaises(KeyError, lambda: style['unknown'])
+        self.assertEqual(hash(style), hash(Style(**dict(style))))
+
+    def test_draw_writes_each_style_once(self):
+        for i in range(10):
+            self.gmap.plot([i, i + 1], [0, 1], 'red')
+        self.gmap.plot([0, 1], [0, 1], 'red', encoding='polyline')
+        paths, = _payloads(self.gmap.draw(compact=True))
+        self.assertEqual(1, len(paths['styles']))
+        self.assertEqual(11, len(paths['features']))
+        self.assertEqual(2, len(self.gmap.style_table))
+
+
+if __name__ == '__main__':
+    unittest.main()
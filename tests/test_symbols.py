@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.llplot import InvalidSymbolError
+from tests.test_compact import _payloads
+
+
+class TestSymbolLayer(unittest.TestCase):
+
+    def setUp(self):
+        self.gmap = llplot.LeafletPlotter('', 0, 0, 0)
+
+    def test_one_canvas_payload_for_all_symbols(self):
+        self.gmap.circle_many(np.array([1.0, 2.0]), np.array([3.0, 4.0]), [10, 20], 'red')
+        self.gmap.scatter([5, 6], [7, 8], 'blue', size=30, marker=False, symbol='x')
+        self.gmap.scatter([9], [10], 'blue', marker=False, symbol='+')
+        html = self.gmap.draw()
+        symbols, = _payloads(html)
+        self.assertEqual(1, html.count('L.canvas('))
+        self.assertEqual([1.0, 2.0, 5.0, 6.0, 9.0], symbols['lat'])
+        self.assertEqual([10.0, 20.0, 30.0, 30.0, 40.0], symbols['size'])
+        self.assertEqual(['o', 'o', 'x', 'x', '+'],
+                         [symbols['shapes'][shape] for shape in symbols['shape']])
+        # The two scatter calls share a style.
+        self.assertEqual([0, 0, 1, 1, 1], symbols['style'])
+        self.assertEqual('#0000FF', symbols['styles'][1]['fillColor'])
+        self.assertEqual(0, len(self.gmap.points))
+
+    def test_invalid_symbol(self):
+        self.assertRaises(InvalidSymbolError, self.gmap.scatter, [1], [2], marker=False, symbol='*')
+        self.assertRaises(ValueError, self.gmap.circle_many, [1, 2], [3, 4], [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
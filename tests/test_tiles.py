@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import llplot
+from llplot.tiles import TileSet, tile_bounds, tile_xy
+
+
+class TestTileXY(unittest.TestCase):
+
+    def test_matches_the_xyz_scheme(self):
+        xs, ys = tile_xy([51.5, -33.9], [-0.12, 151.2], 10)
+        self.assertEqual([511, 942], xs.tolist())
+        self.assertEqual([340, 614], ys.tolist())
+
+
+class TestTileSet(unittest.TestCase):
+
+    def tiles(self, paths=(), shapes=(), zoom=3):
+        empty = (np.zeros(0),) * 4
+        return TileSet(empty, list(paths), list(shapes), empty).tiles(zoom)
+
+    def test_long_segments_are_in_every_tile_they_cross(self):
+        tiles = self.tiles(paths=[(0, np.array([[10.0, -170.0], [-10.0, 170.0]]))])
+        self.assertEqual(8, len(tiles))
+        for (x, y), payload in tiles.items():
+            (style, piece), = payload['paths']
+            box = tile_bounds(x, y, 3)
+            lats, lngs = np.array(piece[::2]), np.array(piece[1::2])
+            self.assertTrue(box.contains(lats, lngs).all())
+        # The pieces join up.
+        self.assertEqual(tiles[(0, 3)]['paths'][0][1][-2:], tiles[(1, 3)]['paths'][0][1][:2])
+
+    def test_polygons_are_clipped_to_each_tile(self):
+        square = np.array([[-10.0, -10.0], [-10.0, 10.0], [10.0, 10.0], [10.0, -10.0]])
+        small = square / 10 + 40
+        tiles = self.tiles(shapes=[(0, square), (1, small)], zoom=1)
+        self.assertEqual(4, len(tiles))
+        for (x, y), payload in tiles.items():
+            (style, fill), = payload['fills']
+            self.assertEqual(0, style)
+            lats, lngs = np.array(fill[::2]), np.array(fill[1::2])
+            self.assertTrue(tile_bounds(x, y, 1).contains(lats, lngs).all())
+            # A quarter of the square, and its outline without the tile edges.
+            self.assertEqual(100, np.ptp(lats) * np.ptp(lngs))
+            for _, piece in payload['outlines']:
+                piece = np.array(piece).reshape(-1, 2)
+                on_edge = (piece[1:] == 0) & (piece[:-1] == 0)
+                self.assertFalse(on_edge.any())
+        self.assertEqual([[1, small.ravel().tolist()]], tiles[(1, 0)]['shapes'])
+
+
+class TestDrawTiles(unittest.TestCase):
+
+    def setUp(self):
+        self.outdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outdir)
+
+    def build(self, radius=100):
+        gmap = llplot.LeafletPlotter('', 40, -3, 6)
+        gmap.marker_many([40.1, 40.2, -33.9], [-3.1, -3.2, 151.2], 'red')
+        gmap.plot([40.0, 40.0, 40.0], [-10.0, -3.0, 5.0])
+        gmap.circle(40, -3, radius, 'blue')
+        return gmap
+
+    def read_tile(self, key):
+        with open(os.path.join(self.outdir, key + '.json')) as f:
+            return json.load(f)
+
+    def test_features_are_split_by_tile(self):
+        stats = self.build().draw_tiles(self.outdir, 0, 2, processes=1)
+        self.assertEqual(stats['tiles'], stats['written'])
+        world = self.read_tile('0/0/0')
+        self.assertEqual(3, len(world['points']['lat']))
+        # The path crosses the greenwich meridian, so it is cut in two at zoom 1.
+        self.assertEqual(1, len(self.read_tile('1/0/0')['paths']))
+        self.assertEqual(1, len(self.read_tile('1/1/0')['paths']))
+        self.assertEqual([-33.9], self.read_tile('1/1/1')['points']['lat'])
+        self.assertTrue(os.path.exists(os.path.join(self.outdir, 'index.html')))
+
+    def test_unchanged_tiles_are_not_rewritten(self):
+        first = self.build().draw_tiles(self.outdir, 0, 3, processes=1)
+        second = self.build().draw_tiles(self.outdir, 0, 3, processes=1)
+        self.assertEqual(0, second['written'])
+        self.assertEqual(first['tiles'], second['unchanged'])
+        third = self.build(radius=200).draw_tiles(self.outdir, 0, 3, processes=1)
+        self.assertEqual(4, third['written'])
+        fourth = self.build(radius=200).draw_tiles(self.outdir, 0, 1, processes=1)
+        self.assertEqual(first['tiles'] - fourth['tiles'], fourth['removed'])
+
+
+if __name__ == '__main__':
+    unittest.main()